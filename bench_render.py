@@ -0,0 +1,474 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+from graphics import GradientCache, draw_gradient_lines, render_shadowed, surface_counter
+
+# ==============================================================================
+# TELAS DO JOGO SEM JANELA
+# ==============================================================================
+# Os benchmarks importam o jogo com os drivers dummy do SDL e desenham as suas
+# telas direto; graphics.py e compositor.py não dependem do jogo.
+
+def _headless_game():
+    """Importa o jogo sem janela (SDL dummy), com a primeira música carregada."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import game
+
+    game.NOTE_DISK_CACHE_DIR = None  # O benchmark não grava notas em disco
+    game.init_display()
+    game.init_audio(open_output=False)  # As telas leem os caches de notas; nada toca
+    game.init_detector()  # As telas leem o estado do detector; o microfone não é aberto
+    game.current_song_data = game.BIBLIOTECA[0]
+    game.current_song_seq = game.BIBLIOTECA[0].notas
+    game.current_index = 1
+    return game
+
+
+def _game_scenes(game):
+    """Telas para os benchmarks; as animações são reiniciadas a cada quadro, no meio do efeito."""
+    animations = ["show_success_animation", "show_music_success_animation", "show_music_error_animation"]
+
+    def play(modal=False, animation=None):
+        def draw():
+            game.guess_modal_open = modal
+            # draw_play() só declara o widget das animações, que é desenhado no
+            # present(): a flag fica ligada até o começo do próximo quadro
+            for flag in animations:
+                setattr(game, flag, flag == animation)
+            if animation is not None:
+                game.success_animation_start_time = game.music_animation_start_time = pygame.time.get_ticks() - 500
+            game.draw_play()
+        return draw
+
+    return {
+        "menu": game.draw_menu,
+        "rules": game.draw_rules,
+        "settings": game.draw_settings,
+        "play": play(),
+        "detector": game.draw_detector,
+        "modal": play(modal=True),
+        "success": play(animation="show_success_animation"),
+        "music_ok": play(animation="show_music_success_animation"),
+        "music_err": play(animation="show_music_error_animation"),
+        "gameover": game.draw_gameover,
+    }
+
+
+def _frame_ms(game, draw, frames, redraw_all=True):
+    """
+    ms por quadro de draw() + compositor.present(). Com redraw_all as camadas
+    estáticas são descartadas a cada quadro, e a tela inteira é desenhada como
+    antes do compositor (é o que os benchmarks de gradiente/texto/fontes medem).
+    """
+    def frame():
+        if redraw_all:
+            game.compositor.reset()
+        draw()
+        game.compositor.present()
+
+    frame()  # Aquece (no cache, o primeiro quadro monta tudo)
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame()
+    return 1000.0 * (time.perf_counter() - start) / frames
+
+
+# ==============================================================================
+# BENCHMARK DE DESENHO (TODAS AS TELAS)
+# ==============================================================================
+# Roda cada tela do jogo por N quadros com o estado fixo (primeira música, nota
+# 1, sem mouse) e o relógio do pygame avançando 1/60 s por quadro, para que as
+# animações passem sempre pelos mesmos quadros. Cada tela é medida de dois
+# jeitos: "full" descarta as camadas estáticas a cada quadro (custo de montar a
+# tela inteira) e "dirty" é o quadro real do jogo, com o compositor. Além do
+# tempo, cada quadro conta as Surfaces criadas e, numa passada separada com
+# tracemalloc (que deixa o quadro mais lento), o pico de bytes alocados pelo
+# Python e pelo NumPy (gradientes, textos, tobytes). O resultado pode ser
+# gravado como referência (JSON) e comparado depois.
+
+BASELINE_FILE = "bench_baseline.json"
+THRESHOLD = 0.15       # Piora relativa da média que conta como regressão (15%)
+TAIL_THRESHOLD = 0.5   # O p99 oscila bem mais entre execuções (escalonador, GC)
+MIN_MS = 0.05     # ...desde que seja também maior que isso (ruído em telas de ~0 ms)
+MIN_KB = 4.0      # Idem para as alocações (KB por quadro)
+ALLOC_FRAMES = 60  # Quadros da passada com tracemalloc
+ROUNDS = 3        # Cada métrica fica com a melhor rodada (outros processos só pioram o tempo)
+FRAME_MS = 1000 // 60
+MODES = ["full", "dirty"]
+METRICS = ["mean_ms", "p99_ms", "surfaces", "alloc_kb"]
+ANIMATIONS = {  # Cena -> função de desenho que ela precisa exercitar
+    "success": "draw_success_animation",
+    "music_ok": "draw_music_success_animation",
+    "music_err": "draw_music_error_animation",
+}
+
+
+def _run(game, draw, frames, redraw_all, clock):
+    """Tempos (ms) de cada quadro, Surfaces criadas e KB alocados (pico do tracemalloc) por quadro."""
+    def frame():
+        clock[0] += FRAME_MS
+        if redraw_all:
+            game.compositor.reset()
+        draw()
+        game.compositor.present()
+
+    frame()  # Aquece (monta caches e a camada estática)
+    surface_counter.end_frame()
+    times = np.empty(frames)
+    surfaces = 0
+    for i in range(frames):
+        start = time.perf_counter_ns()
+        frame()
+        times[i] = (time.perf_counter_ns() - start) / 1e6
+        surfaces += surface_counter.current
+        surface_counter.end_frame()
+
+    traced = min(frames, ALLOC_FRAMES)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    allocated = 0
+    for _ in range(traced):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        frame()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    if not tracing:
+        tracemalloc.stop()
+    surface_counter.end_frame()
+    return {"mean_ms": float(times.mean()), "p99_ms": float(np.percentile(times, 99)),
+            "max_ms": float(times.max()), "surfaces": surfaces / frames,
+            "alloc_kb": allocated / traced / 1024}
+
+
+def _check_animations(game, scenes, clock):
+    """
+    Cada cena de animação precisa chamar o seu draw_* e criar Surfaces nele.
+    Uma cena que não desenha nada mediria a tela do jogo parada e gravaria uma
+    referência falsa.
+    """
+    for scene, fn_name in ANIMATIONS.items():
+        real = getattr(game, fn_name)
+        drawn = {"calls": 0, "surfaces": 0}
+
+        def counting(*args, **kwargs):
+            before = surface_counter.current
+            try:
+                return real(*args, **kwargs)
+            finally:
+                if surface_counter.current > before:
+                    drawn["calls"] += 1
+                    drawn["surfaces"] += surface_counter.current - before
+
+        setattr(game, fn_name, counting)
+        try:
+            _run(game, scenes[scene], 1, True, clock)
+        finally:
+            setattr(game, fn_name, real)
+        if drawn["calls"] == 0:
+            raise RuntimeError(f"A cena '{scene}' não desenhou nada em {fn_name}()")
+
+
+def benchmark_render(frames=300, rounds=ROUNDS):
+    game = _headless_game()
+    scenes = _game_scenes(game)
+    clock = [0]
+    real_get_ticks = pygame.time.get_ticks
+    pygame.time.get_ticks = lambda: clock[0]
+    try:
+        _check_animations(game, scenes, clock)
+        screens = {}
+        for _ in range(rounds):
+            for name, draw in scenes.items():
+                for mode in MODES:
+                    t = _run(game, draw, frames, mode == "full", clock)
+                    best = screens.setdefault(name, {}).setdefault(mode, t)
+                    for metric, value in t.items():
+                        best[metric] = min(best[metric], value)
+    finally:
+        pygame.time.get_ticks = real_get_ticks
+    pygame.quit()
+    return {"frames": frames, "rounds": rounds, "python": platform.python_version(),
+            "pygame": pygame.version.ver, "machine": platform.machine(), "screens": screens}
+
+
+# ==============================================================================
+# COMPARAÇÕES (CACHES E COMPOSITOR)
+# ==============================================================================
+def benchmark_gradients(frames=60):
+    """
+    Tempo de quadro das telas do jogo que usam gradiente (menu, jogo, detector),
+    primeiro com draw_gradient_lines e depois com o GradientCache.
+    """
+    game = _headless_game()
+    scenes = _game_scenes(game)
+    screens = {name: scenes[name] for name in ("menu", "play", "detector")}
+
+    # Confere que as duas versões produzem os mesmos pixels
+    a = pygame.Surface((game.WIDTH, game.HEIGHT))
+    b = pygame.Surface((game.WIDTH, game.HEIGHT))
+    draw_gradient_lines(a, (0, 0, game.WIDTH, game.HEIGHT), (120, 80, 200), (60, 100, 220))
+    GradientCache().draw(b, (0, 0, game.WIDTH, game.HEIGHT), (120, 80, 200), (60, 100, 220))
+    identical = bool(np.array_equal(pygame.surfarray.array3d(a), pygame.surfarray.array3d(b)))
+
+    results = {}
+    for label, impl in (("lines", draw_gradient_lines), ("cached", game.gradient_cache.draw)):
+        game.gradient_cache.clear()
+        game.draw_gradient = impl
+        for name, draw in screens.items():
+            results.setdefault(name, {})[label] = _frame_ms(game, draw, frames)
+    stats = game.gradient_cache.stats()
+    pygame.quit()
+    return {"frames": frames, "identical": identical, "screens": results, "cache": stats}
+
+
+def benchmark_text(frames=60):
+    """
+    Tempo de quadro e tempo dentro do SDL_ttf por quadro em cada tela, com o
+    texto renderizado a cada quadro e com o TextCache.
+    """
+    game = _headless_game()
+    scenes = _game_scenes(game)
+    ttf_ns = [0]
+
+    def uncached(font, text, antialias, color, shadow=0):
+        start = time.perf_counter_ns()
+        if shadow:
+            surf = render_shadowed(font, text, antialias, color, shadow)
+        else:
+            surf = surface_counter.render(font, text, antialias, color)
+        ttf_ns[0] += time.perf_counter_ns() - start
+        return surf
+
+    results = {}
+    for label in ("uncached", "cached"):
+        game.render_text = uncached if label == "uncached" else game.text_cache.render
+        for name, draw in scenes.items():
+            draw()
+            ttf_before, cache_before = ttf_ns[0], game.text_cache.render_ns
+            frame_ms = _frame_ms(game, draw, frames)
+            spent = (ttf_ns[0] - ttf_before) + (game.text_cache.render_ns - cache_before)
+            results.setdefault(name, {})[label] = {"frame_ms": frame_ms, "ttf_ms": spent / 1e6 / (frames + 1)}
+    stats = game.text_cache.stats()
+    pygame.quit()
+    return {"frames": frames, "screens": results, "cache": stats}
+
+
+_STARTUP_SNIPPET = """
+import json, os, time
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import game
+import pygame
+imported = time.perf_counter()
+game.init_display()
+game.draw_menu()
+game.compositor.present()
+done = time.perf_counter()
+print(json.dumps({"import_ms": 1000 * (imported - game.STARTUP_BEGIN),
+                  "first_frame_ms": 1000 * (done - game.STARTUP_BEGIN),
+                  "fonts": game.font_registry.stats()}))
+"""
+
+
+def benchmark_fonts(frames=60):
+    """
+    Importação -> primeiro quadro do menu num processo novo, sem e com a
+    resolução de fontes gravada em disco, e quantas Fonts cada tela cria por
+    quadro. A partida usa um arquivo de fontes temporário: o do jogo fica intacto.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    startup = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SOLFEJO_FONT_CACHE=os.path.join(tmp, "fonts.json"))
+        for label in ("cold", "warm"):  # A primeira execução cria o arquivo, a segunda lê
+            out = subprocess.run([sys.executable, "-c", _STARTUP_SNIPPET], cwd=root, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            startup[label] = json.loads(out.strip().splitlines()[-1])
+
+    game = _headless_game()
+    scenes = _game_scenes(game)
+    calls = [0]
+    get_font = game.get_font
+
+    def counting_get_font(*args, **kwargs):
+        calls[0] += 1
+        return get_font(*args, **kwargs)
+
+    game.get_font = counting_get_font
+    per_frame = {}
+    for name, draw in scenes.items():
+        draw()
+        game.compositor.present()
+        calls[0] = 0
+        created = game.font_registry.created
+        for _ in range(frames):
+            game.compositor.reset()
+            draw()
+            game.compositor.present()
+        per_frame[name] = {"get_font_calls": calls[0] / frames,
+                           "fonts_created": (game.font_registry.created - created) / frames}
+    stats = game.font_registry.stats()
+    pygame.quit()
+    return {"frames": frames, "startup": startup, "screens": per_frame, "registry": stats}
+
+
+def benchmark_compositor(frames=120):
+    """
+    Tempo de quadro e pixels enviados à janela em cada tela parada (sem mouse
+    nem entrada), redesenhando a tela inteira e com o compositor.
+    """
+    game = _headless_game()
+    area = game.WIDTH * game.HEIGHT
+    results = {}
+    for name, draw in _game_scenes(game).items():
+        full_ms = _frame_ms(game, draw, frames, redraw_all=True)
+        pixels, count = game.compositor.pixels_total, game.compositor.frames
+        dirty_ms = _frame_ms(game, draw, frames, redraw_all=False)
+        pushed = (game.compositor.pixels_total - pixels) / (game.compositor.frames - count)
+        results[name] = {"full_ms": full_ms, "dirty_ms": dirty_ms, "pixels": pushed, "screen_fraction": pushed / area}
+    pygame.quit()
+    return {"frames": frames, "screens": results}
+
+
+# ==============================================================================
+# REFERÊNCIA
+# ==============================================================================
+def compare(result, baseline, threshold=THRESHOLD, tail_threshold=TAIL_THRESHOLD, min_ms=MIN_MS):
+    """
+    Lista de regressões (tela, modo, métrica, antes, agora) em relação à
+    referência. A média, as Surfaces e os KB alocados por quadro contam quando
+    pioram mais que `threshold`, o p99 mais que `tail_threshold`; tempos também
+    precisam piorar mais que `min_ms`, e alocações mais que MIN_KB.
+    """
+    limits = {"mean_ms": threshold, "p99_ms": tail_threshold, "surfaces": threshold, "alloc_kb": threshold}
+    floors = {"mean_ms": min_ms, "p99_ms": min_ms, "surfaces": 0.0, "alloc_kb": MIN_KB}
+    regressions = []
+    for name, modes in result["screens"].items():
+        old_modes = baseline["screens"].get(name)
+        if old_modes is None:
+            continue  # Tela nova, ainda sem referência
+        for mode in MODES:
+            for metric in METRICS:
+                old, new = old_modes[mode].get(metric), modes[mode][metric]
+                if old is None:
+                    continue  # Referência gravada antes dessa métrica existir
+                if new > old * (1 + limits[metric]) and new - old > floors[metric]:
+                    regressions.append((name, mode, metric, old, new))
+    return regressions
+
+
+def _print(result, baseline=None):
+    for name, modes in result["screens"].items():
+        line = f"{name:9s}"
+        for mode in MODES:
+            t = modes[mode]
+            line += (f" | {mode:5s} {t['mean_ms']:6.2f} ms (p99 {t['p99_ms']:6.2f})"
+                     f" {t['surfaces']:5.1f} Surfaces {t['alloc_kb']:7.1f} KB/quadro")
+        if baseline is not None and name in baseline["screens"]:
+            old = baseline["screens"][name]["dirty"]["mean_ms"]
+            new = modes["dirty"]["mean_ms"]
+            line += f" | dirty antes {old:6.2f} ms"
+            if old > 0:
+                line += f" ({100 * (new - old) / old:+.0f}%)"
+        print(line)
+
+
+def _print_comparison(args):
+    if args.fonts:
+        r = benchmark_fonts(args.frames or 60)
+        for label, name in (("cold", "sem cache de fontes"), ("warm", "com cache de fontes")):
+            t = r["startup"][label]
+            print(f"Partida {name}: importação {t['import_ms']:.0f} ms, primeiro quadro {t['first_frame_ms']:.0f} ms "
+                  f"(resolução {t['fonts']['resolve_ms']:.1f} ms, {t['fonts']['system_scans']} buscas no sistema)")
+        for name, t in r["screens"].items():
+            print(f"{name:9s} get_font por quadro: {t['get_font_calls']:4.1f} | "
+                  f"Fonts criadas por quadro: {t['fonts_created']:.2f}")
+        print(f"Registro: {r['registry']['fonts']} Fonts em {r['registry']['families']} famílias")
+    elif args.text:
+        r = benchmark_text(args.frames or 60)
+        for name, t in r["screens"].items():
+            u, c = t["uncached"], t["cached"]
+            print(f"{name:9s} sem cache: {u['frame_ms']:6.2f} ms/quadro ({u['ttf_ms']:5.2f} no SDL_ttf) | "
+                  f"cache: {c['frame_ms']:6.2f} ms/quadro ({c['ttf_ms']:5.2f} no SDL_ttf)")
+        c = r["cache"]
+        print(f"Cache: {c['entries']} textos, {c['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{100 * c['hit_rate']:.1f}% de acertos")
+    elif args.gradients:
+        r = benchmark_gradients(args.frames or 60)
+        print(f"Pixels idênticos à versão original: {'sim' if r['identical'] else 'NÃO'}")
+        for name, t in r["screens"].items():
+            print(f"{name:9s} linhas: {t['lines']:6.2f} ms/quadro | cache: {t['cached']:6.2f} ms/quadro "
+                  f"({t['lines'] / t['cached']:.1f}x)")
+        c = r["cache"]
+        print(f"Cache: {c['entries']} gradientes, {c['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{c['hits']} acertos / {c['misses']} faltas")
+    else:
+        r = benchmark_compositor(args.frames or 120)
+        for name, t in r["screens"].items():
+            print(f"{name:9s} tela inteira: {t['full_ms']:6.2f} ms/quadro | compositor: {t['dirty_ms']:6.2f} ms/quadro, "
+                  f"{t['pixels'] / 1000:6.1f}k px/quadro ({100 * t['screen_fraction']:.0f}% da tela)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tempo de quadro de todas as telas (sem janela), "
+                                                 "com referência em JSON")
+    parser.add_argument("--frames", type=int, default=None, help="Quadros por tela (padrão: 300 no "
+                                                                 "benchmark completo, 60/120 nas comparações)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="Rodadas por tela (fica a melhor)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Arquivo JSON de referência")
+    parser.add_argument("--save", action="store_true", help="Grava o resultado como nova referência")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Piora relativa da média que conta como regressão (0.15 = 15%%)")
+    parser.add_argument("--tail-threshold", type=float, default=TAIL_THRESHOLD,
+                        help="Piora relativa do p99 que conta como regressão")
+    parser.add_argument("--min-ms", type=float, default=MIN_MS,
+                        help="Piora absoluta mínima (ms) para um tempo contar como regressão")
+    only = parser.add_mutually_exclusive_group()
+    only.add_argument("--gradients", action="store_true", help="Só compara gradiente linha a linha e GradientCache")
+    only.add_argument("--text", action="store_true", help="Só compara texto sem cache e TextCache")
+    only.add_argument("--fonts", action="store_true", help="Só mede a partida e as Fonts criadas por quadro")
+    only.add_argument("--compositor", action="store_true", help="Só compara tela inteira e compositor")
+    args = parser.parse_args()
+
+    if args.gradients or args.text or args.fonts or args.compositor:
+        _print_comparison(args)
+        sys.exit(0)
+
+    r = benchmark_render(args.frames or 300, args.rounds)
+    if args.save:
+        _print(r)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(r, f, indent=2)
+        print(f"Referência gravada em {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        _print(r)
+        print(f"Sem referência em {args.baseline} (grave uma com --save)")
+        sys.exit(0)
+
+    _print(r, baseline)
+    if baseline["frames"] != r["frames"]:
+        print(f"Aviso: referência com {baseline['frames']} quadros, agora {r['frames']}")
+    regressions = compare(r, baseline, args.threshold, args.tail_threshold, args.min_ms)
+    for name, mode, metric, old, new in regressions:
+        print(f"REGRESSÃO {name} ({mode}) {metric}: {old:.2f} -> {new:.2f}")
+    if regressions:
+        sys.exit(1)
+    print(f"Sem regressões (média +{100 * args.threshold:.0f}%, p99 +{100 * args.tail_threshold:.0f}%)")
@@ -0,0 +1,188 @@
+import pygame
+
+from graphics import surface_counter
+
+# ==============================================================================
+# COMPOSITOR (RETÂNGULOS SUJOS)
+# ==============================================================================
+# Cada tela tem uma camada estática (fundo, pautas, cards, rótulos) montada uma
+# vez e refeita só quando a sua chave muda (ex.: pontuação, nota alvo). O que
+# mexe (botões, agulha, cursor, título pulsante) é declarado como widget, com
+# um retângulo e uma chave. A cada quadro só os widgets cuja chave mudou são
+# redesenhados: o retângulo volta ao que está na camada estática, o widget é
+# desenhado por cima e só esses retângulos vão para pygame.display.update().
+
+ALWAYS = object()  # Chave de widget que muda em todo quadro (animações, overlay)
+
+
+class Compositor:
+    def __init__(self):
+        self._layers = {}         # nome -> (chave, Surface)
+        self._layer = None        # (nome, chave) do quadro sendo montado
+        self._shown_layer = None  # (nome, chave) do que está na tela
+        self._widgets = []        # [(id, rect, chave, draw)] do quadro sendo montado
+        self._shown = {}          # id -> (rect, chave) do que está na tela
+        self._full = True
+        self._rects = []          # O que o último compose() desenhou
+        self._animating = False
+        self.animating = False    # Algum widget animado no último quadro (ver pacing.py)
+        self.frames = 0
+        self.full_frames = 0
+        self.layer_builds = 0
+        self.pixels_last = 0
+        self.pixels_total = 0
+        self.rects_last = 0
+
+    # --------------------------------------------------------------------------
+    # Montagem do quadro (chamado pelas funções draw_*)
+    # --------------------------------------------------------------------------
+    def begin(self, name, key, draw_static):
+        """
+        Escolhe a camada estática do quadro. draw_static(surf) desenha a tela sem
+        os widgets e só roda quando a camada `name` ainda não existe ou `key` mudou.
+        """
+        self._widgets = []
+        self._animating = False
+        entry = self._layers.get(name)
+        if entry is None or entry[0] != key:
+            display = pygame.display.get_surface()
+            surf = surface_counter.surface(display.get_size())
+            if surf.get_bitsize() != display.get_bitsize():
+                surf = surf.convert()
+            draw_static(surf)
+            self._layers[name] = (key, surf)
+            self.layer_builds += 1
+        self._layer = (name, key)
+
+    def widget(self, wid, rect, key, draw, animated=False):
+        """
+        Declara um widget. draw(surf) só pode pintar dentro de `rect` (o resto é
+        cortado) e só é chamado quando `key` muda, o retângulo muda ou algo que
+        encosta nele foi redesenhado. Widgets posteriores ficam por cima.
+        animated=True (implícito com ALWAYS) pede quadros no ritmo ativo.
+        """
+        self._widgets.append((wid, pygame.Rect(rect), key, draw))
+        self._animating = self._animating or animated or key is ALWAYS
+
+    def layer(self):
+        """Surface da camada estática do quadro atual."""
+        return self._layers[self._layer[0]][1]
+
+    def invalidate(self):
+        """Força o próximo quadro a ser enviado inteiro (ex.: janela exposta de novo)."""
+        self._full = True
+
+    def reset(self):
+        """Descarta as camadas estáticas (são remontadas no próximo begin())."""
+        self._layers.clear()
+        self._full = True
+
+    # --------------------------------------------------------------------------
+    # Envio para a tela
+    # --------------------------------------------------------------------------
+    def _draw(self, target, rect, draw):
+        target.set_clip(rect)
+        try:
+            draw(target)
+        finally:
+            target.set_clip(None)
+
+    def present(self):
+        self.compose()
+        self.update()
+
+    def compose(self):
+        """Desenha na janela o que mudou (sem enviar); update() envia."""
+        target = pygame.display.get_surface()
+        layer = self.layer()
+        widgets = self._widgets
+        self.animating = self._animating
+
+        if self._full or self._layer != self._shown_layer:
+            target.blit(layer, (0, 0))
+            for _, rect, _, draw in widgets:
+                self._draw(target, rect, draw)
+            self._rects = [target.get_rect()]
+            self.full_frames += 1
+        else:
+            self._rects = self._redraw_changed(target, layer, widgets)
+
+        self._shown = {wid: (rect, key) for wid, rect, key, _ in widgets}
+        self._shown_layer = self._layer
+        self._full = False
+
+    def update(self):
+        """Envia à janela os retângulos do último compose()."""
+        rects = self._rects
+        pygame.display.update(rects)
+
+        self.frames += 1
+        self.rects_last = len(rects)
+        screen_rect = pygame.display.get_surface().get_rect()
+        self.pixels_last = sum(r.clip(screen_rect).w * r.clip(screen_rect).h for r in rects)
+        self.pixels_total += self.pixels_last
+
+    def _redraw_changed(self, target, layer, widgets):
+        ids = set()
+        redraw = set()
+        dirty = []  # Regiões que voltam à camada estática
+        for i, (wid, rect, key, _) in enumerate(widgets):
+            ids.add(wid)
+            shown = self._shown.get(wid)
+            if key is ALWAYS or shown is None or shown[1] != key or shown[0] != rect:
+                redraw.add(i)
+                dirty.append(rect)
+                if shown is not None and shown[0] != rect:
+                    dirty.append(shown[0])
+        for wid, (rect, _) in self._shown.items():
+            if wid not in ids:
+                dirty.append(rect)  # Widget que sumiu
+
+        # Quem encosta numa região restaurada perde pixels: redesenha também
+        rects = _merge(dirty)
+        grew = True
+        while grew:
+            grew = False
+            for i, (_, rect, _, _) in enumerate(widgets):
+                if i not in redraw and rect.collidelist(rects) != -1:
+                    redraw.add(i)
+                    dirty.append(rect)
+                    grew = True
+            if grew:
+                rects = _merge(dirty)
+
+        for r in rects:
+            target.blit(layer, r, r)
+        for i in sorted(redraw):
+            _, rect, _, draw = widgets[i]
+            self._draw(target, rect, draw)
+        return rects
+
+    def stats(self):
+        return {"frames": self.frames, "full_frames": self.full_frames, "layer_builds": self.layer_builds,
+                "layers": len(self._layers), "pixels_last": self.pixels_last, "rects_last": self.rects_last,
+                "pixels_avg": self.pixels_total / self.frames if self.frames else 0.0,
+                "animating": self.animating}
+
+
+def _merge(rects):
+    """
+    Junta retângulos que se sobrepõem quando a união não é maior que os dois
+    somados (ex.: um contido no outro); faixas finas em L continuam separadas.
+    """
+    merged = []
+    for r in rects:
+        r = pygame.Rect(r)
+        joined = True
+        while joined:
+            joined = False
+            for i, m in enumerate(merged):
+                if r.colliderect(m):
+                    u = r.union(m)
+                    if u.w * u.h <= r.w * r.h + m.w * m.h:
+                        r = u
+                        del merged[i]
+                        joined = True
+                        break
+        merged.append(r)
+    return merged
@@ -0,0 +1,457 @@
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from estimators import create_estimator
+from tracker import PitchTracker
+
+# ==============================================================================
+# PERFIS DE LATÊNCIA
+# ==============================================================================
+# block_size: amostras entregues pelo PortAudio a cada callback
+# window_size: janela de análise (sobreposta) passada ao estimador
+# hop_size: intervalo entre duas estimativas consecutivas
+LATENCY_PROFILES = {
+    "low_latency": {"block_size": 256, "window_size": 2048, "hop_size": 441},   # estimativa a cada 10 ms
+    "balanced": {"block_size": 512, "window_size": 4096, "hop_size": 662},      # ~15 ms
+    "low_cpu": {"block_size": 1024, "window_size": 4096, "hop_size": 882},      # 20 ms
+}
+DEFAULT_PROFILE = "balanced"
+DEFAULT_ESTIMATOR = "yin"     # Só NumPy (o aubio é opcional em requirements.txt)
+FALLBACK_ESTIMATOR = "yin"    # Usado quando o estimador pedido não pode ser importado
+
+STALL_TIMEOUT = 1.0    # Sem callbacks por esse tempo = dispositivo perdido
+REOPEN_INTERVAL = 2.0  # Intervalo entre tentativas de reabrir o microfone
+
+A4_TUNING = 440.0  # Lá 4 de referência: jogo, render_library e grading importam daqui
+
+NOTAS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+
+def ring_capacity(window_size, rate):
+    """Tamanho do ring de áudio: folga para a análise atrasar sem perder a janela."""
+    return max(window_size * 4, rate // 2)
+
+
+def note_frequency(nome, a4=A4_TUNING):
+    """Frequência da nota (sem oitava) na oitava do Lá 4, como NOTE_FREQS do jogo."""
+    return a4 * (2 ** ((NOTAS.index(nome) - 9) / 12.0))
+
+
+def list_input_devices():
+    """Dispositivos de entrada do PortAudio: lista de (índice, nome, canais de entrada)."""
+    import pyaudio
+
+    pa = pyaudio.PyAudio()
+    try:
+        devices = []
+        for i in range(pa.get_device_count()):
+            info = pa.get_device_info_by_index(i)
+            if info.get("maxInputChannels", 0) > 0:
+                devices.append((i, info["name"], int(info["maxInputChannels"])))
+        return devices
+    finally:
+        pa.terminate()
+
+
+@dataclass
+class PitchFrame:
+    """Uma estimativa publicada pelo detector."""
+    timestamp: float      # Fim da janela analisada, em segundos de áudio desde a abertura do stream
+    freq: float
+    note: str
+    confidence: float
+    capture_time: float   # perf_counter() aproximado da captura da amostra mais nova (None offline)
+    estimate_time: float = None  # perf_counter() ao terminar a estimativa
+    consume_time: float = None   # Preenchido por quem tira o quadro da fila
+    render_time: float = None    # Preenchido depois do flip que mostrou o quadro
+
+
+class RingBuffer:
+    """
+    Buffer circular pré-alocado para um produtor (callback de áudio) e um
+    consumidor (thread de análise). O produtor copia as amostras e só então
+    publica o novo total em `written`, então o consumidor nunca precisa de lock.
+    `buffer` e `counter` (array int64 de uma posição) permitem que o ring viva
+    em memória compartilhada entre processos.
+    """
+
+    def __init__(self, capacity, dtype=np.float32, buffer=None, counter=None):
+        self.capacity = int(capacity)
+        self._data = buffer if buffer is not None else np.zeros(self.capacity, dtype=dtype)
+        self._counter = counter if counter is not None else np.zeros(1, dtype=np.int64)
+
+    @property
+    def written(self):
+        """Total de amostras já escritas (monotônico)."""
+        return int(self._counter[0])
+
+    def write(self, samples):
+        total = len(samples)
+        if total >= self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+        written = self.written
+        start = (written + total - n) % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:]
+        self._counter[0] = written + total
+
+    def read(self, end, out):
+        """Copia para `out` as len(out) amostras que terminam na posição absoluta `end`."""
+        n = len(out)
+        start = (end - n) % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < n:
+            out[first:] = self._data[:n - first]
+        return out
+
+
+class SignalGate:
+    """
+    Portas baratas que decidem se vale a pena chamar o estimador: pico e RMS
+    da janela (antes da estimativa) e confiança do estimador (depois). O limiar
+    de RMS acompanha o piso de ruído: desce rápido quando o ambiente fica mais
+    silencioso e sobe devagar, só com quadros que não parecem voz (abaixo do
+    limiar, ou rejeitados pelo estimador).
+    """
+
+    def __init__(self, min_rms=0.003, margin=3.0, min_peak=0.01, min_confidence=0.5):
+        self.min_rms = min_rms
+        self.margin = margin            # Sinal precisa estar ~10 dB acima do piso
+        self.min_peak = min_peak
+        self.min_confidence = min_confidence
+        self.noise_floor = min_rms
+        self._last_rms = 0.0
+        self.skipped_peak = 0
+        self.skipped_rms = 0
+        self.skipped_confidence = 0
+        self.passed = 0
+
+    def threshold(self):
+        return max(self.min_rms, self.noise_floor * self.margin)
+
+    def check_energy(self, window):
+        # max/min e dot não alocam arrays temporários
+        peak = max(float(window.max()), -float(window.min()))
+        rms = math.sqrt(float(np.dot(window, window)) / len(window))
+        threshold = self.threshold()
+        self._last_rms = rms
+
+        if rms < self.noise_floor:
+            self.noise_floor += 0.5 * (rms - self.noise_floor)
+        elif rms < threshold:
+            self.noise_floor += 0.01 * (rms - self.noise_floor)
+
+        if peak < self.min_peak:
+            self.skipped_peak += 1
+            return False
+        if rms < threshold:
+            self.skipped_rms += 1
+            return False
+        return True
+
+    def mark_unvoiced(self):
+        """O estimador não achou pitch no último quadro: trata a energia dele como ruído."""
+        self.noise_floor += 0.05 * (self._last_rms - self.noise_floor)
+
+    def check_confidence(self, confidence):
+        if confidence < self.min_confidence:
+            self.skipped_confidence += 1
+            return False
+        self.passed += 1
+        return True
+
+    def stats(self):
+        return {
+            "skipped_peak": self.skipped_peak,
+            "skipped_rms": self.skipped_rms,
+            "skipped_confidence": self.skipped_confidence,
+            "passed": self.passed,
+            "noise_floor": self.noise_floor,
+        }
+
+
+# ==============================================================================
+# CLASSE PITCH DETECTOR
+# ==============================================================================
+class PitchDetector:
+    def __init__(self, profile=DEFAULT_PROFILE, a4=A4_TUNING, rate=44100, estimator=DEFAULT_ESTIMATOR, ring=None,
+                 device_index=None, channel=0, channels=1):
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Perfil desconhecido: {profile}")
+        params = LATENCY_PROFILES[profile]
+        self.profile = profile
+        self.BUFFER_SIZE = params["block_size"]
+        self.WINDOW_SIZE = params["window_size"]
+        self.HOP_SIZE = params["hop_size"]
+        # Dispositivo de entrada (None = padrão) e canal lido de uma interface multicanal
+        self.CHANNELS = channels
+        self.device_index = device_index
+        self.channel = channel
+        self.RATE = rate
+        self.A4 = a4
+        self.NOTAS = NOTAS
+        self.running = False
+        self.current_note = None
+        self.current_freq = 0.0
+        self.current_confidence = 0.0
+        self.last_latency_ms = None  # Microfone -> current_note da última estimativa
+        self.time_to_first_estimate_ms = None  # start() -> primeira estimativa da tomada
+        self.analysis_errors = 0  # Janelas perdidas por exceção no estimador ou na análise
+        self.status = "fechado"
+        self._take_start = 0.0
+        self._closing = False
+        self._thread = None
+        self._stream = None
+        self._pa = None
+        self._pa_continue = None
+
+        # Tudo é alocado aqui: o caminho de captura/análise não aloca por bloco
+        self._allocate_analysis(estimator, ring)
+        self._data_ready = threading.Event()
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self._last_block = (0, 0.0)  # (amostras escritas, perf_counter) do último callback
+
+    def _allocate_analysis(self, estimator, ring):
+        """Ring de áudio, janela, estimador, portas e rastreador usados na captura e na análise."""
+        self.gate = SignalGate()
+        self.tracker = PitchTracker(self.HOP_SIZE / self.RATE, a4=self.A4, note_names=NOTAS)
+        self._ring = ring or RingBuffer(ring_capacity(self.WINDOW_SIZE, self.RATE))
+        self._window = np.zeros(self.WINDOW_SIZE, dtype=np.float32)
+        try:
+            self._estimator = create_estimator(estimator, self.WINDOW_SIZE, self.RATE)
+        except ImportError as e:
+            print(f"Estimador '{estimator}' indisponível ({e}), usando '{FALLBACK_ESTIMATOR}'")
+            self._estimator = create_estimator(FALLBACK_ESTIMATOR, self.WINDOW_SIZE, self.RATE)
+
+    def stats(self):
+        """Contadores das portas (gate.stats()) mais as janelas perdidas por erro na análise."""
+        return dict(self.gate.stats(), analysis_errors=self.analysis_errors)
+
+    def smoothing_latency_ms(self):
+        """Atraso médio somado pelo rastreador (mediana + Kalman)."""
+        return self.tracker.added_latency_ms()
+
+    def expected_latency_ms(self):
+        """Latência teórica do perfil: bloco de captura + espera do hop + meia janela (sem o rastreador)."""
+        samples = self.BUFFER_SIZE + self.HOP_SIZE + self.WINDOW_SIZE / 2
+        return 1000.0 * samples / self.RATE
+
+    def subscribe(self, maxsize=64):
+        """
+        Retorna uma fila que recebe cada PitchFrame assim que é estimado.
+        Se o consumidor atrasar, os quadros mais antigos são descartados.
+        """
+        q = queue.Queue(maxsize=maxsize)
+        with self._subscribers_lock:
+            self._subscribers = self._subscribers + [q]
+        return q
+
+    def unsubscribe(self, q):
+        with self._subscribers_lock:
+            self._subscribers = [s for s in self._subscribers if s is not q]
+
+    def _publish(self, frame):
+        for q in self._subscribers:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(frame)
+                except queue.Full:
+                    pass
+
+    def _analyze(self, end, capture_time):
+        """Estima o pitch da janela que termina na amostra absoluta `end`."""
+        self._ring.read(end, self._window)
+        freq, confidence = 0.0, 0.0
+        # Silêncio não chega ao estimador; estimativa pouco confiável vira silêncio
+        if self.gate.check_energy(self._window):
+            freq, confidence = self._estimator.estimate(self._window)
+            if not self._estimator.reports_confidence:
+                self.gate.passed += 1
+            elif not self.gate.check_confidence(confidence):
+                freq = 0.0
+            if freq <= 0:
+                self.gate.mark_unvoiced()
+        # Mediana + Kalman + histerese: um glitch isolado não troca a nota
+        freq, note = self.tracker.update(freq)
+        self.current_freq = float(freq)
+        self.current_confidence = confidence
+        self.current_note = note
+        return PitchFrame(end / self.RATE, self.current_freq, self.current_note, confidence, capture_time)
+
+    def iter_frames(self, blocks):
+        """
+        Modo offline: passa blocos de áudio já gravados pelo mesmo ring buffer e
+        estimador usados com o microfone, gerando um PitchFrame por hop.
+        """
+        ring = self._ring
+        next_end = ring.written + self.WINDOW_SIZE
+        self.tracker.reset()
+        for block in blocks:
+            ring.write(block)
+            while ring.written >= next_end:
+                yield self._analyze(next_end, None)
+                next_end += self.HOP_SIZE
+
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        # Roda na thread do PortAudio: só copia para o ring e sinaliza
+        samples = np.frombuffer(in_data, dtype=np.float32)
+        if self.CHANNELS > 1:
+            samples = samples[self.channel::self.CHANNELS]  # Quadros intercalados: fica só com o nosso canal
+        self._ring.write(samples)
+        self._last_block = (self._ring.written, time.perf_counter())
+        self._data_ready.set()
+        return (None, self._pa_continue)
+
+    def _open_stream(self):
+        # Importado sob demanda: ferramentas offline não precisam de PortAudio
+        import pyaudio
+
+        self._pa = pyaudio.PyAudio()
+        self._pa_continue = pyaudio.paContinue
+        self._stream = self._pa.open(format=pyaudio.paFloat32, channels=self.CHANNELS, rate=self.RATE,
+                                     input=True, input_device_index=self.device_index,
+                                     frames_per_buffer=self.BUFFER_SIZE,
+                                     stream_callback=self._audio_callback)
+        self._stream.start_stream()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def _stream_stalled(self):
+        if not self._stream.is_active():
+            return True
+        return time.perf_counter() - self._last_block[1] > STALL_TIMEOUT
+
+    def _analysis_failed(self, error):
+        # Um estimador quebrado não pode parecer silêncio: avisa uma vez e conta
+        if self.analysis_errors == 0:
+            print(f"Erro na análise de pitch: {error!r}")
+        self.analysis_errors += 1
+
+    def _session_loop(self):
+        """
+        Thread de vida longa: mantém o microfone aberto, reabre em segundo plano
+        se o dispositivo sumir e só analisa quadros enquanto `running` estiver ligado.
+        """
+        ring = self._ring
+        try:
+            self._estimator.estimate(self._window)  # Aquece o estimador antes da primeira tomada
+        except Exception as e:
+            self._analysis_failed(e)
+        next_end = self.WINDOW_SIZE
+
+        while not self._closing:
+            if self._stream is None:
+                try:
+                    self._open_stream()
+                    self._last_block = (ring.written, time.perf_counter())
+                    self.status = "ativo"
+                except Exception as e:
+                    self._close_stream()
+                    if self.status != "indisponível":
+                        print(f"Erro no detector: {e}")
+                    self.status = "indisponível"
+                    self._data_ready.wait(timeout=REOPEN_INTERVAL)
+                    self._data_ready.clear()
+                    continue
+
+            if self._stream_stalled():
+                print("Microfone parou de responder, reabrindo...")
+                self._close_stream()
+                self.status = "reabrindo"
+                continue
+
+            # Fora de uma tomada: acompanha o ring para que a próxima comece já com uma janela cheia
+            if not self.running:
+                next_end = max(ring.written, self.WINDOW_SIZE)
+
+            if not self.running or ring.written < next_end:
+                self._data_ready.clear()
+                if not self.running or ring.written < next_end:
+                    self._data_ready.wait(timeout=0.1)
+                continue
+
+            # Se a análise atrasou mais que o ring comporta, pula para o mais recente
+            if ring.written - next_end > ring.capacity - self.WINDOW_SIZE:
+                next_end = ring.written
+
+            try:
+                block_end, block_time = self._last_block
+                capture_time = block_time - (block_end - next_end) / self.RATE
+                frame = self._analyze(next_end, capture_time)
+                now = time.perf_counter()
+                frame.estimate_time = now
+                # Atraso até a amostra mais nova + meia janela (centro da análise)
+                self.last_latency_ms = 1000.0 * (now - capture_time + self.WINDOW_SIZE / 2 / self.RATE)
+                if self.time_to_first_estimate_ms is None:
+                    self.time_to_first_estimate_ms = 1000.0 * (now - self._take_start)
+                self._publish(frame)
+            except Exception as e:
+                self._analysis_failed(e)
+            next_end += self.HOP_SIZE
+
+        self._close_stream()
+        self.status = "fechado"
+
+    def open(self):
+        """Abre a sessão de captura em segundo plano (não bloqueia quem chama)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._closing = False
+            self.status = "abrindo"
+            self._thread = threading.Thread(target=self._session_loop, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Fecha o microfone de vez (saída do jogo)."""
+        self.running = False
+        self._closing = True
+        self._data_ready.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def start(self):
+        """Inicia uma tomada: com a sessão já aberta, só liga a análise."""
+        if not self.running:
+            self._take_start = time.perf_counter()
+            self.time_to_first_estimate_ms = None
+            self.tracker.reset()
+            self.running = True
+            self.open()
+            self._data_ready.set()
+
+    def stop(self):
+        """Encerra a tomada mantendo o microfone e o estimador aquecidos."""
+        self.running = False
+        self.current_note = None
+        self.current_freq = 0.0
+        self.current_confidence = 0.0
+
+    def get_note(self): return self.current_note
+    def get_freq(self): return self.current_freq
+    def get_latency_ms(self): return self.last_latency_ms
@@ -0,0 +1,219 @@
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# ==============================================================================
+# ESTIMADORES DE PITCH
+# ==============================================================================
+# Todo estimador recebe uma janela de `window_size` amostras float32 e devolve
+# (frequência em Hz, confiança de 0 a 1). Frequência 0.0 significa "sem pitch".
+
+try:
+    # NumPy >= 2.0: as FFTs escrevem num array pré-alocado (out=)
+    np.fft.irfft(np.fft.rfft(np.zeros(4), out=np.zeros(3, dtype=np.complex128)), n=4, out=np.zeros(4))
+    FFT_OUT = True
+except TypeError:
+    FFT_OUT = False  # NumPy 1.x: rfft/irfft alocam o resultado a cada quadro
+
+
+class PitchEstimator(ABC):
+    """Interface comum dos estimadores usados pelo PitchDetector."""
+
+    name = "base"
+    reports_confidence = True  # False quando a confiança devolvida não é informativa
+
+    def __init__(self, window_size, rate):
+        self.window_size = int(window_size)
+        self.rate = rate
+
+    @abstractmethod
+    def estimate(self, samples):
+        """(frequência em Hz, confiança de 0 a 1) da janela `samples`."""
+
+
+class AubioEstimator(PitchEstimator):
+    """Wrapper do aubio.pitch (precisa do aubio compilado)."""
+
+    name = "aubio"
+
+    def __init__(self, window_size, rate, method="default"):
+        super().__init__(window_size, rate)
+        # Importado sob demanda: o estimador NumPy funciona sem o aubio instalado
+        import aubio
+
+        # hop == janela: a sobreposição já é feita pelo ring buffer do detector
+        self._pitch = aubio.pitch(method, self.window_size, self.window_size, rate)
+        self._pitch.set_unit("Hz")
+        # No aubio 0.4.9 só estes métodos preenchem get_confidence(); os outros devolvem 0
+        self.reports_confidence = method in ("yin", "yinfast", "specacf")
+
+    def estimate(self, samples):
+        freq = float(self._pitch(samples)[0])
+        return freq, float(self._pitch.get_confidence())
+
+
+class YinEstimator(PitchEstimator):
+    """
+    YIN vetorizado em NumPy, com a função diferença calculada por FFT.
+    Os buffers intermediários, inclusive os espectros, são alocados uma vez e
+    reutilizados; com NumPy 1.x (sem out= nas FFTs) só as FFTs alocam.
+    """
+
+    name = "yin"
+
+    def __init__(self, window_size, rate, fmin=60.0, fmax=1500.0, threshold=0.15):
+        super().__init__(window_size, rate)
+        w = self.window_size
+        self.threshold = threshold
+        self._half = w // 2
+        self._tau_min = max(2, int(rate / fmax))
+        self._tau_max = min(self._half - 1, int(rate / fmin))
+
+        self._frame = np.zeros(w, dtype=np.float64)
+        self._head = np.zeros(w, dtype=np.float64)  # x[:w/2] com zeros no resto
+        self._sq = np.zeros(w, dtype=np.float64)
+        self._energy = np.zeros(w + 1, dtype=np.float64)  # soma acumulada de x²
+        self._diff = np.zeros(self._half, dtype=np.float64)
+        self._diff_sum = np.zeros(self._half, dtype=np.float64)
+        self._taus = np.arange(self._half, dtype=np.float64)
+        self._spec = np.zeros(w // 2 + 1, dtype=np.complex128)
+        self._head_spec = np.zeros(w // 2 + 1, dtype=np.complex128)
+        self._corr = np.zeros(w, dtype=np.float64)
+
+    def estimate(self, samples):
+        half = self._half
+        frame = self._frame
+        frame[:] = samples
+        self._head[:half] = frame[:half]
+
+        # Autocorrelação r(tau) = sum x[j] * x[j + tau] via FFT (sem wrap: n >= w)
+        if FFT_OUT:
+            spec = np.fft.rfft(frame, out=self._spec)
+            head_spec = np.fft.rfft(self._head, out=self._head_spec)
+        else:
+            spec = np.fft.rfft(frame)
+            head_spec = np.fft.rfft(self._head)
+        np.conjugate(head_spec, out=head_spec)
+        head_spec *= spec
+        if FFT_OUT:
+            corr = np.fft.irfft(head_spec, n=self.window_size, out=self._corr)[:half]
+        else:
+            corr = np.fft.irfft(head_spec, n=self.window_size)[:half]
+
+        # d(tau) = E(x[0:half]) + E(x[tau:tau+half]) - 2 r(tau)
+        np.square(frame, out=self._sq)
+        np.cumsum(self._sq, out=self._energy[1:])
+        diff = self._diff
+        np.subtract(self._energy[half:-1], self._energy[:half], out=diff)
+        diff += self._energy[half]
+        corr *= 2.0
+        diff -= corr
+
+        # Diferença normalizada pela média acumulada (CMND)
+        np.cumsum(diff, out=self._diff_sum)
+        self._diff_sum[0] = 1.0
+        diff *= self._taus
+        np.divide(diff, self._diff_sum, out=diff, where=self._diff_sum > 0)
+        diff[0] = 1.0
+
+        search = diff[self._tau_min:self._tau_max]
+        below = np.flatnonzero(search < self.threshold)
+        if len(below) == 0:
+            return 0.0, max(0.0, 1.0 - float(search.min()))
+
+        # Primeiro vale abaixo do limiar: desce até o mínimo local
+        tau = self._tau_min + int(below[0])
+        while tau + 1 < self._tau_max and diff[tau + 1] < diff[tau]:
+            tau += 1
+
+        # Interpolação parabólica para precisão sub-amostra
+        a, b, c = diff[tau - 1], diff[tau], diff[tau + 1]
+        denom = a - 2 * b + c
+        shift = 0.5 * (a - c) / denom if denom != 0 else 0.0
+        return self.rate / (tau + shift), max(0.0, 1.0 - float(b))
+
+
+ESTIMATORS = {
+    AubioEstimator.name: AubioEstimator,
+    YinEstimator.name: YinEstimator,
+}
+
+
+def create_estimator(name, window_size, rate):
+    if name not in ESTIMATORS:
+        raise ValueError(f"Estimador desconhecido: {name}")
+    return ESTIMATORS[name](window_size, rate)
+
+
+# ==============================================================================
+# BENCHMARK
+# ==============================================================================
+def _synthetic_voice(freqs, note_duration, rate, noise=0.02, seed=0):
+    """Sequência de notas com harmônicos e ruído, para comparar os estimadores."""
+    rng = np.random.default_rng(seed)
+    length = int(note_duration * rate)
+    t = np.arange(length) / rate
+    parts = []
+    for f in freqs:
+        wave = np.sin(2 * np.pi * f * t) + 0.5 * np.sin(2 * np.pi * 2 * f * t) + 0.25 * np.sin(2 * np.pi * 3 * f * t)
+        parts.append(wave / 1.75 * 0.5)
+    audio = np.concatenate(parts) + noise * rng.standard_normal(length * len(freqs))
+    truth = np.repeat(np.asarray(freqs, dtype=np.float64), length)
+    return audio.astype(np.float32), truth
+
+
+def benchmark_estimators(names=None, window_size=2048, hop_size=441, rate=44100, note_duration=0.5):
+    """
+    Roda cada estimador sobre o mesmo sinal e retorna, por estimador,
+    quadros/segundo e erro em cents (mediana e p95) contra a frequência real.
+    """
+    names = names or list(ESTIMATORS)
+    freqs = [98.0, 146.83, 196.0, 261.63, 329.63, 440.0, 587.33]
+    audio, truth = _synthetic_voice(freqs, note_duration, rate)
+    ends = np.arange(window_size, len(audio), hop_size)
+    # Só avalia janelas inteiramente dentro de uma nota
+    stable = truth[ends - window_size] == truth[ends - 1]
+
+    results = {}
+    for name in names:
+        try:
+            est = create_estimator(name, window_size, rate)
+        except ImportError as e:
+            results[name] = {"error": str(e)}
+            continue
+        window = np.zeros(window_size, dtype=np.float32)
+        found = np.zeros(len(ends))
+        start = time.perf_counter()
+        for i, end in enumerate(ends):
+            window[:] = audio[end - window_size:end]
+            found[i] = est.estimate(window)[0]
+        elapsed = time.perf_counter() - start
+
+        ok = stable & (found > 0)
+        cents = np.abs(1200 * np.log2(found[ok] / truth[ends[ok] - 1]))
+        results[name] = {
+            "frames_per_second": len(ends) / elapsed,
+            "median_cents": float(np.median(cents)) if len(cents) else None,
+            "p95_cents": float(np.percentile(cents, 95)) if len(cents) else None,
+            "voiced_ratio": float(ok.sum() / max(1, stable.sum())),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compara velocidade e precisão dos estimadores de pitch")
+    parser.add_argument("--window", type=int, default=2048)
+    parser.add_argument("--hop", type=int, default=441)
+    parser.add_argument("--rate", type=int, default=44100)
+    args = parser.parse_args()
+
+    for name, r in benchmark_estimators(window_size=args.window, hop_size=args.hop, rate=args.rate).items():
+        if "error" in r:
+            print(f"{name:>6}: indisponível ({r['error']})")
+            continue
+        print(f"{name:>6}: {r['frames_per_second']:8.0f} quadros/s | "
+              f"erro mediano {r['median_cents']:.2f} cents | p95 {r['p95_cents']:.2f} cents | "
+              f"quadros com pitch {100 * r['voiced_ratio']:.0f}%")
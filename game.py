@@ -1,12 +1,26 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # Importação -> primeiro quadro (F3)
+
+import os
 import pygame
 import numpy as np
 import threading
-import time
-import pyaudio
-import aubio
+import multiprocessing
+import queue
 import math
 import random
 from utils import calculate_similarity, is_similar_enough
+from detector import PitchDetector, A4_TUNING
+from shared_detector import ProcessPitchDetector
+from multiplayer import Player, PlayerSession
+from synth import NoteCache, PrefixRenderer, DiskNoteCache
+from mixer import StreamingMixer
+from playback import PlaybackScheduler
+from latency import LatencyStats, STAGES, STAGE_LABELS
+from graphics import GradientCache, TextCache, AlphaScratch, FontRegistry, quantize_size, surface_counter
+from compositor import Compositor, ALWAYS
+from pacing import FramePacer
+from profiler import FrameProfiler, PHASES, PHASE_LABELS
 
 # IMPORTAÇÃO DA NOVA ESTRUTURA
 from Musicas import BIBLIOTECA, Musica
@@ -18,92 +32,97 @@ button_cooldown_until = 0
 SAMPLE_RATE = 44100     # Padrão mais seguro
 LISTEN_DURATION = 10.0  
 REQUIRED_STABILITY = 1.0 
-A4_TUNING = 440.0       
+# A4_TUNING (Lá 4) fica em detector.py: render_library.py e grading.py usam o mesmo valor
 
 # AJUSTE FINO DE AFINAÇÃO
 TUNING_OFFSET = 0  
 TUNING_MULTIPLIER = 2 ** (TUNING_OFFSET / 12.0)
 
+# Perfil de captura do microfone: "low_latency", "balanced" ou "low_cpu"
+DETECTOR_PROFILE = "low_latency"
+# Estimador de pitch: "yin" (só NumPy, o mais preciso em estimators.py) ou "aubio"
+# (precisa do aubio compilado; sem ele, o detector volta para o "yin")
+DETECTOR_ESTIMATOR = "yin"
+# True: captura e estimativa num processo separado (memória compartilhada), longe do GIL do pygame
+DETECTOR_IN_PROCESS = False
+# Aula em grupo: um jogador por microfone (índice do PortAudio) ou por canal de uma
+# interface multicanal. Vazio = modo de um jogador com o microfone padrão.
+# Ex.: [{"name": "Ana", "device_index": 2}, {"name": "Bia", "device_index": 4, "channel": 1, "channels": 2}]
+GROUP_PLAYERS = []
+
 # ==============================================================================
-# 1. CLASSE PITCH DETECTOR
+# 1. DETECTOR DE PITCH (ver detector.py)
 # ==============================================================================
-class PitchDetector:
-    def __init__(self):
-        self.BUFFER_SIZE = 8192
-        self.FORMAT = pyaudio.paFloat32
-        self.CHANNELS = 1
-        self.RATE = 44100 
-        self.A4 = A4_TUNING
-        self.NOTAS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-        self.running = False
-        self.current_note = None
-        self.current_freq = 0.0
-        self._thread = None
-
-    def _freq_para_nota(self, freq):
-        if freq <= 0: return None
-        try:
-            n = 12 * math.log2(freq / self.A4) + 69
-            n_round = int(round(n))
-            nome = self.NOTAS[n_round % 12]
-            oitava = (n_round // 12) - 1
-            return f"{nome}{oitava}"
-        except ValueError:
-            return None
-
-    def _listen_loop(self):
-        p = pyaudio.PyAudio()
-        pitch_detector = aubio.pitch("default", self.BUFFER_SIZE*4, self.BUFFER_SIZE, self.RATE)
-        pitch_detector.set_unit("Hz")
-
-        try:
-            stream = p.open(format=self.FORMAT, channels=self.CHANNELS, rate=self.RATE, input=True, frames_per_buffer=self.BUFFER_SIZE)
-            while self.running:
-                try:
-                    audio_data = stream.read(self.BUFFER_SIZE, exception_on_overflow=False)
-                    samples = np.frombuffer(audio_data, dtype=np.float32)
-                    freq = pitch_detector(samples)[0]
-                    self.current_freq = float(freq)
-                    self.current_note = self._freq_para_nota(freq)
-                except Exception:
-                    pass
-        except Exception as e:
-            print(f"Erro no detector: {e}")
-        finally:
-            if 'stream' in locals():
-                stream.stop_stream()
-                stream.close()
-            p.terminate()
-
-    def start(self):
-        if not self.running:
-            self.running = True
-            self._thread = threading.Thread(target=self._listen_loop, daemon=True)
-            self._thread.start()
-
-    def stop(self):
-        self.running = False
-        if self._thread:
-            self._thread.join(timeout=1.0)
-            self._thread = None
-        self.current_note = None
-        self.current_freq = 0.0
-
-    def get_note(self): return self.current_note
-    def get_freq(self): return self.current_freq
-
-detector = PitchDetector()
+DetectorClass = ProcessPitchDetector if DETECTOR_IN_PROCESS else PitchDetector
+detector = None       # Criados em init_detector(): com spawn, o processo filho reimporta
+group_session = None  # este módulo como __mp_main__ e não pode recriar detectores
+
+# Latência por estágio (microfone -> agulha); F3 mostra o overlay
+LATENCY_REPORT_FILE = "latency_report.json"
+latency_stats = LatencyStats()
+
+
+def init_detector():
+    """Cria o detector (e um por jogador na aula em grupo); o microfone só abre em open()"""
+    global detector, group_session
+    detector = DetectorClass(profile=DETECTOR_PROFILE, a4=A4_TUNING, rate=SAMPLE_RATE,
+                             estimator=DETECTOR_ESTIMATOR)
+    latency_stats.metadata = {
+        "profile": DETECTOR_PROFILE,
+        "estimator": DETECTOR_ESTIMATOR,
+        "in_process": DETECTOR_IN_PROCESS,
+        "block_ms": 1000.0 * detector.BUFFER_SIZE / SAMPLE_RATE,
+        "half_window_ms": 1000.0 * detector.WINDOW_SIZE / 2 / SAMPLE_RATE,
+        "tracker_ms": detector.smoothing_latency_ms(),
+    }
+    # Um detector por jogador, cada um no seu processo (ver multiplayer.py)
+    if GROUP_PLAYERS:
+        group_session = PlayerSession([Player(**p) for p in GROUP_PLAYERS], profile=DETECTOR_PROFILE,
+                                      a4=A4_TUNING, rate=SAMPLE_RATE, estimator=DETECTOR_ESTIMATOR)
+
+latest_frame = None
+show_latency_overlay = False
+first_frame_ms = None
 
 # ==============================================================================
 # 2. INICIALIZAÇÃO E UI
 # ==============================================================================
-# Aumentei o buffer para 4096 para evitar "estalos" (crackling)
-pygame.mixer.pre_init(frequency=SAMPLE_RATE, size=-16, channels=2, buffer=4096)
-pygame.init()
+# Na importação nada é aberto nem criado: janela, fontes, áudio e detector vêm das
+# funções init_*(), para que processos filhos (spawn) possam importar este módulo
 
 WIDTH, HEIGHT = 1000, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Solfejo - Jogo Musical Interativo")
+screen = None
+
+# Surfaces do jogo são criadas por aqui, para contar quantas saem por quadro (F3)
+new_surface = surface_counter.surface
+# Textos renderizados ficam em cache (LRU limitado a TEXT_CACHE_MB); shadow=N desenha a sombra junto
+TEXT_CACHE_MB = 8
+text_cache = None   # Criado em init_display()
+render_text = None  # text_cache.render com tempo no perfil (F4)
+# Textos com transparência passam por uma Surface de rascunho: as do cache são compartilhadas
+alpha_scratch = None  # Criado em init_display()
+# Perfil por função de desenho e por fase do loop (F4 liga, mostra e grava PROFILE_CSV_FILE)
+PROFILE_CSV_FILE = "profile_frames.csv"
+profiler = FrameProfiler()
+# Cada tela = camada estática + widgets; só o que mudou vai para a janela (ver compositor.py)
+compositor = None  # Criado em init_display()
+
+def init_display():
+    """Abre o mixer de áudio e a janela do jogo, cria os caches de desenho e carrega as fontes e os botões"""
+    global screen, text_cache, render_text, alpha_scratch, gradient_cache, compositor, pacer
+    # Aumentei o buffer para 4096 para evitar "estalos" (crackling)
+    pygame.mixer.pre_init(frequency=SAMPLE_RATE, size=-16, channels=2, buffer=4096)
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Solfejo - Jogo Musical Interativo")
+    text_cache = TextCache(max_bytes=TEXT_CACHE_MB * 1024 * 1024)
+    render_text = profiler.timed("render_text")(text_cache.render)
+    alpha_scratch = AlphaScratch()
+    gradient_cache = GradientCache(max_bytes=GRADIENT_CACHE_MB * 1024 * 1024)
+    compositor = Compositor()
+    pacer = FramePacer(active_fps=FPS_ACTIVE, idle_fps=FPS_IDLE)
+    init_fonts()
+    init_buttons()
 
 # Cores - Tema Gradiente Roxo-Azul
 BG_DARK = (20, 15, 35)  # Roxo escuro base
@@ -134,63 +153,33 @@ GRAY_700 = (80, 70, 110)   # Roxo escuro
 GRAY_800 = (50, 40, 70)    # Roxo muito escuro
 
 # Tipografia Aprimorada - Montserrat
-def get_font(name, size, bold=False):
-    """Tenta carregar uma fonte, com fallback para alternativas"""
-    import os
-    
-    # Primeiro, tenta carregar de arquivo local (se existir)
-    font_files = [
-        f"fonts/{name}-Bold.ttf" if bold else f"fonts/{name}-Regular.ttf",
-        f"fonts/{name}Bold.ttf" if bold else f"fonts/{name}Regular.ttf",
-        f"fonts/{name}.ttf",
-    ]
-    
-    for font_file in font_files:
-        if os.path.exists(font_file):
-            try:
-                return pygame.font.Font(font_file, size)
-            except:
-                pass
-    
-    # Se não encontrou arquivo, tenta fontes do sistema
-    # Montserrat pode ter variações no nome dependendo do sistema
-    if name == "Montserrat":
-        font_names = [
-            "Montserrat", 
-            "Montserrat Bold" if bold else "Montserrat Regular",
-            "Montserrat-Bold" if bold else "Montserrat-Regular",
-            "Segoe UI",  # Fonte moderna similar
-            "Calibri",   # Fonte moderna similar
-            "Arial"      # Fallback final
-        ]
-    else:
-        font_names = [name, "Segoe UI", "Calibri", "Arial"]
-    
-    for font_name in font_names:
-        try:
-            if bold:
-                font = pygame.font.SysFont(font_name, size, bold=True)
-            else:
-                font = pygame.font.SysFont(font_name, size)
-            # Testa se a fonte foi carregada corretamente
-            test_surf = font.render("Test", True, (255, 255, 255))
-            if test_surf:
-                return font
-        except:
-            continue
-    
-    # Fallback final: fonte padrão do pygame
-    return pygame.font.Font(None, size)
+# Cada família é resolvida para um arquivo uma vez (e lembrada em FONT_CACHE_FILE entre
+# execuções); cada tamanho vira uma Font só na primeira vez que é pedido.
+# SOLFEJO_FONT_CACHE troca o arquivo (o benchmark usa um temporário)
+FONT_CACHE_FILE = os.environ.get("SOLFEJO_FONT_CACHE", ".font_cache.json")
+font_registry = None  # Criado em init_fonts()
 
-# Inicializa as fontes com Montserrat (ou fallback)
-FONT_TITLE = get_font("Montserrat", 72, bold=True)  # Aumentado de 56 para 72
-FONT_TITLE_LARGE = get_font("Montserrat", 96, bold=True)  # Fonte extra grande para animação
-FONT_SUBTITLE = get_font("Montserrat", 32, bold=True)
-FONT_HEADING = get_font("Montserrat", 28, bold=True)
-FONT = get_font("Montserrat", 22, bold=False)
-FONT_SMALL = get_font("Montserrat", 18, bold=False)
-FONT_TINY = get_font("Montserrat", 14, bold=False)
-CLOCK = pygame.time.Clock()
+def get_font(name, size, bold=False):
+    """Tenta carregar uma fonte, com fallback para alternativas (ver FontRegistry em graphics.py)"""
+    return font_registry.get(name, size, bold)
+
+def init_fonts():
+    """Inicializa as fontes com Montserrat (ou fallback)"""
+    global font_registry, FONT_TITLE, FONT_TITLE_LARGE, FONT_SUBTITLE, FONT_HEADING, FONT, FONT_SMALL, FONT_TINY
+    pygame.font.init()
+    font_registry = FontRegistry(directory="fonts", cache_file=FONT_CACHE_FILE)
+    FONT_TITLE = get_font("Montserrat", 72, bold=True)  # Aumentado de 56 para 72
+    FONT_TITLE_LARGE = get_font("Montserrat", 96, bold=True)  # Fonte extra grande para animação
+    FONT_SUBTITLE = get_font("Montserrat", 32, bold=True)
+    FONT_HEADING = get_font("Montserrat", 28, bold=True)
+    FONT = get_font("Montserrat", 22, bold=False)
+    FONT_SMALL = get_font("Montserrat", 18, bold=False)
+    FONT_TINY = get_font("Montserrat", 14, bold=False)
+
+# 60 fps com animação ou detector ouvindo; parado, o loop espera eventos (ver pacing.py)
+FPS_ACTIVE = 60
+FPS_IDLE = 4
+pacer = None  # Criado em init_display()
 
 # Tabela de Frequências Base
 NOTAS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
@@ -204,6 +193,12 @@ for i, nome in enumerate(NOTAS):
 # 3. SINTETIZADOR DE PIANO CORRIGIDO (LIMITER + VOLUME BAIXO)
 # ==============================================================================
 class Button:
+    """
+    As três aparências (normal, hover e pressionado) são rasterizadas uma vez,
+    com sombra, gradiente, máscara e texto já compostos, e desenhar vira um
+    único blit. Mudar texto, cor, fonte ou tamanho refaz as sprites.
+    """
+
     def __init__(self, text, rect, color=ACCENT, hover=None, icon=None, font=None):
         self.text = text
         self.rect = pygame.Rect(rect)
@@ -213,109 +208,221 @@ class Button:
         self.icon = icon
         self.font = font or FONT
         self.pressed = False
-
-    def draw(self, surf):
-        m = pygame.mouse.get_pos()
-        is_hover = self.rect.collidepoint(m)
-        is_pressed = is_hover and pygame.mouse.get_pressed()[0]
+        self._sprites = {}
+        self._sprite_key = None
+
+    def _render_sprite(self, is_hover, is_pressed):
+        """
+        Compõe uma aparência numa Surface com alfa pré-multiplicado, que cobre
+        o botão mais os 2 px da sombra e o 1 px do deslocamento ao pressionar.
+        """
+        w, h = self.rect.size
+        sprite = new_surface((w, h + 3), pygame.SRCALPHA)
+
+        def compose(layer, pos):
+            # convert_alpha() antes: premul_alpha() embaralha Surfaces com pitch
+            # maior que a largura, como as que o font.render devolve
+            sprite.blit(layer.convert_alpha().premul_alpha(), pos, special_flags=pygame.BLEND_PREMULTIPLIED)
 
         # Offset muito sutil para efeito de press
         offset = 1 if is_pressed else 0
-        draw_rect = self.rect.copy()
-        draw_rect.y += offset
 
         # Border radius mais arredondado (formato de pílula - usa metade da altura)
         # Mas limita a um máximo para não ficar muito extremo
-        border_radius = min(draw_rect.h // 2, 35)
+        border_radius = min(h // 2, 35)
 
         # Sombra muito sutil e suave (minimalista)
         if not is_pressed:
-            shadow_rect = draw_rect.copy()
-            shadow_rect.y += 2
-            shadow_surf = pygame.Surface((shadow_rect.w, shadow_rect.h), pygame.SRCALPHA)
+            shadow_surf = new_surface((w, h), pygame.SRCALPHA)
             # Sombra muito mais suave e translúcida
             pygame.draw.rect(shadow_surf, (0, 0, 0, 20), shadow_surf.get_rect(), border_radius=border_radius)
-            surf.blit(shadow_surf, shadow_rect.topleft)
+            compose(shadow_surf, (0, 2))
 
         # Cor base com leve ajuste no hover
         base_col = self.hover if is_hover else self.color
-        
+
         # Gradiente muito mais sutil (quase imperceptível)
         col_start = tuple(min(255, c + 8) for c in base_col)
         col_end = tuple(max(0, c - 5) for c in base_col)
-        
+
         # Desenha o botão arredondado com gradiente
-        # Cria superfície temporária para aplicar o gradiente com border radius
-        button_surf = pygame.Surface((draw_rect.w, draw_rect.h), pygame.SRCALPHA)
-        
-        # Desenha o gradiente
-        draw_gradient(button_surf, (0, 0, draw_rect.w, draw_rect.h), col_start, col_end, vertical=True)
-        
+        button_surf = new_surface((w, h), pygame.SRCALPHA)
+        draw_gradient(button_surf, (0, 0, w, h), col_start, col_end, vertical=True)
+
         # Cria máscara arredondada
-        mask = pygame.Surface((draw_rect.w, draw_rect.h), pygame.SRCALPHA)
-        pygame.draw.rect(mask, (255, 255, 255, 255), (0, 0, draw_rect.w, draw_rect.h), border_radius=border_radius)
-        
+        mask = new_surface((w, h), pygame.SRCALPHA)
+        pygame.draw.rect(mask, (255, 255, 255, 255), (0, 0, w, h), border_radius=border_radius)
+
         # Aplica máscara ao botão (multiplica alphas para criar bordas arredondadas)
         button_surf.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-        
+
         # Aplica leve transparência se não estiver em hover
         if not is_hover:
-            button_surf.set_alpha(240)
-        
-        surf.blit(button_surf, draw_rect.topleft)
+            button_surf.fill((255, 255, 255, 240), special_flags=pygame.BLEND_RGBA_MULT)
+        compose(button_surf, (0, offset))
 
         # Sem bordas - design minimalista
         # Apenas uma borda muito sutil no hover
         if is_hover and not is_pressed:
             border_color = tuple(min(255, c + 20) for c in base_col)
-            pygame.draw.rect(surf, border_color, draw_rect, width=1, border_radius=border_radius)
+            pygame.draw.rect(sprite, border_color, (0, offset, w, h), width=1, border_radius=border_radius)
 
         # Texto com ícone (se houver) - cor mais suave
         text_color = WHITE if is_hover else (245, 245, 250)  # Branco levemente acinzentado quando não hover
-        text_surf = self.font.render(self.text, True, text_color)
-        
+        text_surf = render_text(self.font, self.text, True, text_color)
+
         if self.icon:
-            icon_surf = FONT_HEADING.render(self.icon, True, text_color)
+            icon_surf = render_text(FONT_HEADING, self.icon, True, text_color)
             total_width = icon_surf.get_width() + 10 + text_surf.get_width()
-            start_x = draw_rect.x + (draw_rect.w - total_width) // 2
-            surf.blit(icon_surf, (start_x, draw_rect.y + (draw_rect.h - icon_surf.get_height()) // 2))
-            surf.blit(text_surf, (start_x + icon_surf.get_width() + 10,
-                                 draw_rect.y + (draw_rect.h - text_surf.get_height()) // 2))
+            start_x = (w - total_width) // 2
+            compose(icon_surf, (start_x, offset + (h - icon_surf.get_height()) // 2))
+            compose(text_surf, (start_x + icon_surf.get_width() + 10, offset + (h - text_surf.get_height()) // 2))
         else:
-            surf.blit(text_surf, (draw_rect.x + (draw_rect.w - text_surf.get_width()) // 2,
-                                 draw_rect.y + (draw_rect.h - text_surf.get_height()) // 2))
+            compose(text_surf, ((w - text_surf.get_width()) // 2, offset + (h - text_surf.get_height()) // 2))
+
+        return sprite
+
+    def sprite(self, is_hover, is_pressed):
+        key = (self.text, self.color, self.hover, self.icon, self.font, self.rect.size)
+        if key != self._sprite_key:
+            self._sprites.clear()
+            self._sprite_key = key
+        state = (is_hover, is_pressed)
+        sprite = self._sprites.get(state)
+        if sprite is None:
+            sprite = self._sprites[state] = self._render_sprite(is_hover, is_pressed)
+        return sprite
+
+    def _mouse_state(self):
+        is_hover = self.rect.collidepoint(pygame.mouse.get_pos())
+        return is_hover, is_hover and pygame.mouse.get_pressed()[0]
+
+    def bounds(self):
+        """Área que draw() pinta: o botão, a sombra e o deslocamento do press."""
+        return pygame.Rect(self.rect.x, self.rect.y, self.rect.w, self.rect.h + 3)
+
+    def appearance(self):
+        """Chave do que draw() desenharia agora (o compositor só redesenha quando muda)."""
+        return (self.text, self.color, self.hover, self.icon, self.font, self.rect.size) + self._mouse_state()
+
+    @profiler.timed("Button.draw")
+    def draw(self, surf):
+        is_hover, is_pressed = self._mouse_state()
+        surf.blit(self.sprite(is_hover, is_pressed), self.rect.topleft, special_flags=pygame.BLEND_PREMULTIPLIED)
 
     def clicked(self, event):
         return event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos)
 
+def button_widget(btn):
+    """(id, retângulo, chave, draw, animado) do botão: só é redesenhado quando hover/press muda"""
+    return btn, btn.bounds(), btn.appearance(), btn.draw, False
+
+def draw_button(btn):
+    """Declara o botão como widget da tela atual"""
+    compositor.widget(*button_widget(btn))
+
 played_notes = []
 played_past_notes = []
-currently_playing = False
+
+# Notas já sintetizadas, prontas para tocar (LRU limitado a NOTE_CACHE_MB)
+NOTE_CACHE_MB = 32
+# Notas gravadas em disco entre execuções (None desliga); a pasta é refeita se a síntese mudar
+NOTE_DISK_CACHE_DIR = ".note_cache"
+NOTE_DISK_CACHE_MB = 256
+
+
+def create_disk_cache():
+    if not NOTE_DISK_CACHE_DIR:
+        return None
+    try:
+        return DiskNoteCache(NOTE_DISK_CACHE_DIR, rate=SAMPLE_RATE, tuning_multiplier=TUNING_MULTIPLIER,
+                             a4=A4_TUNING, max_bytes=NOTE_DISK_CACHE_MB * 1024 * 1024)
+    except OSError as e:
+        print(f"Cache de notas em disco indisponível: {e}")
+        return None
+
+
+# Cache de notas, buffer do replay e mixer são criados em init_audio(): um processo
+# filho (spawn) que reimporta este módulo não aloca nada disso
+note_cache = None
+
+# Notas reveladas num único buffer: "Repetir Notas" é um Sound.play() só
+replay_renderer = None
+
+# Um stream de saída com vozes fixas (ver mixer.py); sem PortAudio, cai no pygame.mixer
+MIXER_VOICES = 16
+audio_mixer = None
+
+
+def _start_note(freq, duration):
+    """Começa a nota no mixer (ou no pygame.mixer) e devolve o handle para parar."""
+    if audio_mixer.available:
+        samples = note_cache.samples(freq, duration)
+        return ("voice", audio_mixer.note_on(samples)) if samples is not None else None
+    snd = note_cache.get(freq, duration)
+    return ("channel", snd.play()) if snd is not None else None
+
+
+def _start_replay():
+    if replay_renderer.length == 0:
+        return None
+    if audio_mixer.available:
+        return ("voice", audio_mixer.note_on(replay_renderer.samples()))
+    return ("channel", replay_renderer.play())
+
+
+def _stop_playback(handle):
+    kind, h = handle
+    if kind == "voice":
+        audio_mixer.note_off(h)
+    elif h is not None:
+        h.fadeout(50)
+
+
+def _output_sounding():
+    """True enquanto a saída ainda toca (inclusive o release de RELEASE_MS das notas paradas)."""
+    if audio_mixer.available:
+        return audio_mixer.busy()
+    return pygame.mixer.get_init() is not None and pygame.mixer.get_busy()
+
+
+# Uma thread só para tocar: cada clique novo interrompe o anterior (ver playback.py)
+playback = None
+
+
+def init_audio(open_output=True):
+    """Cria os caches de notas e o mixer, abre o stream de saída (open_output) e a thread de reprodução"""
+    global note_cache, replay_renderer, audio_mixer, playback
+    note_cache = NoteCache(max_bytes=NOTE_CACHE_MB * 1024 * 1024, rate=SAMPLE_RATE,
+                           tuning_multiplier=TUNING_MULTIPLIER, disk=create_disk_cache())
+    replay_renderer = PrefixRenderer(rate=SAMPLE_RATE, tuning_multiplier=TUNING_MULTIPLIER)
+    audio_mixer = StreamingMixer(rate=SAMPLE_RATE, voices=MIXER_VOICES)
+    if open_output:
+        audio_mixer.open()
+    playback = PlaybackScheduler(stop=_stop_playback, sounding=_output_sounding)
+
+
+def play_replay():
+    sync_replay()
+    playback.request([(_start_replay, replay_renderer.length / SAMPLE_RATE)])
+
+
+def sync_replay():
+    """Estende o buffer do replay até current_index (só renderiza a nota nova)."""
+    replay_renderer.sync((NOTE_FREQS[nome], duracao) for nome, duracao in current_song_seq[:current_index])
+
+# Gradientes montados uma vez e reaproveitados (LRU limitado a GRADIENT_CACHE_MB)
+GRADIENT_CACHE_MB = 24
+gradient_cache = None  # Criado em init_display()
 
 # Função para desenhar gradiente
+@profiler.timed()
 def draw_gradient(surf, rect, color_start, color_end, vertical=True):
-    """Desenha um gradiente linear no retângulo especificado"""
-    rect = pygame.Rect(rect)
-    gradient_surf = pygame.Surface((rect.w, rect.h))
-    
-    if vertical:
-        for y in range(rect.h):
-            ratio = y / rect.h
-            r = int(color_start[0] * (1 - ratio) + color_end[0] * ratio)
-            g = int(color_start[1] * (1 - ratio) + color_end[1] * ratio)
-            b = int(color_start[2] * (1 - ratio) + color_end[2] * ratio)
-            pygame.draw.line(gradient_surf, (r, g, b), (0, y), (rect.w, y))
-    else:
-        for x in range(rect.w):
-            ratio = x / rect.w
-            r = int(color_start[0] * (1 - ratio) + color_end[0] * ratio)
-            g = int(color_start[1] * (1 - ratio) + color_end[1] * ratio)
-            b = int(color_start[2] * (1 - ratio) + color_end[2] * ratio)
-            pygame.draw.line(gradient_surf, (r, g, b), (x, 0), (x, rect.h))
-    
-    surf.blit(gradient_surf, rect.topleft)
+    """Desenha um gradiente linear no retângulo especificado (pré-renderizado, ver graphics.py)"""
+    gradient_cache.draw(surf, rect, color_start, color_end, vertical)
 
 # Função helper para desenhar cards com sombra e gradiente (minimalista)
+@profiler.timed()
 def draw_card(surf, rect, color=BG_CARD, border_radius=20, shadow=True, gradient=False):
     """Desenha um card minimalista com sombra suave e bordas arredondadas"""
     rect = pygame.Rect(rect)
@@ -324,7 +431,7 @@ def draw_card(surf, rect, color=BG_CARD, border_radius=20, shadow=True, gradient
         # Sombra muito mais suave e minimalista
         shadow_rect = rect.copy()
         shadow_rect.y += 2
-        shadow_surf = pygame.Surface((shadow_rect.w, shadow_rect.h), pygame.SRCALPHA)
+        shadow_surf = new_surface((shadow_rect.w, shadow_rect.h), pygame.SRCALPHA)
         # Sombra muito translúcida
         pygame.draw.rect(shadow_surf, (0, 0, 0, 15), shadow_surf.get_rect(), border_radius=border_radius)
         surf.blit(shadow_surf, shadow_rect.topleft)
@@ -346,10 +453,7 @@ def draw_card(surf, rect, color=BG_CARD, border_radius=20, shadow=True, gradient
 # Função para desenhar texto com sombra
 def draw_text_with_shadow(surf, text, font, color, pos, shadow_offset=2):
     """Desenha texto com sombra para melhor legibilidade"""
-    shadow = font.render(text, True, (0, 0, 0))
-    text_surf = font.render(text, True, color)
-    surf.blit(shadow, (pos[0] + shadow_offset, pos[1] + shadow_offset))
-    surf.blit(text_surf, pos)
+    surf.blit(render_text(font, text, True, color, shadow=shadow_offset), pos)
 
 # Função para desenhar badge (vidas, pontos) com gradiente minimalista
 def draw_badge(surf, text, rect, color=ACCENT, icon=None):
@@ -359,7 +463,7 @@ def draw_badge(surf, text, rect, color=ACCENT, icon=None):
     # Sombra muito suave
     shadow_rect = rect.copy()
     shadow_rect.y += 1
-    shadow_surf = pygame.Surface((shadow_rect.w, shadow_rect.h), pygame.SRCALPHA)
+    shadow_surf = new_surface((shadow_rect.w, shadow_rect.h), pygame.SRCALPHA)
     pygame.draw.rect(shadow_surf, (0, 0, 0, 12), shadow_surf.get_rect(), border_radius=20)
     surf.blit(shadow_surf, shadow_rect.topleft)
 
@@ -371,15 +475,15 @@ def draw_badge(surf, text, rect, color=ACCENT, icon=None):
     # Sem borda - design minimalista
 
     if icon:
-        icon_surf = FONT_HEADING.render(icon, True, WHITE)
-        text_surf = FONT_SMALL.render(text, True, WHITE)
+        icon_surf = render_text(FONT_HEADING, icon, True, WHITE)
+        text_surf = render_text(FONT_SMALL, text, True, WHITE)
         total_width = icon_surf.get_width() + 8 + text_surf.get_width()
         start_x = rect.x + (rect.w - total_width) // 2
         surf.blit(icon_surf, (start_x, rect.y + (rect.h - icon_surf.get_height()) // 2))
         surf.blit(text_surf, (start_x + icon_surf.get_width() + 8,
                              rect.y + (rect.h - text_surf.get_height()) // 2))
     else:
-        text_surf = FONT_SMALL.render(text, True, WHITE)
+        text_surf = render_text(FONT_SMALL, text, True, WHITE)
         surf.blit(text_surf, (rect.x + (rect.w - text_surf.get_width()) // 2,
                              rect.y + (rect.h - text_surf.get_height()) // 2))
 
@@ -391,6 +495,7 @@ def cents_difference(freq, target_freq):
     return 1200 * math.log2(freq / target_freq)
 
 
+@profiler.timed()
 def draw_needle_gauge(surf, rect, current_freq, target_freq, tolerance_hz=None, min_freq=0.0, max_freq=500.0):
     """Mostra uma agulha absoluta de 0 Hz a 400 Hz, destacando a posição do alvo."""
     rect = pygame.Rect(rect)
@@ -438,114 +543,56 @@ def draw_needle_gauge(surf, rect, current_freq, target_freq, tolerance_hz=None,
         pygame.draw.circle(surf, ACCENT, (target_x, bar_y - 12), 4)
 
     label_font = FONT_TINY
-    left = label_font.render(f"{min_f:.0f} Hz", True, TEXT_SECONDARY)
+    left = render_text(label_font, f"{min_f:.0f} Hz", True, TEXT_SECONDARY)
     mid_val = (min_f + max_f) / 2
-    mid = label_font.render(f"{mid_val:.0f} Hz", True, TEXT_SECONDARY)
-    right = label_font.render(f"{max_f:.0f} Hz", True, TEXT_SECONDARY)
+    mid = render_text(label_font, f"{mid_val:.0f} Hz", True, TEXT_SECONDARY)
+    right = render_text(label_font, f"{max_f:.0f} Hz", True, TEXT_SECONDARY)
     surf.blit(left, (bar_x, bar_y + 20))
     surf.blit(mid, (bar_x + (bar_w - mid.get_width()) // 2, bar_y + 20))
     surf.blit(right, (bar_x + bar_w - right.get_width(), bar_y + 20))
 
-def synth_piano_note(base_freq, duration=1.0, volume=0.3): # Volume padrão reduzido para 0.3
-    """
-    Gera som de piano elétrico com proteção contra distorção (Clipping).
-    """
-    if base_freq <= 0: return None
-    
-    # Aplica correção de afinação
-    freq = base_freq * TUNING_MULTIPLIER
-    
-    length = int(SAMPLE_RATE * duration)
-    t = np.linspace(0, duration, length, False)
-    
-    # 1. Fundamental
-    wave = np.sin(2 * np.pi * freq * t)
-    
-    # 2. Harmônicos (Reduzidos para evitar sobrecarga)
-    wave += 0.4 * np.sin(2 * np.pi * (freq * 2) * t) 
-    wave += 0.1 * np.sin(2 * np.pi * (freq * 3) * t)
-    
-    # 3. Envelope (Decay Suave)
-    decay = np.exp(-t * 3) 
-    wave *= decay
-    
-    # 4. NORMALIZAÇÃO E LIMITER (O SEGREDO PARA NÃO ESTOURAR)
-    # Primeiro, normaliza para o maior pico ser 1.0
-    max_val = np.max(np.abs(wave))
-    if max_val > 0:
-        wave = wave / max_val
-    
-    # Aplica o volume desejado
-    wave = wave * volume
-    
-    # CLAMP: Garante que NENHUM número passe de 0.99 ou -0.99
-    # Isso impede a distorção digital (clipping)
-    wave = np.clip(wave, -0.99, 0.99)
-    
-    # 5. Converte para 16-bit
-    wave = (wave * 32767).astype(np.int16)
-    
-    stereo = np.column_stack((wave, wave))
-    return stereo
-
 def play_note(freq, duration, record=True):
-    global currently_playing
-    currently_playing = True
-    
+    """Agenda a nota no playback (não bloqueia); interrompe o que estiver tocando."""
     if record:
         played_notes.append((float(freq), duration))
-    
-    try:
-        stereo_buf = synth_piano_note(freq, duration)
-        
-        if stereo_buf is not None:
-            snd = pygame.sndarray.make_sound(stereo_buf)
-            channel = snd.play()
-            
-            # Fadeout suave se a nota for longa
-            start_t = time.time()
-            while channel.get_busy() and (time.time() - start_t) < duration:
-                pygame.time.wait(10)
-            
-            if (time.time() - start_t) >= duration:
-                channel.fadeout(50)
-        else:
-            time.sleep(duration)
-            
-    except Exception as e:
-        print(f"Erro audio: {e}")
-        time.sleep(duration)
-    
-    time.sleep(0.05)
-    currently_playing = False
+    playback.request([(lambda: _start_note(freq, duration), duration)])
 
 
 # ==============================================================================
 # 4. LÓGICA DO DETECTOR
 # ==============================================================================
 def detector_process(target_note_name):
-    global message, detected_name, detected_freq, detector_result, detected_deviation_hz
+    global message, detected_name, detected_freq, detector_result, detected_deviation_hz, latest_frame
 
     detected_name = None
     detected_freq = None
     detector_result = None
     detected_deviation_hz = None
 
-    while currently_playing:
-        time.sleep(0.01)
+    playback.wait_finished()  # Não ouvir a própria nota de referência
 
+    frames = detector.subscribe()
     detector.start()
     message = "Prepare-se... Cante e SEGURE a nota!"
     target_freq = NOTE_FREQS.get(target_note_name)
     tolerance_hz = 30.0
     
     session_start_time = time.time()
-    stable_start_time = None 
+    stable_start_time = None  # Em segundos de áudio (PitchFrame.timestamp)
     found_match = False
     
     while time.time() - session_start_time < LISTEN_DURATION:
-        note_completa = detector.get_note()
-        freq = detector.get_freq()
+        # Acorda exatamente quando o detector publica um novo quadro
+        try:
+            frame = frames.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        frame.consume_time = time.perf_counter()
+        latency_stats.record_consumed(frame)
+        latest_frame = frame
+
+        note_completa = frame.note
+        freq = frame.freq
         
         if note_completa:
             detected_name = note_completa
@@ -557,9 +604,9 @@ def detector_process(target_note_name):
 
             if within_tolerance:
                 if stable_start_time is None:
-                    stable_start_time = time.time()
+                    stable_start_time = frame.timestamp
 
-                elapsed = time.time() - stable_start_time
+                elapsed = frame.timestamp - stable_start_time
                 message = f"Mantenha por {REQUIRED_STABILITY - elapsed:.1f}s" if elapsed < REQUIRED_STABILITY else "Nota estável!"
 
                 if elapsed >= REQUIRED_STABILITY:
@@ -581,17 +628,30 @@ def detector_process(target_note_name):
                 message = f"Silêncio... alvo {target_note_name} ({target_freq:.1f} Hz)"
             else:
                 message = "Silêncio..."
-        
-        time.sleep(0.05)
 
+    detector.unsubscribe(frames)
     detector.stop()
 
     if not found_match:
         detector_result = False
         message = "Tempo esgotado."
 
+def group_detector_process(target_note_name):
+    global message, detector_result
+
+    detector_result = None
+    playback.wait_finished()
+
+    message = "Todos: cantem e SEGUREM a nota!"
+    singers = group_session.listen(target_note_name, LISTEN_DURATION, REQUIRED_STABILITY)
+
+    hits = sum(1 for p in singers if p.result)
+    detector_result = hits > 0
+    message = f"{hits} de {len(singers)} jogadores sustentaram {target_note_name}"
+
 def start_detector_thread(target_note):
-    t = threading.Thread(target=detector_process, args=(target_note,), daemon=True)
+    target = group_detector_process if group_session else detector_process
+    t = threading.Thread(target=target, args=(target_note,), daemon=True)
     t.start()
 
 # ==============================================================================
@@ -609,7 +669,6 @@ message = ""
 user_text = ""
 input_active = False
 guess_modal_open = False
-currently_playing = False
 detected_name = None
 detected_freq = None
 detected_deviation_hz = None
@@ -625,23 +684,36 @@ music_animation_start_time = 0
 MUSIC_ANIMATION_DURATION = 2.5  # Duração em segundos
 music_animation_message = ""
 
-btn_start = Button("INICIAR", (WIDTH//2 - 160, 220, 320, 70), color=ACCENT, font=FONT_HEADING)
-btn_rules = Button("REGRAS", (WIDTH//2 - 160, 310, 320, 60), color=(100, 70, 150), hover=(120, 90, 170), font=FONT)
-btn_conf = Button("CONFIGURAÇÕES", (WIDTH//2 - 160, 390, 320, 60), color=(100, 70, 150), hover=(120, 90, 170), font=FONT)
-btn_back = Button("VOLTAR", (30, HEIGHT-80, 140, 50), color=GRAY_700, hover=(100, 90, 130), font=FONT_SMALL)
-btn_menu = Button("MENU", (WIDTH-180, HEIGHT-80, 150, 50), color=DANGER, hover=DANGER_HOVER, font=FONT_SMALL)
+def init_buttons():
+    """Cria os botões (dependem das fontes de init_fonts())"""
+    global btn_start, btn_rules, btn_conf, btn_back, btn_menu, btn_repeat, btn_action_sing, btn_guess
+    global btn_play_target, btn_start_listen, btn_skip_confirm, btn_play_here
+    global btn_modal_confirm, btn_modal_cancel, btn_play_again, btn_menu_gameover
+    btn_start = Button("INICIAR", (WIDTH//2 - 160, 220, 320, 70), color=ACCENT, font=FONT_HEADING)
+    btn_rules = Button("REGRAS", (WIDTH//2 - 160, 310, 320, 60), color=(100, 70, 150), hover=(120, 90, 170), font=FONT)
+    btn_conf = Button("CONFIGURAÇÕES", (WIDTH//2 - 160, 390, 320, 60), color=(100, 70, 150), hover=(120, 90, 170), font=FONT)
+    btn_back = Button("VOLTAR", (30, HEIGHT-80, 140, 50), color=GRAY_700, hover=(100, 90, 130), font=FONT_SMALL)
+    btn_menu = Button("MENU", (WIDTH-180, HEIGHT-80, 150, 50), color=DANGER, hover=DANGER_HOVER, font=FONT_SMALL)
+
+    btn_repeat = Button("Repetir Notas", (60, 280, 300, 60), color=(80, 60, 120), hover=(100, 80, 140))
+    btn_action_sing = Button("CANTAR NOTA", (60, 360, 300, 60), color=WARNING)
+    btn_guess = Button("ADVINHAR MÚSICA", (60, 440, 300, 60), color=ACCENT)
+
+    btn_play_target = Button("Ouvir Nota Alvo", (WIDTH-280, 140, 240, 55), color=WARNING)
+    btn_start_listen = Button("Gravar (Mic)", (WIDTH-280, 215, 240, 55), color=SUCCESS)
+    btn_skip_confirm = Button("Confirmar", (WIDTH-280, 290, 240, 55), color=ACCENT)
 
-btn_repeat = Button("Repetir Notas", (60, 280, 300, 60), color=(80, 60, 120), hover=(100, 80, 140))
-btn_action_sing = Button("CANTAR NOTA", (60, 360, 300, 60), color=WARNING)
-btn_guess = Button("ADVINHAR MÚSICA", (60, 440, 300, 60), color=ACCENT)
+    btn_play_here = Button("Ouvir", (600, 160, 150, 50), color=WARNING, font=FONT_SMALL)
 
-btn_play_target = Button("Ouvir Nota Alvo", (WIDTH-280, 140, 240, 55), color=WARNING)
-btn_start_listen = Button("Gravar (Mic)", (WIDTH-280, 215, 240, 55), color=SUCCESS)
-btn_skip_confirm = Button("Confirmar", (WIDTH-280, 290, 240, 55), color=ACCENT)
+    # Botões do modal de adivinhar música (posicionados em draw_guess_modal)
+    btn_modal_confirm = Button("CONFIRMAR", (0, 0, 200, 55), color=SUCCESS, hover=SUCCESS_HOVER, font=FONT)
+    btn_modal_cancel = Button("CANCELAR", (0, 0, 200, 55), color=DANGER, hover=DANGER_HOVER, font=FONT)
 
-# Botões do modal de adivinhar música (serão criados dinamicamente)
-btn_modal_confirm = None
-btn_modal_cancel = None
+    # Botões do game over (instâncias fixas: as sprites são reaproveitadas entre quadros)
+    btn_play_again = Button("JOGAR NOVAMENTE", (WIDTH//2 - 150, HEIGHT//2 - 250 + 390, 300, 60),
+                            color=SUCCESS, hover=SUCCESS_HOVER, font=FONT_HEADING)
+    btn_menu_gameover = Button("MENU PRINCIPAL", (WIDTH//2 - 150, HEIGHT//2 - 250 + 465, 300, 60),
+                               color=ACCENT, hover=ACCENT_HOVER, font=FONT_HEADING)
 
 
 def start_round(force_new=False):
@@ -663,19 +735,27 @@ def start_round(force_new=False):
     played_past_notes = []
     message = "Ouça a primeira nota ou tente advinhar a música."
 
+    # Sintetiza já as notas distintas da música: os cliques seguintes só tocam
+    if pygame.mixer.get_init():
+        note_cache.prewarm(((NOTE_FREQS[nome], duracao) for nome, duracao in current_song_seq),
+                           sounds=not audio_mixer.available)
+    sync_replay()
+
+@profiler.timed()
 def draw_note_symbol(surf, x, y, size=30, color=(255, 255, 255)):
     """Desenha uma nota musical decorativa"""
     # Cria uma superfície com alpha para transparência
-    note_surf = pygame.Surface((size * 2, size * 3), pygame.SRCALPHA)
+    note_surf = new_surface((size * 2, size * 3), pygame.SRCALPHA)
     # Cabeça da nota (círculo)
     pygame.draw.circle(note_surf, (*color, 150), (size, size // 2), size // 2, 2)
     # Haste da nota
     pygame.draw.line(note_surf, (*color, 150), (size, size), (size, size * 2), 2)
     surf.blit(note_surf, (x - size, y - size // 2))
 
+@profiler.timed()
 def draw_musical_staff(surf, x, y, width, height):
     """Desenha uma pauta musical decorativa"""
-    staff_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    staff_surf = new_surface((width, height), pygame.SRCALPHA)
     line_color = (255, 255, 255, 30)
     line_spacing = height // 5
     for i in range(5):
@@ -683,30 +763,53 @@ def draw_musical_staff(surf, x, y, width, height):
                         (width, i * line_spacing), 1)
     surf.blit(staff_surf, (x, y))
 
-def draw_menu():
+@profiler.timed()
+def draw_menu_static(surf):
     # Background com gradiente roxo-azul
     purple_start = (60, 20, 80)  # Roxo escuro
     blue_end = (20, 40, 100)     # Azul escuro
-    draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
 
     # Elementos musicais decorativos no fundo
     # Pautas musicais sutis
-    draw_musical_staff(screen, 50, 50, 200, 80)
-    draw_musical_staff(screen, WIDTH - 250, 50, 200, 80)
-    draw_musical_staff(screen, 50, HEIGHT - 150, 200, 80)
-    draw_musical_staff(screen, WIDTH - 250, HEIGHT - 150, 200, 80)
+    draw_musical_staff(surf, 50, 50, 200, 80)
+    draw_musical_staff(surf, WIDTH - 250, 50, 200, 80)
+    draw_musical_staff(surf, 50, HEIGHT - 150, 200, 80)
+    draw_musical_staff(surf, WIDTH - 250, HEIGHT - 150, 200, 80)
 
     # Notas musicais decorativas
     note_color = (255, 255, 255)
-    draw_note_symbol(screen, 120, 100, 25, note_color)
-    draw_note_symbol(screen, 180, 120, 25, note_color)
-    draw_note_symbol(screen, WIDTH - 180, 100, 25, note_color)
-    draw_note_symbol(screen, WIDTH - 120, 120, 25, note_color)
-    draw_note_symbol(screen, 120, HEIGHT - 100, 25, note_color)
-    draw_note_symbol(screen, 180, HEIGHT - 80, 25, note_color)
-    draw_note_symbol(screen, WIDTH - 180, HEIGHT - 100, 25, note_color)
-    draw_note_symbol(screen, WIDTH - 120, HEIGHT - 80, 25, note_color)
+    draw_note_symbol(surf, 120, 100, 25, note_color)
+    draw_note_symbol(surf, 180, 120, 25, note_color)
+    draw_note_symbol(surf, WIDTH - 180, 100, 25, note_color)
+    draw_note_symbol(surf, WIDTH - 120, 120, 25, note_color)
+    draw_note_symbol(surf, 120, HEIGHT - 100, 25, note_color)
+    draw_note_symbol(surf, 180, HEIGHT - 80, 25, note_color)
+    draw_note_symbol(surf, WIDTH - 180, HEIGHT - 100, 25, note_color)
+    draw_note_symbol(surf, WIDTH - 120, HEIGHT - 80, 25, note_color)
 
+    # Footer melhorado com ícone musical
+    footer_text = "♪ Piano Suave (Anti-Clipping) | v2.0 ♪"
+    footer_surf = render_text(FONT_TINY, footer_text, True, (180, 170, 220))
+    surf.blit(footer_surf, (WIDTH//2 - footer_surf.get_width()//2, HEIGHT - 40))
+
+menu_title_rect = None
+
+def get_menu_title_rect():
+    """Área que o título pulsante pode ocupar, medida uma vez no maior tamanho da pulsação"""
+    global menu_title_rect
+    if menu_title_rect is None:
+        title_w, title_h = get_font("Montserrat", quantize_size(int(96 * 1.08)), bold=True).size("SOLFEJO")
+        icon_w = get_font("Montserrat", quantize_size(int(56 * 1.08)), bold=True).size("♪")[0]
+        small_w = get_font("Montserrat", quantize_size(int(32 * 1.1)), bold=True).size("♫")[0]
+        left = WIDTH // 2 - title_w // 2 - 120
+        right = WIDTH // 2 + title_w // 2 + max(30 + icon_w, 60 + small_w)
+        bottom = 50 + title_h + 20 + 25 + 2  # Linha sob o subtítulo
+        menu_title_rect = pygame.Rect(left - 4, 40, right - left + 8, bottom - 40)
+    return menu_title_rect
+
+@profiler.timed()
+def draw_menu_title(surf):
     # Título principal com design musical melhorado e animação
     title = "SOLFEJO"
     title_x = WIDTH // 2
@@ -723,10 +826,10 @@ def draw_menu():
     # Calcula o tamanho animado
     base_size = 96
     animated_size = int(base_size * pulse)
-    animated_font = get_font("Montserrat", animated_size, bold=True)
+    animated_font = get_font("Montserrat", quantize_size(animated_size), bold=True)
     
     # Renderiza o título com tamanho animado
-    title_surf = animated_font.render(title, True, ACCENT)
+    title_surf = render_text(animated_font, title, True, ACCENT)
     title_width = title_surf.get_width()
     title_height = title_surf.get_height()
     
@@ -735,9 +838,9 @@ def draw_menu():
     for i in range(3):
         shadow_offset = 4 - i
         shadow_alpha = int(40 - i * 12)
-        shadow_surf = animated_font.render(title, True, (0, 0, 0))
-        shadow_surf.set_alpha(shadow_alpha)
-        screen.blit(shadow_surf, (title_x - title_width//2 + shadow_offset, title_y + shadow_offset))
+        shadow_surf = render_text(animated_font, title, True, (0, 0, 0))
+        alpha_scratch.blit(surf, shadow_surf, (title_x - title_width//2 + shadow_offset, title_y + shadow_offset),
+                           shadow_alpha)
     
     # Efeito de brilho pulsante (múltiplas camadas)
     num_glow_layers = 3
@@ -745,76 +848,75 @@ def draw_menu():
         glow_alpha = int(80 * glow_intensity / (i + 1))
         glow_offset = i * 2
         glow_color = tuple(min(255, c + int(30 * (i + 1))) for c in ACCENT)
-        glow_surf = animated_font.render(title, True, glow_color)
-        glow_surf.set_alpha(glow_alpha)
-        screen.blit(glow_surf, (title_x - title_width//2 - glow_offset, title_y - glow_offset))
+        glow_surf = render_text(animated_font, title, True, glow_color)
+        alpha_scratch.blit(surf, glow_surf, (title_x - title_width//2 - glow_offset, title_y - glow_offset),
+                           glow_alpha)
     
     # Camada base do título
-    screen.blit(title_surf, (title_x - title_width//2, title_y))
+    surf.blit(title_surf, (title_x - title_width//2, title_y))
     
     # Camada de brilho superior (mais clara) com animação
     glow_color = tuple(min(255, c + int(40 * glow_intensity)) for c in ACCENT)
-    glow_surf = animated_font.render(title, True, glow_color)
-    glow_surf.set_alpha(int(150 * glow_intensity))
-    screen.blit(glow_surf, (title_x - title_width//2 - 2, title_y - 2))
+    glow_surf = render_text(animated_font, title, True, glow_color)
+    alpha_scratch.blit(surf, glow_surf, (title_x - title_width//2 - 2, title_y - 2), int(150 * glow_intensity))
 
     # Ícones musicais ao lado do título com animação suave
     music_icon = "♪"
     icon_size = int(56 * pulse)
-    icon_font = get_font("Montserrat", icon_size, bold=True)
-    icon_surf = icon_font.render(music_icon, True, (200, 180, 255))
+    icon_font = get_font("Montserrat", quantize_size(icon_size), bold=True)
+    icon_surf = render_text(icon_font, music_icon, True, (200, 180, 255))
     icon_alpha = int(200 + 55 * glow_intensity)
-    icon_surf.set_alpha(icon_alpha)
     
     # Ícone esquerdo (com leve rotação/posição animada)
     icon_offset_y = int(math.sin(current_time * pulse_speed * 1.5) * 3)
-    screen.blit(icon_surf, (title_x - title_width//2 - 90, title_y + 10 + icon_offset_y))
+    alpha_scratch.blit(surf, icon_surf, (title_x - title_width//2 - 90, title_y + 10 + icon_offset_y), icon_alpha)
     # Ícone direito
     icon_offset_y2 = int(math.sin(current_time * pulse_speed * 1.5 + math.pi) * 3)
-    screen.blit(icon_surf, (title_x + title_width//2 + 30, title_y + 10 + icon_offset_y2))
+    alpha_scratch.blit(surf, icon_surf, (title_x + title_width//2 + 30, title_y + 10 + icon_offset_y2), icon_alpha)
     
     # Adiciona mais ícones musicais menores decorativos com animação
     small_icon = "♫"
     small_icon_size = int(32 * (1.0 + math.sin(current_time * pulse_speed * 2) * 0.1))
-    small_icon_font = get_font("Montserrat", small_icon_size, bold=True)
-    small_icon_surf = small_icon_font.render(small_icon, True, (180, 160, 240))
-    small_icon_surf.set_alpha(int(180 + 75 * glow_intensity))
-    screen.blit(small_icon_surf, (title_x - title_width//2 - 120, title_y + 20))
-    screen.blit(small_icon_surf, (title_x + title_width//2 + 60, title_y + 20))
+    small_icon_font = get_font("Montserrat", quantize_size(small_icon_size), bold=True)
+    small_icon_surf = render_text(small_icon_font, small_icon, True, (180, 160, 240))
+    small_icon_alpha = int(180 + 75 * glow_intensity)
+    alpha_scratch.blit(surf, small_icon_surf, (title_x - title_width//2 - 120, title_y + 20), small_icon_alpha)
+    alpha_scratch.blit(surf, small_icon_surf, (title_x + title_width//2 + 60, title_y + 20), small_icon_alpha)
 
     # Subtítulo melhorado com estilo musical (ajustado para o título maior)
     subtitle = "Aprenda música de forma divertida"
     subtitle_y = title_y + title_height + 20  # Posiciona abaixo do título animado
-    subtitle_surf = FONT_SMALL.render(subtitle, True, (220, 200, 255))
-    screen.blit(subtitle_surf, (WIDTH//2 - subtitle_surf.get_width()//2, subtitle_y))
+    subtitle_surf = render_text(FONT_SMALL, subtitle, True, (220, 200, 255))
+    surf.blit(subtitle_surf, (WIDTH//2 - subtitle_surf.get_width()//2, subtitle_y))
     
     # Linha decorativa sob o subtítulo
     line_y = subtitle_y + 25
-    line_surf = pygame.Surface((300, 2), pygame.SRCALPHA)
+    line_surf = new_surface((300, 2), pygame.SRCALPHA)
     line_surf.fill((180, 160, 220, 100))
-    screen.blit(line_surf, (WIDTH//2 - 150, line_y))
+    surf.blit(line_surf, (WIDTH//2 - 150, line_y))
 
-    # Desenha os botões
-    btn_start.draw(screen)
-    btn_rules.draw(screen)
-    btn_conf.draw(screen)
+@profiler.timed()
+def draw_menu():
+    compositor.begin("menu", None, draw_menu_static)
+    compositor.widget("menu_title", get_menu_title_rect(), ALWAYS, draw_menu_title)
 
-    # Footer melhorado com ícone musical
-    footer_text = "♪ Piano Suave (Anti-Clipping) | v2.0 ♪"
-    footer_surf = FONT_TINY.render(footer_text, True, (180, 170, 220))
-    screen.blit(footer_surf, (WIDTH//2 - footer_surf.get_width()//2, HEIGHT - 40))
+    # Desenha os botões
+    draw_button(btn_start)
+    draw_button(btn_rules)
+    draw_button(btn_conf)
 
-def draw_rules():
+@profiler.timed()
+def draw_rules_static(surf):
     # Background com gradiente roxo-azul
     purple_start = (60, 20, 80)  # Roxo escuro
     blue_end = (20, 40, 100)     # Azul escuro
-    draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
 
     # Título
-    draw_text_with_shadow(screen, "REGRAS DO JOGO", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
+    draw_text_with_shadow(surf, "REGRAS DO JOGO", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
 
     # Card com regras e gradiente
-    card_rect = draw_card(screen, (50, 100, WIDTH-100, 520), BG_CARD, gradient=True)
+    card_rect = draw_card(surf, (50, 100, WIDTH-100, 520), BG_CARD, gradient=True)
 
     rules = [
         ("1.", "Você começa com 3 vidas", ["Não desperdice tentando adivinhar sem certeza!"]),
@@ -830,68 +932,86 @@ def draw_rules():
     y = card_rect.y + 30
     for icon, title, desc_lines in rules:
         # Ícone
-        icon_surf = FONT_HEADING.render(icon, True, ACCENT)
-        screen.blit(icon_surf, (card_rect.x + 30, y))
+        icon_surf = render_text(FONT_HEADING, icon, True, ACCENT)
+        surf.blit(icon_surf, (card_rect.x + 30, y))
 
         # Título
-        title_surf = FONT.render(title, True, TEXT_PRIMARY)
-        screen.blit(title_surf, (card_rect.x + 80, y + 2))
+        title_surf = render_text(FONT, title, True, TEXT_PRIMARY)
+        surf.blit(title_surf, (card_rect.x + 80, y + 2))
 
         # Descrição (pode ter múltiplas linhas)
         desc_y = y + 32
         for line in desc_lines:
-            desc_surf = FONT_SMALL.render(line, True, TEXT_SECONDARY)
-            screen.blit(desc_surf, (card_rect.x + 80, desc_y))
+            desc_surf = render_text(FONT_SMALL, line, True, TEXT_SECONDARY)
+            surf.blit(desc_surf, (card_rect.x + 80, desc_y))
             desc_y += 22
 
         y += 110
 
-    btn_back.draw(screen)
+@profiler.timed()
+def draw_rules():
+    compositor.begin("rules", None, draw_rules_static)
+    draw_button(btn_back)
 
-def draw_settings():
+@profiler.timed()
+def draw_settings_static(surf, info_items):
     # Background com gradiente roxo-azul
     purple_start = (60, 20, 80)  # Roxo escuro
     blue_end = (20, 40, 100)     # Azul escuro
-    draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
 
     # Título
-    draw_text_with_shadow(screen, "CONFIGURAÇÕES", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
+    draw_text_with_shadow(surf, "CONFIGURAÇÕES", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
 
     # Card de configurações com gradiente
-    card_rect = draw_card(screen, (50, 100, WIDTH-100, 400), BG_CARD, gradient=True)
+    card_rect = draw_card(surf, (50, 100, WIDTH-100, 440), BG_CARD, gradient=True)
 
     # Afinação
     y = card_rect.y + 40
-    label_surf = FONT.render("Afinação", True, TEXT_PRIMARY)
-    screen.blit(label_surf, (card_rect.x + 40, y))
+    label_surf = render_text(FONT, "Afinação", True, TEXT_PRIMARY)
+    surf.blit(label_surf, (card_rect.x + 40, y))
 
     value_text = f"+{TUNING_OFFSET} semitons"
-    value_surf = FONT_HEADING.render(value_text, True, ACCENT)
-    screen.blit(value_surf, (card_rect.x + 40, y + 40))
+    value_surf = render_text(FONT_HEADING, value_text, True, ACCENT)
+    surf.blit(value_surf, (card_rect.x + 40, y + 40))
 
-    desc_surf = FONT_SMALL.render("Ajuste fino da afinação base (A4 = 440Hz)", True, TEXT_SECONDARY)
-    screen.blit(desc_surf, (card_rect.x + 40, y + 85))
+    desc_surf = render_text(FONT_SMALL, "Ajuste fino da afinação base (A4 = 440Hz)", True, TEXT_SECONDARY)
+    surf.blit(desc_surf, (card_rect.x + 40, y + 85))
 
     # Informações adicionais
     y += 160
-    pygame.draw.line(screen, GRAY_700, (card_rect.x + 40, y), (card_rect.right - 40, y), 1)
+    pygame.draw.line(surf, GRAY_700, (card_rect.x + 40, y), (card_rect.right - 40, y), 1)
 
     y += 30
+    for label, value in info_items:
+        label_surf = render_text(FONT_SMALL, label, True, TEXT_SECONDARY)
+        value_surf = render_text(FONT_SMALL, value, True, TEXT_PRIMARY)
+        surf.blit(label_surf, (card_rect.x + 40, y))
+        surf.blit(value_surf, (card_rect.x + 350, y))
+        y += 35
+
+def settings_info():
+    """Valores da tela de configurações; mudam durante o jogo (cache de notas)"""
+    cache = note_cache.stats()
     info_items = [
         ("Taxa de Amostragem:", f"{SAMPLE_RATE} Hz"),
         ("Duração de Escuta:", f"{LISTEN_DURATION} segundos"),
-        ("Estabilidade Requerida:", f"{REQUIRED_STABILITY} segundo")
+        ("Estabilidade Requerida:", f"{REQUIRED_STABILITY} segundo"),
+        ("Perfil do Detector:", f"{DETECTOR_PROFILE} (~{detector.expected_latency_ms():.0f} ms"
+                                f" + {detector.smoothing_latency_ms():.0f} ms de suavização)"),
+        ("Cache de Notas:", f"{cache['entries']} notas, {cache['bytes'] / 1048576:.1f}/{NOTE_CACHE_MB} MB"
+                            f" ({cache['hits']} acertos, {cache['misses']} sínteses)"),
     ]
+    return info_items
 
-    for label, value in info_items:
-        label_surf = FONT_SMALL.render(label, True, TEXT_SECONDARY)
-        value_surf = FONT_SMALL.render(value, True, TEXT_PRIMARY)
-        screen.blit(label_surf, (card_rect.x + 40, y))
-        screen.blit(value_surf, (card_rect.x + 350, y))
-        y += 35
-
-    btn_back.draw(screen)
+@profiler.timed()
+def draw_settings():
+    info_items = settings_info()
+    # Os valores entram na chave: a camada só é refeita quando algum muda
+    compositor.begin("settings", tuple(info_items), lambda surf: draw_settings_static(surf, info_items))
+    draw_button(btn_back)
 
+@profiler.timed()
 def draw_success_animation():
     """Desenha uma animação visual quando o jogador acerta uma nota"""
     global show_success_animation, success_animation_start_time
@@ -921,7 +1041,7 @@ def draw_success_animation():
     pulse = 1.0 + math.sin(pygame.time.get_ticks() * pulse_speed) * 0.2
     
     # Overlay semi-transparente verde
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay = new_surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay_alpha = int(30 * (alpha / 255))
     overlay.fill((0, 255, 100, overlay_alpha))
     screen.blit(overlay, (0, 0))
@@ -940,7 +1060,7 @@ def draw_success_animation():
     scaled_y = (HEIGHT - scaled_height) // 2
     
     # Card com gradiente verde
-    card_surf = pygame.Surface((scaled_width, scaled_height), pygame.SRCALPHA)
+    card_surf = new_surface((scaled_width, scaled_height), pygame.SRCALPHA)
     card_rect = pygame.Rect(0, 0, scaled_width, scaled_height)
     
     # Gradiente verde brilhante
@@ -956,26 +1076,19 @@ def draw_success_animation():
     
     # Ícone de check/certo grande
     check_size = int(80 * scale)
-    check_font = get_font("Montserrat", check_size, bold=True)
+    check_font = get_font("Montserrat", quantize_size(check_size), bold=True)
     check_text = "✓"
-    check_surf = check_font.render(check_text, True, (255, 255, 255))
+    check_surf = render_text(check_font, check_text, True, (255, 255, 255))
     check_alpha = alpha
-    check_surf.set_alpha(check_alpha)
-    screen.blit(check_surf, (WIDTH//2 - check_surf.get_width()//2, scaled_y + 40))
+    alpha_scratch.blit(screen, check_surf, (WIDTH//2 - check_surf.get_width()//2, scaled_y + 40), check_alpha)
     
     # Texto "NOTA ACERTADA!"
     success_text = "NOTA ACERTADA!"
     success_font = FONT_TITLE
-    success_surf = success_font.render(success_text, True, (255, 255, 255))
-    success_shadow = success_font.render(success_text, True, (0, 0, 0))
+    success_surf = render_text(success_font, success_text, True, (255, 255, 255), shadow=2)
     
     # Aplica alpha
-    success_surf_temp = pygame.Surface(success_surf.get_size(), pygame.SRCALPHA)
-    success_surf_temp.blit(success_shadow, (2, 2))
-    success_surf_temp.blit(success_surf, (0, 0))
-    success_surf_temp.set_alpha(check_alpha)
-    
-    screen.blit(success_surf_temp, (WIDTH//2 - success_surf.get_width()//2, scaled_y + 120))
+    alpha_scratch.blit(screen, success_surf, (WIDTH//2 - (success_surf.get_width() - 2)//2, scaled_y + 120), check_alpha)
     
     # Efeito de partículas/estrelas ao redor (opcional - adiciona mais dinamismo)
     star_count = 12
@@ -988,10 +1101,11 @@ def draw_success_animation():
         star_size = int(15 * (1 + 0.5 * math.sin(pygame.time.get_ticks() * 0.01 + i)))
         star_alpha = int(alpha * 0.7)
         
-        star_surf = pygame.Surface((star_size * 2, star_size * 2), pygame.SRCALPHA)
+        star_surf = new_surface((star_size * 2, star_size * 2), pygame.SRCALPHA)
         pygame.draw.circle(star_surf, (255, 255, 255, star_alpha), (star_size, star_size), star_size)
         screen.blit(star_surf, (star_x - star_size, star_y - star_size))
 
+@profiler.timed()
 def draw_music_success_animation():
     """Desenha uma animação visual quando o jogador acerta a música"""
     global show_music_success_animation, music_animation_start_time, music_animation_message
@@ -1032,7 +1146,7 @@ def draw_music_success_animation():
     pulse = 1.0 + math.sin(pygame.time.get_ticks() * pulse_speed) * 0.08  # Reduzido de 0.15 para 0.08
     
     # Overlay semi-transparente verde/azul
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay = new_surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay_alpha = int(40 * (alpha / 255))
     overlay.fill((50, 200, 150, overlay_alpha))
     screen.blit(overlay, (0, 0))
@@ -1060,7 +1174,7 @@ def draw_music_success_animation():
     scaled_y = (HEIGHT - scaled_height) // 2
     
     # Card com gradiente verde/azul brilhante
-    card_surf = pygame.Surface((scaled_width, scaled_height), pygame.SRCALPHA)
+    card_surf = new_surface((scaled_width, scaled_height), pygame.SRCALPHA)
     card_rect = pygame.Rect(0, 0, scaled_width, scaled_height)
     
     # Gradiente verde/azul brilhante
@@ -1076,12 +1190,11 @@ def draw_music_success_animation():
     
     # Ícone de check/certo grande
     check_size = int(100 * scale)
-    check_font = get_font("Montserrat", check_size, bold=True)
+    check_font = get_font("Montserrat", quantize_size(check_size), bold=True)
     check_text = "✓"
-    check_surf = check_font.render(check_text, True, (255, 255, 255))
+    check_surf = render_text(check_font, check_text, True, (255, 255, 255))
     check_alpha = alpha
-    check_surf.set_alpha(check_alpha)
-    screen.blit(check_surf, (WIDTH//2 - check_surf.get_width()//2, scaled_y + 30))
+    alpha_scratch.blit(screen, check_surf, (WIDTH//2 - check_surf.get_width()//2, scaled_y + 30), check_alpha)
     
     # Texto da mensagem (suporta múltiplas linhas)
     success_text = music_animation_message if music_animation_message else "MÚSICA ACERTADA!"
@@ -1092,16 +1205,11 @@ def draw_music_success_animation():
     
     for i, line in enumerate(lines):
         if line.strip():
-            success_surf = success_font.render(line, True, (255, 255, 255))
-            success_shadow = success_font.render(line, True, (0, 0, 0))
+            success_surf = render_text(success_font, line, True, (255, 255, 255), shadow=3)
             
             # Aplica alpha
-            success_surf_temp = pygame.Surface(success_surf.get_size(), pygame.SRCALPHA)
-            success_surf_temp.blit(success_shadow, (3, 3))
-            success_surf_temp.blit(success_surf, (0, 0))
-            success_surf_temp.set_alpha(check_alpha)
-            
-            screen.blit(success_surf_temp, (WIDTH//2 - success_surf.get_width()//2, start_y + i * success_font.get_height()))
+            alpha_scratch.blit(screen, success_surf, (WIDTH//2 - (success_surf.get_width() - 3)//2,
+                                                      start_y + i * success_font.get_height()), check_alpha)
     
     # Efeito de partículas/estrelas ao redor (mais suave)
     star_count = 16
@@ -1117,10 +1225,11 @@ def draw_music_success_animation():
         star_size = int(16 * (1 + 0.4 * math.sin(time_factor * 1.2 + i * 0.7)))
         star_alpha = int(alpha * 0.7)  # Mais transparente
         
-        star_surf = pygame.Surface((star_size * 2, star_size * 2), pygame.SRCALPHA)
+        star_surf = new_surface((star_size * 2, star_size * 2), pygame.SRCALPHA)
         pygame.draw.circle(star_surf, (255, 255, 255, star_alpha), (star_size, star_size), star_size)
         screen.blit(star_surf, (star_x - star_size, star_y - star_size))
 
+@profiler.timed()
 def draw_music_error_animation():
     """Desenha uma animação visual quando o jogador erra a música"""
     global show_music_error_animation, music_animation_start_time, music_animation_message
@@ -1161,7 +1270,7 @@ def draw_music_error_animation():
     pulse = 1.0 + math.sin(pygame.time.get_ticks() * pulse_speed) * 0.06  # Reduzido de 0.1 para 0.06
     
     # Overlay semi-transparente vermelho/rosa
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay = new_surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay_alpha = int(35 * (alpha / 255))
     overlay.fill((200, 50, 80, overlay_alpha))
     screen.blit(overlay, (0, 0))
@@ -1189,7 +1298,7 @@ def draw_music_error_animation():
     scaled_y = (HEIGHT - scaled_height) // 2
     
     # Card com gradiente vermelho/rosa
-    card_surf = pygame.Surface((scaled_width, scaled_height), pygame.SRCALPHA)
+    card_surf = new_surface((scaled_width, scaled_height), pygame.SRCALPHA)
     card_rect = pygame.Rect(0, 0, scaled_width, scaled_height)
     
     # Gradiente vermelho/rosa
@@ -1205,12 +1314,11 @@ def draw_music_error_animation():
     
     # Ícone de X/erro grande
     error_size = int(100 * scale)
-    error_font = get_font("Montserrat", error_size, bold=True)
+    error_font = get_font("Montserrat", quantize_size(error_size), bold=True)
     error_text = "✗"
-    error_surf = error_font.render(error_text, True, (255, 255, 255))
+    error_surf = render_text(error_font, error_text, True, (255, 255, 255))
     error_alpha = alpha
-    error_surf.set_alpha(error_alpha)
-    screen.blit(error_surf, (WIDTH//2 - error_surf.get_width()//2, scaled_y + 30))
+    alpha_scratch.blit(screen, error_surf, (WIDTH//2 - error_surf.get_width()//2, scaled_y + 30), error_alpha)
     
     # Texto da mensagem (suporta múltiplas linhas)
     error_text_msg = music_animation_message if music_animation_message else "MÚSICA ERRADA!"
@@ -1221,16 +1329,11 @@ def draw_music_error_animation():
     
     for i, line in enumerate(lines):
         if line.strip():
-            error_surf_text = error_font_text.render(line, True, (255, 255, 255))
-            error_shadow = error_font_text.render(line, True, (0, 0, 0))
+            error_surf_text = render_text(error_font_text, line, True, (255, 255, 255), shadow=3)
             
             # Aplica alpha
-            error_surf_temp = pygame.Surface(error_surf_text.get_size(), pygame.SRCALPHA)
-            error_surf_temp.blit(error_shadow, (3, 3))
-            error_surf_temp.blit(error_surf_text, (0, 0))
-            error_surf_temp.set_alpha(error_alpha)
-            
-            screen.blit(error_surf_temp, (WIDTH//2 - error_surf_text.get_width()//2, start_y + i * error_font_text.get_height()))
+            alpha_scratch.blit(screen, error_surf_text, (WIDTH//2 - (error_surf_text.get_width() - 3)//2,
+                                                         start_y + i * error_font_text.get_height()), error_alpha)
     
     # Efeito de ondas/choque ao redor (mais suave)
     wave_count = 8
@@ -1246,79 +1349,89 @@ def draw_music_error_animation():
         wave_size = int(10 * (1 + 0.3 * math.sin(time_factor * 1.0 + i * 0.8)))
         wave_alpha = int(alpha * 0.5)  # Mais transparente
         
-        wave_surf = pygame.Surface((wave_size * 2, wave_size * 2), pygame.SRCALPHA)
+        wave_surf = new_surface((wave_size * 2, wave_size * 2), pygame.SRCALPHA)
         pygame.draw.circle(wave_surf, (255, 150, 150, wave_alpha), (wave_size, wave_size), wave_size)
         screen.blit(wave_surf, (wave_x - wave_size, wave_y - wave_size))
 
-def draw_guess_modal():
-    """Desenha o modal para adivinhar a música"""
-    global btn_modal_confirm, btn_modal_cancel
-    
+MODAL_RECT = pygame.Rect((WIDTH - 600) // 2, (HEIGHT - 350) // 2, 600, 350)
+MODAL_INPUT_RECT = pygame.Rect(MODAL_RECT.x + 40, MODAL_RECT.y + 130, MODAL_RECT.w - 80, 60)
+
+@profiler.timed()
+def draw_guess_modal_static(surf):
+    """Fundo do modal: overlay, card, título, dica e o campo de input vazio"""
     # Overlay escuro semi-transparente
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay = new_surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 180))
-    screen.blit(overlay, (0, 0))
+    surf.blit(overlay, (0, 0))
     
     # Card do modal centralizado
-    modal_width = 600
-    modal_height = 350
-    modal_x = (WIDTH - modal_width) // 2
-    modal_y = (HEIGHT - modal_height) // 2
+    modal_x, modal_y, modal_width, modal_height = MODAL_RECT
     
-    modal_rect = draw_card(screen, (modal_x, modal_y, modal_width, modal_height), BG_CARD, gradient=True)
+    modal_rect = draw_card(surf, MODAL_RECT, BG_CARD, gradient=True)
     
     # Borda brilhante no modal
-    pygame.draw.rect(screen, ACCENT, modal_rect, width=3, border_radius=20)
+    pygame.draw.rect(surf, ACCENT, modal_rect, width=3, border_radius=20)
     
     # Título do modal
-    title_text = FONT_TITLE.render("ADIVINHE A MÚSICA", True, ACCENT)
-    title_shadow = FONT_TITLE.render("ADIVINHE A MÚSICA", True, (0, 0, 0))
-    screen.blit(title_shadow, (modal_x + modal_width//2 - title_text.get_width()//2 + 2, modal_y + 30 + 2))
-    screen.blit(title_text, (modal_x + modal_width//2 - title_text.get_width()//2, modal_y + 30))
+    title_text = render_text(FONT_TITLE, "ADIVINHE A MÚSICA", True, ACCENT, shadow=2)
+    surf.blit(title_text, (modal_x + modal_width//2 - (title_text.get_width() - 2)//2, modal_y + 30))
     
     # Subtítulo com dica
-    hint_text = FONT_SMALL.render("Digite o nome da música que você acha que é:", True, TEXT_SECONDARY)
-    screen.blit(hint_text, (modal_x + 40, modal_y + 90))
+    hint_text = render_text(FONT_SMALL, "Digite o nome da música que você acha que é:", True, TEXT_SECONDARY)
+    surf.blit(hint_text, (modal_x + 40, modal_y + 90))
     
     # Campo de input no modal
-    input_y = modal_y + 130
-    input_width = modal_width - 80
-    input_height = 60
-    input_x = modal_x + 40
+    draw_card(surf, MODAL_INPUT_RECT, BG_SURFACE, border_radius=15, gradient=True)
     
-    input_rect = draw_card(screen, (input_x, input_y, input_width, input_height), BG_SURFACE, border_radius=15, gradient=True)
+    # Informação sobre vidas e pontos
+    info_text = render_text(FONT_TINY, f"Acertar: +5 pontos | Errar: -1 vida", True, TEXT_SECONDARY)
+    surf.blit(info_text, (modal_x + modal_width//2 - info_text.get_width()//2, modal_y + modal_height - 35))
+
+def guess_input_state():
+    """O que o campo de input mostra agora: texto, foco, largura da borda e cursor"""
+    pulse_width = int(2 + math.sin(pygame.time.get_ticks() * 0.01) * 1) if input_active else 1
+    cursor_on = input_active and (pygame.time.get_ticks() // 500) % 2 == 0  # Pisca a cada 500ms
+    return user_text, input_active, pulse_width, cursor_on
+
+@profiler.timed()
+def draw_guess_input(surf):
+    _, _, pulse_width, cursor_on = guess_input_state()
+    input_rect = MODAL_INPUT_RECT
+    input_width, input_height = input_rect.size
     
     # Borda pulsante quando ativo
     if input_active:
-        pulse_time = pygame.time.get_ticks() * 0.01
-        pulse_width = int(2 + math.sin(pulse_time) * 1)
-        pygame.draw.rect(screen, ACCENT, input_rect, width=pulse_width, border_radius=15)
+        pygame.draw.rect(surf, ACCENT, input_rect, width=pulse_width, border_radius=15)
     else:
-        pygame.draw.rect(screen, GRAY_700, input_rect, width=1, border_radius=15)
+        pygame.draw.rect(surf, GRAY_700, input_rect, width=1, border_radius=15)
     
     # Texto do input
     display_text = user_text if (input_active or user_text) else "Digite o nome da música..."
     col = TEXT_PRIMARY if input_active else TEXT_SECONDARY
-    text_surf = FONT.render(display_text, True, col)
+    text_surf = render_text(FONT, display_text, True, col)
     
     # Limita o texto visível se for muito longo
     max_width = input_width - 40
     if text_surf.get_width() > max_width:
         # Tenta renderizar com fonte menor
-        text_surf = FONT_SMALL.render(display_text, True, col)
+        text_surf = render_text(FONT_SMALL, display_text, True, col)
         if text_surf.get_width() > max_width:
             # Se ainda for muito longo, trunca visualmente
             display_text_short = display_text[:30] + "..."
-            text_surf = FONT_SMALL.render(display_text_short, True, col)
+            text_surf = render_text(FONT_SMALL, display_text_short, True, col)
     
-    screen.blit(text_surf, (input_rect.x + 20, input_rect.y + (input_height - text_surf.get_height()) // 2))
+    surf.blit(text_surf, (input_rect.x + 20, input_rect.y + (input_height - text_surf.get_height()) // 2))
     
     # Indicador de cursor quando ativo
-    if input_active:
+    if cursor_on:
         cursor_x = input_rect.x + 20 + text_surf.get_width() + 2
-        cursor_time = pygame.time.get_ticks() // 500  # Pisca a cada 500ms
-        if cursor_time % 2 == 0:
-            pygame.draw.line(screen, TEXT_PRIMARY, (cursor_x, input_rect.y + 15), (cursor_x, input_rect.y + input_height - 15), 2)
+        pygame.draw.line(surf, TEXT_PRIMARY, (cursor_x, input_rect.y + 15), (cursor_x, input_rect.y + input_height - 15), 2)
+
+@profiler.timed()
+def draw_guess_modal():
+    """Declara o modal para adivinhar a música (o fundo fica na camada estática de draw_play)"""
+    # Com foco, a borda pulsa e o cursor pisca
+    compositor.widget("guess_input", MODAL_INPUT_RECT, guess_input_state(), draw_guess_input, animated=input_active)
     
     # Botões do modal
     btn_width = 200
@@ -1326,34 +1439,38 @@ def draw_guess_modal():
     btn_spacing = 30
     
     # Botão Confirmar
-    confirm_x = modal_x + (modal_width - (btn_width * 2 + btn_spacing)) // 2
-    confirm_y = modal_y + modal_height - 90
+    confirm_x = MODAL_RECT.x + (MODAL_RECT.w - (btn_width * 2 + btn_spacing)) // 2
+    confirm_y = MODAL_RECT.bottom - 90
     
-    btn_modal_confirm = Button("CONFIRMAR", (confirm_x, confirm_y, btn_width, btn_height), 
-                               color=SUCCESS, hover=SUCCESS_HOVER, font=FONT)
-    btn_modal_confirm.draw(screen)
+    btn_modal_confirm.rect = pygame.Rect(confirm_x, confirm_y, btn_width, btn_height)
+    draw_button(btn_modal_confirm)
     
     # Botão Cancelar
     cancel_x = confirm_x + btn_width + btn_spacing
-    btn_modal_cancel = Button("CANCELAR", (cancel_x, confirm_y, btn_width, btn_height), 
-                              color=DANGER, hover=DANGER_HOVER, font=FONT)
-    btn_modal_cancel.draw(screen)
-    
-    # Informação sobre vidas e pontos
-    info_text = FONT_TINY.render(f"Acertar: +5 pontos | Errar: -1 vida", True, TEXT_SECONDARY)
-    screen.blit(info_text, (modal_x + modal_width//2 - info_text.get_width()//2, modal_y + modal_height - 35))
+    btn_modal_cancel.rect = pygame.Rect(cancel_x, confirm_y, btn_width, btn_height)
+    draw_button(btn_modal_cancel)
     
     return btn_modal_confirm, btn_modal_cancel
 
-def draw_play():
+NEXT_CARD_RECT = pygame.Rect(400, 100, 550, 150)
+# A borda pulsante só passa nas beiradas do card: quatro faixas da largura do arredondamento
+NEXT_CARD_BORDER = [
+    pygame.Rect(NEXT_CARD_RECT.x, NEXT_CARD_RECT.y, NEXT_CARD_RECT.w, 20),
+    pygame.Rect(NEXT_CARD_RECT.x, NEXT_CARD_RECT.bottom - 20, NEXT_CARD_RECT.w, 20),
+    pygame.Rect(NEXT_CARD_RECT.x, NEXT_CARD_RECT.y, 20, NEXT_CARD_RECT.h),
+    pygame.Rect(NEXT_CARD_RECT.right - 20, NEXT_CARD_RECT.y, 20, NEXT_CARD_RECT.h),
+]
+
+@profiler.timed()
+def draw_play_static(surf):
     # Background com gradiente roxo-azul
     purple_start = (60, 20, 80)  # Roxo escuro
     blue_end = (20, 40, 100)     # Azul escuro
-    draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
 
     # Header fixo no topo - estilo game HUD
     header_height = 80
-    header_surf = pygame.Surface((WIDTH, header_height), pygame.SRCALPHA)
+    header_surf = new_surface((WIDTH, header_height), pygame.SRCALPHA)
     
     # Fundo do header com gradiente escuro
     header_grad_start = (30, 20, 50)
@@ -1368,13 +1485,13 @@ def draw_play():
     center_x = WIDTH // 2
     pygame.draw.line(header_surf, GRAY_700, (center_x, 10), (center_x, header_height - 10), 1)
     
-    screen.blit(header_surf, (0, 0))
+    surf.blit(header_surf, (0, 0))
     
     # Ícone musical decorativo no centro do header
     music_icon = "♪"
     icon_font = get_font("Montserrat", 40, bold=True)
-    icon_surf = icon_font.render(music_icon, True, ACCENT)
-    screen.blit(icon_surf, (center_x - icon_surf.get_width()//2, 20))
+    icon_surf = render_text(icon_font, music_icon, True, ACCENT)
+    surf.blit(icon_surf, (center_x - icon_surf.get_width()//2, 20))
     
     # Barra de progresso do jogo (notas reveladas)
     if current_song_seq:
@@ -1385,7 +1502,7 @@ def draw_play():
         
         # Fundo da barra
         progress_bg_rect = pygame.Rect(progress_x, progress_y, progress_width, progress_height)
-        pygame.draw.rect(screen, GRAY_700, progress_bg_rect, border_radius=4)
+        pygame.draw.rect(surf, GRAY_700, progress_bg_rect, border_radius=4)
         
         # Barra de progresso preenchida
         total_notes = len(current_song_seq)
@@ -1396,36 +1513,34 @@ def draw_play():
         # Preenche a barra com gradiente
         if progress_fill_width > 0:
             progress_color = SUCCESS if progress >= 1.0 else ACCENT
-            draw_gradient(screen, progress_fill_rect, progress_color, 
+            draw_gradient(surf, progress_fill_rect, progress_color, 
                          tuple(min(255, c + 30) for c in progress_color), vertical=False)
         
         # Borda brilhante na barra
-        pygame.draw.rect(screen, ACCENT, progress_bg_rect, width=1, border_radius=4)
+        pygame.draw.rect(surf, ACCENT, progress_bg_rect, width=1, border_radius=4)
         
         # Texto de progresso
         progress_text = f"{current_index}/{total_notes}"
-        progress_label = FONT_TINY.render(progress_text, True, TEXT_SECONDARY)
-        screen.blit(progress_label, (progress_x + progress_width - progress_label.get_width(), progress_y - 18))
+        progress_label = render_text(FONT_TINY, progress_text, True, TEXT_SECONDARY)
+        surf.blit(progress_label, (progress_x + progress_width - progress_label.get_width(), progress_y - 18))
 
     # Pontuação grande no topo esquerdo - estilo game HUD
-    score_label = FONT_SMALL.render("PONTUAÇÃO", True, TEXT_SECONDARY)
-    screen.blit(score_label, (30, 10))
-    score_text = FONT_TITLE.render(f"{score}", True, (255, 215, 0))  # Dourado para destacar
-    # Sombra do texto de pontuação para efeito 3D
-    shadow_score = FONT_TITLE.render(f"{score}", True, (0, 0, 0))
-    screen.blit(shadow_score, (32, 37))
-    screen.blit(score_text, (30, 35))
+    score_label = render_text(FONT_SMALL, "PONTUAÇÃO", True, TEXT_SECONDARY)
+    surf.blit(score_label, (30, 10))
+    # Dourado para destacar, com sombra para efeito 3D
+    score_text = render_text(FONT_TITLE, f"{score}", True, (255, 215, 0), shadow=2)
+    surf.blit(score_text, (30, 35))
     # Brilho dourado sutil ao redor da pontuação
-    glow_rect = pygame.Rect(25, 30, score_text.get_width() + 10, score_text.get_height() + 10)
-    glow_surf = pygame.Surface((glow_rect.w, glow_rect.h), pygame.SRCALPHA)
+    glow_rect = pygame.Rect(25, 30, score_text.get_width() + 8, score_text.get_height() + 8)
+    glow_surf = new_surface((glow_rect.w, glow_rect.h), pygame.SRCALPHA)
     pygame.draw.rect(glow_surf, (255, 215, 0, 50), glow_surf.get_rect(), width=2, border_radius=5)
-    screen.blit(glow_surf, glow_rect.topleft)
+    surf.blit(glow_surf, glow_rect.topleft)
     
     # Vidas no topo direito - com ícones de coração
     hearts_x = WIDTH - 250
     hearts_y = 25
-    lives_label = FONT_SMALL.render("VIDAS", True, TEXT_SECONDARY)
-    screen.blit(lives_label, (hearts_x, 15))
+    lives_label = render_text(FONT_SMALL, "VIDAS", True, TEXT_SECONDARY)
+    surf.blit(lives_label, (hearts_x, 15))
     
     # Desenha corações para cada vida - estilo game
     heart_size = 28
@@ -1438,8 +1553,8 @@ def draw_play():
         
         # Desenha dois círculos para formar o topo do coração
         top_radius = heart_size // 4
-        pygame.draw.circle(screen, heart_color, (heart_center_x - top_radius//2, heart_center_y - top_radius//2), top_radius)
-        pygame.draw.circle(screen, heart_color, (heart_center_x + top_radius//2, heart_center_y - top_radius//2), top_radius)
+        pygame.draw.circle(surf, heart_color, (heart_center_x - top_radius//2, heart_center_y - top_radius//2), top_radius)
+        pygame.draw.circle(surf, heart_color, (heart_center_x + top_radius//2, heart_center_y - top_radius//2), top_radius)
         
         # Desenha triângulo para a parte inferior do coração
         heart_points = [
@@ -1447,110 +1562,116 @@ def draw_play():
             (heart_center_x - top_radius * 1.5, heart_center_y),
             (heart_center_x + top_radius * 1.5, heart_center_y),
         ]
-        pygame.draw.polygon(screen, heart_color, heart_points)
+        pygame.draw.polygon(surf, heart_color, heart_points)
         
         # Sombra interna para dar profundidade
         if i < lives:
             inner_color = tuple(min(255, c + 40) for c in heart_color)
-            pygame.draw.circle(screen, inner_color, (heart_center_x - top_radius//2 + 2, heart_center_y - top_radius//2 - 2), top_radius - 2)
-            pygame.draw.circle(screen, inner_color, (heart_center_x + top_radius//2 - 2, heart_center_y - top_radius//2 - 2), top_radius - 2)
+            pygame.draw.circle(surf, inner_color, (heart_center_x - top_radius//2 + 2, heart_center_y - top_radius//2 - 2), top_radius - 2)
+            pygame.draw.circle(surf, inner_color, (heart_center_x + top_radius//2 - 2, heart_center_y - top_radius//2 - 2), top_radius - 2)
     
     # Texto de vidas também
-    lives_text = FONT_HEADING.render(f"x{lives}", True, DANGER if lives > 0 else GRAY_600)
-    screen.blit(lives_text, (hearts_x + 110, hearts_y + 5))
+    lives_text = render_text(FONT_HEADING, f"x{lives}", True, DANGER if lives > 0 else GRAY_600)
+    surf.blit(lives_text, (hearts_x + 110, hearts_y + 5))
 
     # Card principal de informações com gradiente e borda destacada (estilo game)
-    card_main = draw_card(screen, (50, 100, WIDTH-100, 150), BG_CARD, gradient=True)
+    card_main = draw_card(surf, (50, 100, WIDTH-100, 150), BG_CARD, gradient=True)
     # Borda brilhante no card principal
-    pygame.draw.rect(screen, ACCENT, card_main, width=2, border_radius=20)
+    pygame.draw.rect(surf, ACCENT, card_main, width=2, border_radius=20)
 
     # Música (oculta ou revelada) - estilo game
     nome_show = current_song_data.nome if state == 'gameover' else '???'
-    music_label = FONT_SMALL.render("MÚSICA", True, TEXT_SECONDARY)
+    music_label = render_text(FONT_SMALL, "MÚSICA", True, TEXT_SECONDARY)
     music_name_color = ACCENT if state == 'gameover' else WARNING
-    music_name = FONT_HEADING.render(nome_show, True, music_name_color)
     # Sombra no nome da música para efeito 3D
-    shadow_music = FONT_HEADING.render(nome_show, True, (0, 0, 0))
-    screen.blit(shadow_music, (card_main.x + 32, card_main.y + 52))
-    screen.blit(music_label, (card_main.x + 30, card_main.y + 25))
-    screen.blit(music_name, (card_main.x + 30, card_main.y + 50))
+    music_name = render_text(FONT_HEADING, nome_show, True, music_name_color, shadow=2)
+    surf.blit(music_label, (card_main.x + 30, card_main.y + 25))
+    surf.blit(music_name, (card_main.x + 30, card_main.y + 50))
 
     # Notas liberadas - estilo game badge
     displayed = [n[0] for n in current_song_seq[:current_index]]
     txt = " • ".join(displayed) if displayed else "Nenhuma nota revelada ainda"
-    notes_label = FONT_SMALL.render("NOTAS REVELADAS", True, TEXT_SECONDARY)
-    notes_text = FONT.render(txt, True, SUCCESS if displayed else TEXT_SECONDARY)
-    screen.blit(notes_label, (card_main.x + 30, card_main.y + 95))
+    notes_label = render_text(FONT_SMALL, "NOTAS REVELADAS", True, TEXT_SECONDARY)
+    notes_text = render_text(FONT, txt, True, SUCCESS if displayed else TEXT_SECONDARY)
+    surf.blit(notes_label, (card_main.x + 30, card_main.y + 95))
     # Badge para notas reveladas
     notes_badge_rect = pygame.Rect(card_main.x + 30, card_main.y + 120, len(txt) * 12 + 20, 30)
-    draw_card(screen, notes_badge_rect, BG_SURFACE, border_radius=15)
-    screen.blit(notes_text, (notes_badge_rect.x + 10, notes_badge_rect.y + 5))
+    draw_card(surf, notes_badge_rect, BG_SURFACE, border_radius=15)
+    surf.blit(notes_text, (notes_badge_rect.x + 10, notes_badge_rect.y + 5))
 
-    # Próxima nota (se houver) - card destacado estilo game
-    global play_here_button
+    # Próxima nota (se houver) - card destacado estilo game (a borda pulsante é um widget)
     if current_index < len(current_song_seq):
-        card_next = draw_card(screen, (400, 100, 550, 150), BG_SURFACE, gradient=True)
-        # Borda pulsante na próxima nota
-        pulse_time = pygame.time.get_ticks() * 0.005
-        pulse_intensity = 0.7 + 0.3 * math.sin(pulse_time)
-        border_color_pulse = tuple(int(c * pulse_intensity) for c in WARNING)
-        pygame.draw.rect(screen, border_color_pulse, card_next, width=3, border_radius=20)
+        card_next = draw_card(surf, NEXT_CARD_RECT, BG_SURFACE, gradient=True)
         
-        next_label = FONT_SMALL.render("PRÓXIMA NOTA", True, TEXT_SECONDARY)
-        next_value = FONT_TITLE.render("?", True, WARNING)
+        next_label = render_text(FONT_SMALL, "PRÓXIMA NOTA", True, TEXT_SECONDARY)
         # Sombra na interrogação
-        shadow_next = FONT_TITLE.render("?", True, (0, 0, 0))
-        screen.blit(shadow_next, (card_next.x + 32, card_next.y + 52))
-        screen.blit(next_label, (card_next.x + 30, card_next.y + 25))
-        screen.blit(next_value, (card_next.x + 30, card_next.y + 50))
-
-        btn_play_here = Button("Ouvir", (card_next.x + 200, card_next.y + 60, 150, 50), color=WARNING, font=FONT_SMALL)
-        btn_play_here.draw(screen)
+        next_value = render_text(FONT_TITLE, "?", True, WARNING, shadow=2)
+        surf.blit(next_label, (card_next.x + 30, card_next.y + 25))
+        surf.blit(next_value, (card_next.x + 30, card_next.y + 50))
+
+def play_layer_key():
+    """Tudo de que a camada estática do jogo depende"""
+    return (current_song_data.nome if current_song_data else None, len(current_song_seq), current_index,
+            score, lives, state)
+
+def next_card_border_color():
+    # Borda pulsante na próxima nota
+    pulse_time = pygame.time.get_ticks() * 0.005
+    pulse_intensity = 0.7 + 0.3 * math.sin(pulse_time)
+    return tuple(int(c * pulse_intensity) for c in WARNING)
+
+@profiler.timed()
+def draw_next_card_border(surf):
+    pygame.draw.rect(surf, next_card_border_color(), NEXT_CARD_RECT, width=3, border_radius=20)
+
+def play_widgets():
+    """
+    Widgets (id, retângulo, chave, draw, animado) da tela do jogo que ficam sob
+    o modal: a borda pulsante da próxima nota e os botões de ação
+    """
+    global play_here_button
+    widgets = []
+    if current_index < len(current_song_seq):
+        color = next_card_border_color()
+        for i, strip in enumerate(NEXT_CARD_BORDER):
+            widgets.append((("next_card_border", i), strip, color, draw_next_card_border, True))
+        widgets.append(button_widget(btn_play_here))
         play_here_button = btn_play_here
 
     # Botões de ação - estilo game com ícones
-    # Botões de ação
-    btn_repeat.draw(screen)
-    btn_action_sing.draw(screen)
-    btn_guess.draw(screen)
-
-    # Desenha o modal de adivinhar música se estiver aberto
-    global btn_modal_confirm, btn_modal_cancel
-    if guess_modal_open:
-        btn_modal_confirm, btn_modal_cancel = draw_guess_modal()
-
-    # Mensagem de feedback - estilo game notification
-    if message:
-        msg_color = WARNING if "tempo" in message.lower() else SUCCESS if "acertou" in message.lower() or "perfeito" in message.lower() else DANGER if "errou" in message.lower() else TEXT_PRIMARY
-
-        # Texto fica branco sobre fundo vermelho de erro para legibilidade
-        msg_text_color = WHITE if "errou" in message.lower() else msg_color
-
-        # Card de notificação
-        msg_surf = FONT.render(message, True, msg_text_color)
-        msg_card_rect = pygame.Rect(50, HEIGHT - 80, msg_surf.get_width() + 40, 50)
-        msg_bg_color = BG_CARD
-        msg_bg_alpha = 200
-        if "acertou" in message.lower() or "perfeito" in message.lower():
-            msg_bg_color = tuple(min(255, c + 30) for c in SUCCESS)
-        elif "errou" in message.lower():
-            msg_bg_color = tuple(min(255, c + 30) for c in DANGER)
-        elif "tempo" in message.lower():
-            msg_bg_color = tuple(min(255, c + 30) for c in WARNING)
-        
-        msg_card_surf = pygame.Surface((msg_card_rect.w, msg_card_rect.h), pygame.SRCALPHA)
-        # Aplica alpha ao fundo
-        bg_with_alpha = (*msg_bg_color, msg_bg_alpha)
-        pygame.draw.rect(msg_card_surf, bg_with_alpha, msg_card_surf.get_rect(), border_radius=15)
-        pygame.draw.rect(msg_card_surf, (*msg_color, 255), msg_card_surf.get_rect(), width=2, border_radius=15)
-        screen.blit(msg_card_surf, msg_card_rect.topleft)
-        screen.blit(msg_surf, (msg_card_rect.x + 20, msg_card_rect.y + 10))
-        msg_color = WARNING if "tempo" in message.lower() else SUCCESS if "acertou" in message.lower() else TEXT_PRIMARY
-        msg_surf = FONT_SMALL.render(message, True, msg_color)
-
-    # Botão para retornar ao menu
-    btn_menu.draw(screen)
-    
+    for btn in (btn_repeat, btn_action_sing, btn_guess):
+        widgets.append(button_widget(btn))
+    return widgets
+
+@profiler.timed()
+def draw_message(surf):
+    """Mensagem de feedback - estilo game notification"""
+    msg_color = WARNING if "tempo" in message.lower() else SUCCESS if "acertou" in message.lower() or "perfeito" in message.lower() else DANGER if "errou" in message.lower() else TEXT_PRIMARY
+
+    # Texto fica branco sobre fundo vermelho de erro para legibilidade
+    msg_text_color = WHITE if "errou" in message.lower() else msg_color
+
+    # Card de notificação
+    msg_surf = render_text(FONT, message, True, msg_text_color)
+    msg_card_rect = pygame.Rect(50, HEIGHT - 80, msg_surf.get_width() + 40, 50)
+    msg_bg_color = BG_CARD
+    msg_bg_alpha = 200
+    if "acertou" in message.lower() or "perfeito" in message.lower():
+        msg_bg_color = tuple(min(255, c + 30) for c in SUCCESS)
+    elif "errou" in message.lower():
+        msg_bg_color = tuple(min(255, c + 30) for c in DANGER)
+    elif "tempo" in message.lower():
+        msg_bg_color = tuple(min(255, c + 30) for c in WARNING)
+    
+    msg_card_surf = new_surface((msg_card_rect.w, msg_card_rect.h), pygame.SRCALPHA)
+    # Aplica alpha ao fundo
+    bg_with_alpha = (*msg_bg_color, msg_bg_alpha)
+    pygame.draw.rect(msg_card_surf, bg_with_alpha, msg_card_surf.get_rect(), border_radius=15)
+    pygame.draw.rect(msg_card_surf, (*msg_color, 255), msg_card_surf.get_rect(), width=2, border_radius=15)
+    surf.blit(msg_card_surf, msg_card_rect.topleft)
+    surf.blit(msg_surf, (msg_card_rect.x + 20, msg_card_rect.y + 10))
+
+def draw_animations(surf):
     # Desenha a animação de sucesso se ativa
     draw_success_animation()
     
@@ -1558,43 +1679,86 @@ def draw_play():
     draw_music_success_animation()
     draw_music_error_animation()
 
-def draw_detector():
+@profiler.timed()
+def draw_play():
+    if guess_modal_open:
+        # Com o modal aberto, a tela do jogo fica congelada sob o overlay, na camada estática
+        def draw_frozen(surf):
+            draw_play_static(surf)
+            for _, _, _, draw, _ in play_widgets():
+                draw(surf)
+            draw_guess_modal_static(surf)
+        compositor.begin("play_modal", play_layer_key(), draw_frozen)
+        draw_guess_modal()
+    else:
+        compositor.begin("play", play_layer_key(), draw_play_static)
+        for widget in play_widgets():
+            compositor.widget(*widget)
+
+    if message:
+        compositor.widget("message", (50, HEIGHT - 80, FONT.size(message)[0] + 40, 50), message, draw_message)
+
+    # Botão para retornar ao menu
+    draw_button(btn_menu)
+
+    if show_success_animation or show_music_success_animation or show_music_error_animation:
+        compositor.widget("animations", (0, 0, WIDTH, HEIGHT), ALWAYS, draw_animations)
+
+DETECT_CARD_RECT = pygame.Rect(50, 320, WIDTH-350, 250)
+
+def detector_target():
+    return current_song_seq[current_index][0] if current_index < len(current_song_seq) else "-"
+
+@profiler.timed()
+def draw_detector_static(surf):
     purple_start = (60, 20, 80)
     blue_end = (20, 40, 100)    
-    draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
 
-    draw_text_with_shadow(screen, "DETECTOR DE PITCH", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
+    draw_text_with_shadow(surf, "DETECTOR DE PITCH", FONT_SUBTITLE, ACCENT, (50, 30), shadow_offset=3)
 
-    target = current_song_seq[current_index][0] if current_index < len(current_song_seq) else "-"
-    card_target = draw_card(screen, (50, 100, WIDTH-350, 200), BG_CARD, gradient=True)
+    target = detector_target()
+    card_target = draw_card(surf, (50, 100, WIDTH-350, 200), BG_CARD, gradient=True)
 
-    target_label = FONT_SMALL.render("Cante e SEGURE esta nota:", True, TEXT_SECONDARY)
-    screen.blit(target_label, (card_target.x + 30, card_target.y + 25))
+    target_label = render_text(FONT_SMALL, "Cante e SEGURE esta nota:", True, TEXT_SECONDARY)
+    surf.blit(target_label, (card_target.x + 30, card_target.y + 25))
 
-    target_surf = FONT_TITLE.render(target, True, WARNING)
-    screen.blit(target_surf, (card_target.x + 30, card_target.y + 60))
+    target_surf = render_text(FONT_TITLE, target, True, WARNING)
+    surf.blit(target_surf, (card_target.x + 30, card_target.y + 60))
 
-    instruction = FONT_TINY.render("Mantenha a nota estável por 1 segundo", True, TEXT_SECONDARY)
-    screen.blit(instruction, (card_target.x + 30, card_target.y + 160))
+    instruction = render_text(FONT_TINY, "Mantenha a nota estável por 1 segundo", True, TEXT_SECONDARY)
+    surf.blit(instruction, (card_target.x + 30, card_target.y + 160))
 
     # Card de detecção com gradiente
-    card_detect = draw_card(screen, (50, 320, WIDTH-350, 250), BG_SURFACE, gradient=True)
+    card_detect = draw_card(surf, DETECT_CARD_RECT, BG_SURFACE, gradient=True)
+
+    detect_label = render_text(FONT_SMALL, "Detecção em tempo real:", True, TEXT_SECONDARY)
+    surf.blit(detect_label, (card_detect.x + 30, card_detect.y + 25))
 
-    detect_label = FONT_SMALL.render("Detecção em tempo real:", True, TEXT_SECONDARY)
-    screen.blit(detect_label, (card_detect.x + 30, card_detect.y + 25))
+def detector_message_color():
+    msg_color = WARNING if detector.running else TEXT_SECONDARY
+    if detector_result is True: msg_color = SUCCESS
+    elif detector_result is False: msg_color = DANGER
+    return msg_color
+
+@profiler.timed()
+def draw_detector_reading(surf):
+    """Leitura atual, agulha, alvo e mensagem de status (um widget: os quatro se sobrepõem)"""
+    card_detect = DETECT_CARD_RECT
+    target = detector_target()
     target_freq = NOTE_FREQS.get(target)
     gauge_rect = (card_detect.x + 30, card_detect.y + 120, card_detect.w - 60, 120)
 
     if detected_name:
-        detected_surf = FONT_HEADING.render(detected_name, True, SUCCESS)
-        freq_surf = FONT_SMALL.render(f"{detected_freq:.1f} Hz", True, TEXT_SECONDARY)
-        screen.blit(detected_surf, (card_detect.x + 30, card_detect.y + 60))
-        screen.blit(freq_surf, (card_detect.x + 30, card_detect.y + 95))
+        detected_surf = render_text(FONT_HEADING, detected_name, True, SUCCESS)
+        freq_surf = render_text(FONT_SMALL, f"{detected_freq:.1f} Hz", True, TEXT_SECONDARY)
+        surf.blit(detected_surf, (card_detect.x + 30, card_detect.y + 60))
+        surf.blit(freq_surf, (card_detect.x + 30, card_detect.y + 95))
 
         deviation_to_use = detected_deviation_hz if detected_deviation_hz is not None else (detected_freq - target_freq if target_freq else None)
 
         draw_needle_gauge(
-            screen,
+            surf,
             gauge_rect,
             detected_freq,
             target_freq,
@@ -1604,10 +1768,10 @@ def draw_detector():
         )
 
     else:
-        no_detect = FONT.render("Aguardando entrada...", True, TEXT_SECONDARY)
-        screen.blit(no_detect, (card_detect.x + 30, card_detect.y + 60))
+        no_detect = render_text(FONT, "Aguardando entrada...", True, TEXT_SECONDARY)
+        surf.blit(no_detect, (card_detect.x + 30, card_detect.y + 60))
         draw_needle_gauge(
-            screen,
+            surf,
             gauge_rect,
             None,
             target_freq,
@@ -1617,16 +1781,54 @@ def draw_detector():
         )
 
     if target_freq:
-        target_text = FONT_TINY.render(f"Alvo: {target} = {target_freq:.1f} Hz", True, TEXT_SECONDARY)
-        screen.blit(target_text, (card_detect.x + 30, card_detect.y + 110))
+        target_text = render_text(FONT_TINY, f"Alvo: {target} = {target_freq:.1f} Hz", True, TEXT_SECONDARY)
+        surf.blit(target_text, (card_detect.x + 30, card_detect.y + 110))
 
     # Mensagem de status
     msg_y = card_detect.y + 215
-    msg_color = WARNING if detector.running else TEXT_SECONDARY
-    if detector_result is True: msg_color = SUCCESS
-    elif detector_result is False: msg_color = DANGER
-    msg_surf = FONT_SMALL.render(message, True, msg_color)
-    screen.blit(msg_surf, (card_detect.x + 40, msg_y))
+    msg_color = detector_message_color()
+    msg_surf = render_text(FONT_SMALL, message, True, msg_color)
+    surf.blit(msg_surf, (card_detect.x + 40, msg_y))
+
+def detector_status_texts():
+    # Estado do microfone (a sessão fica aberta entre tomadas)
+    if detector.status in ("indisponível", "reabrindo"):
+        status_text = "Microfone indisponível, tentando reabrir..."
+    elif detector.time_to_first_estimate_ms is not None:
+        status_text = f"Primeira estimativa em {detector.time_to_first_estimate_ms:.0f} ms"
+    else:
+        status_text = ""
+
+    # Quadros descartados pelas portas de silêncio/confiança antes do estimador
+    gate = detector.stats()
+    gate_text = (f"Silêncio: {gate['skipped_peak'] + gate['skipped_rms']} | "
+                 f"Baixa confiança: {gate['skipped_confidence']} | Analisados: {gate['passed']}")
+    if gate["analysis_errors"]:
+        gate_text += f" | Erros: {gate['analysis_errors']}"
+    return status_text, gate_text
+
+@profiler.timed()
+def draw_detector_status(surf):
+    card_detect = DETECT_CARD_RECT
+    status_text, gate_text = detector_status_texts()
+    if status_text:
+        status_surf = render_text(FONT_TINY, status_text, True, TEXT_SECONDARY)
+        surf.blit(status_surf, (card_detect.right - status_surf.get_width() - 30, card_detect.y + 25))
+    gate_surf = render_text(FONT_TINY, gate_text, True, TEXT_SECONDARY)
+    surf.blit(gate_surf, (card_detect.right - gate_surf.get_width() - 30, card_detect.y + 45))
+
+@profiler.timed()
+def draw_detector():
+    card_detect = DETECT_CARD_RECT
+    compositor.begin("detector", detector_target(), draw_detector_static)
+
+    reading = (detected_name, f"{detected_freq:.1f}" if detected_name else None, detected_deviation_hz,
+               message, detector_message_color())
+    compositor.widget("detector_reading", (card_detect.x + 10, card_detect.y + 55, card_detect.w - 20, 190),
+                      reading, draw_detector_reading)
+    # Cobre o rótulo da esquerda também: ao restaurar, ele volta da camada estática
+    compositor.widget("detector_status", (card_detect.x + 20, card_detect.y + 20, card_detect.w - 40, 45),
+                      detector_status_texts(), draw_detector_status)
 
     cooldown_active = time.time() < button_cooldown_until
     if cooldown_active:
@@ -1638,117 +1840,379 @@ def draw_detector():
 
 
     # Botões de controle (lado direito)
-    btn_play_target.draw(screen)
-    btn_start_listen.draw(screen)
-    btn_skip_confirm.draw(screen)
-
-    btn_back.draw(screen)
+    draw_button(btn_play_target)
+    draw_button(btn_start_listen)
+    draw_button(btn_skip_confirm)
+
+    if group_session:
+        compositor.widget("group_players", group_players_rect(), group_players_state(), draw_group_players)
+
+    draw_button(btn_back)
+
+def group_players_rect():
+    # + 2 px da sombra do card
+    return pygame.Rect(WIDTH-280, 360, 240, 42 + 26 * len(group_session.players))
+
+def group_players_state():
+    return tuple((p.name, p.note, p.score, p.lives, p.result, p.eliminated) for p in group_session.players)
+
+@profiler.timed()
+def draw_group_players(surf):
+    """Placar da aula em grupo: nota atual, vidas e pontos de cada jogador."""
+    players = group_session.players
+    card = draw_card(surf, (WIDTH-280, 360, 240, 40 + 26 * len(players)), BG_CARD, border_radius=15)
+    title = render_text(FONT_SMALL, "JOGADORES", True, TEXT_SECONDARY)
+    surf.blit(title, (card.x + 15, card.y + 10))
+
+    y = card.y + 38
+    for p in players:
+        if p.eliminated:
+            color = GRAY_600
+        elif p.result is True:
+            color = SUCCESS
+        elif p.result is False:
+            color = DANGER
+        else:
+            color = TEXT_PRIMARY
+        name_surf = render_text(FONT_TINY, p.name[:10], True, color)
+        note_surf = render_text(FONT_TINY, p.note or "-", True, color)
+        info_surf = render_text(FONT_TINY, f"{p.score} pts  x{max(p.lives, 0)}", True, color)
+        surf.blit(name_surf, (card.x + 15, y))
+        surf.blit(note_surf, (card.x + 110, y))
+        surf.blit(info_surf, (card.right - info_surf.get_width() - 15, y))
+        y += 26
+
+@profiler.timed()
+def draw_gameover_static(surf):
+    # Background com gradiente roxo-azul
+    purple_start = (60, 20, 80)  # Roxo escuro
+    blue_end = (20, 40, 100)     # Azul escuro
+    draw_gradient(surf, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
+
+    # Card central de game over com gradiente
+    card = draw_card(surf, (WIDTH//2 - 300, HEIGHT//2 - 250, 600, 500), BG_CARD, gradient=True)
+
+    # Borda brilhante no card
+    pygame.draw.rect(surf, DANGER, card, width=3, border_radius=20)
+
+    # Título com sombra
+    title_surf = render_text(FONT_TITLE, "FIM DE JOGO", True, DANGER, shadow=2)
+    surf.blit(title_surf, (WIDTH//2 - (title_surf.get_width() - 2)//2, card.y + 50))
+
+    # Pontuação com destaque - estilo game
+    score_label = render_text(FONT_SMALL, "PONTUAÇÃO FINAL", True, TEXT_SECONDARY)
+    surf.blit(score_label, (WIDTH//2 - score_label.get_width()//2, card.y + 130))
+
+    # Card para pontuação
+    score_card = draw_card(surf, (WIDTH//2 - 150, card.y + 160, 300, 80), BG_SURFACE, border_radius=15, gradient=True)
+    pygame.draw.rect(surf, (255, 215, 0), score_card, width=2, border_radius=15)
+
+    score_surf = render_text(FONT_TITLE, f"{score}", True, (255, 215, 0), shadow=2)  # Dourado
+    surf.blit(score_surf, (WIDTH//2 - (score_surf.get_width() - 2)//2, card.y + 185))
+
+    # Pontos ou Ponto (singular/plural)
+    pontos_text = "pontos" if score != 1 else "ponto"
+    pontos_surf = render_text(FONT_SMALL, pontos_text, True, TEXT_SECONDARY)
+    surf.blit(pontos_surf, (WIDTH//2 - pontos_surf.get_width()//2, card.y + 245))
+
+    # Música revelada
+    music_name = current_song_data.nome if current_song_data else "Desconhecida"
+    music_label = render_text(FONT_SMALL, "A MÚSICA ERA", True, TEXT_SECONDARY)
+    surf.blit(music_label, (WIDTH//2 - music_label.get_width()//2, card.y + 280))
+
+    # Card para nome da música
+    music_card = draw_card(surf, (WIDTH//2 - 200, card.y + 310, 400, 50), BG_SURFACE, border_radius=15)
+    music_surf = render_text(FONT_HEADING, music_name, True, WARNING)
+    surf.blit(music_surf, (WIDTH//2 - music_surf.get_width()//2, card.y + 320))
+
+@profiler.timed()
+def draw_gameover():
+    music_name = current_song_data.nome if current_song_data else None
+    compositor.begin("gameover", (score, music_name), draw_gameover_static)
+
+    # Botões de ação - estilo game
+    draw_button(btn_play_again)
+    draw_button(btn_menu_gameover)
+
+LATENCY_OVERLAY_RECT = pygame.Rect(WIDTH - 380, 10, 370, 200 + 20 * len(STAGES))
+
+@profiler.timed()
+def draw_latency_overlay(surf):
+    """Overlay (F3) com p50/p95/p99 de cada estágio da latência microfone -> tela"""
+    overlay_rect = LATENCY_OVERLAY_RECT
+    overlay = new_surface(overlay_rect.size, pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 190))
+    surf.blit(overlay, overlay_rect.topleft)
+
+    header = render_text(FONT_TINY, "Latência (ms)      p50     p95     p99", True, TEXT_SECONDARY)
+    surf.blit(header, (overlay_rect.x + 10, overlay_rect.y + 10))
+    y = overlay_rect.y + 32
+    for stage in STAGES:
+        p = latency_stats.percentiles(stage)
+        values = f"{p['p50']:6.1f}  {p['p95']:6.1f}  {p['p99']:6.1f}" if p else "   -       -       -"
+        label = render_text(FONT_TINY, STAGE_LABELS[stage], True, TEXT_PRIMARY)
+        value = render_text(FONT_TINY, values, True, TEXT_PRIMARY)
+        surf.blit(label, (overlay_rect.x + 10, y))
+        surf.blit(value, (overlay_rect.right - value.get_width() - 10, y))
+        y += 20
+
+    replay = replay_renderer.stats()
+    render_ms = f"{replay['last_render_ms']:.1f} ms" if replay["last_render_ms"] is not None else "-"
+    replay_text = render_text(FONT_TINY, f"Replay: {replay['notes']} notas ({replay['seconds']:.1f}s), "
+                                   f"última extensão {render_ms}", True, TEXT_SECONDARY)
+    surf.blit(replay_text, (overlay_rect.x + 10, y))
+
+    if audio_mixer.available:
+        m = audio_mixer.stats()
+        mixer_text = (f"Mixer: {m['active_voices']}/{m['voices']} vozes | underruns {m['underruns']} | "
+                      f"callback {m['callback_ms_avg']:.2f}/{m['budget_ms']:.0f} ms")
+    else:
+        mixer_text = "Mixer: indisponível (pygame.mixer)"
+    surf.blit(render_text(FONT_TINY, mixer_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 20))
+
+    g = gradient_cache.stats()
+    gradient_text = (f"Gradientes: {g['entries']} ({g['bytes'] / 1048576:.1f}/{GRADIENT_CACHE_MB} MB) | "
+                     f"{g['hits']} acertos, {g['misses']} montados")
+    surf.blit(render_text(FONT_TINY, gradient_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 40))
+
+    sc = surface_counter.stats()
+    surfaces_text = f"Surfaces por quadro: {sc['last']} (média {sc['avg']:.1f}, pico {sc['peak']})"
+    surf.blit(render_text(FONT_TINY, surfaces_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 60))
+
+    t = text_cache.stats()
+    text_text = (f"Textos: {t['entries']} ({t['bytes'] / 1048576:.1f}/{TEXT_CACHE_MB} MB) | "
+                 f"{100 * t['hit_rate']:.0f}% acertos, {t['render_ms']:.0f} ms no SDL_ttf")
+    surf.blit(render_text(FONT_TINY, text_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 80))
+
+    f = font_registry.stats()
+    startup = f"{first_frame_ms:.0f} ms" if first_frame_ms is not None else "-"
+    font_text = (f"Fontes: {f['fonts']} criadas, {f['created_last_frame']} no último quadro | "
+                 f"1º quadro {startup}")
+    surf.blit(render_text(FONT_TINY, font_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 100))
+
+    c = compositor.stats()
+    compositor_text = (f"Compositor: {c['pixels_last'] / 1000:.0f}k px no último quadro "
+                       f"(média {100 * c['pixels_avg'] / (WIDTH * HEIGHT):.0f}% da tela), {c['rects_last']} retângulos")
+    surf.blit(render_text(FONT_TINY, compositor_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 120))
+
+    r = pacer.stats()
+    pacing_text = (f"Ritmo: {r['fps']} fps ({'ativo' if r['active'] else 'parado'}) | "
+                   f"{r['work_ms_last']:.1f}/{r['budget_ms']:.1f} ms | {r['missed']} quadros atrasados")
+    surf.blit(render_text(FONT_TINY, pacing_text, True, TEXT_SECONDARY), (overlay_rect.x + 10, y + 140))
+
+PROFILER_ROWS = 10  # Funções mais lentas mostradas no overlay
+PROFILER_OVERLAY_RECT = pygame.Rect(10, 10, 380, 70 + 20 * (len(PHASES) + PROFILER_ROWS))
+
+def draw_profiler_overlay(surf):
+    """Overlay (F4) com p50/p99 das fases do loop e das funções de desenho mais lentas"""
+    overlay_rect = PROFILER_OVERLAY_RECT
+    overlay = new_surface(overlay_rect.size, pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 190))
+    surf.blit(overlay, overlay_rect.topleft)
+
+    def row(label, p, y, color=TEXT_PRIMARY):
+        values = f"{p['p50']:6.2f}  {p['p99']:6.2f}" if p else "   -       -"
+        surf.blit(render_text(FONT_TINY, label, True, color), (overlay_rect.x + 10, y))
+        value = render_text(FONT_TINY, values, True, color)
+        surf.blit(value, (overlay_rect.right - value.get_width() - 10, y))
+
+    header = render_text(FONT_TINY, f"Quadro (ms), {profiler.frames} gravados      p50     p99", True, TEXT_SECONDARY)
+    surf.blit(header, (overlay_rect.x + 10, overlay_rect.y + 10))
+    y = overlay_rect.y + 32
+    for phase in PHASES:
+        row(PHASE_LABELS[phase], profiler.percentiles(phase), y)
+        y += 20
+
+    title = render_text(FONT_TINY, f"Funções mais lentas (p99) | CSV: {PROFILE_CSV_FILE}", True, TEXT_SECONDARY)
+    surf.blit(title, (overlay_rect.x + 10, y + 6))
+    y += 28
+    for name, p in profiler.slowest(PROFILER_ROWS):
+        row(name, p, y, TEXT_SECONDARY)
+        y += 20
 
 # ==============================================================================
 # LOOP PRINCIPAL
 # ==============================================================================
-running = True
-play_here_button = None 
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        if state == 'menu':
-            if btn_start.clicked(event):
-                lives = 3
-                score = 0
-                start_round()
-                if current_song_seq:
-                    primeira_nota = current_song_seq[0]
-                    threading.Thread(target=play_note, args=(NOTE_FREQS[primeira_nota[0]], primeira_nota[1]), daemon=True).start()
-                state = 'play'
-            if btn_rules.clicked(event):
-                state = 'rules'
-            if btn_conf.clicked(event):
-                state = 'settings'
-
-        elif state in ('rules', 'settings'):
-            if btn_back.clicked(event):
-                state = 'menu'
-
-        elif state == 'play':
-            if btn_menu.clicked(event):
-                detector.stop()
-                input_active = False
-                user_text = ""
-                message = ""
-                state = 'menu'
-
-            if btn_repeat.clicked(event):
-                def replay():
-                    notas_reveladas = current_song_seq[:current_index]
-                    for nota_nome, duracao in notas_reveladas:
-                        play_note(NOTE_FREQS[nota_nome], duracao, record=False)
-                threading.Thread(target=replay, daemon=True).start()
-
-            if play_here_button and play_here_button.clicked(event):
-                if current_index < len(current_song_seq):
-                    n = current_song_seq[current_index]
-                    threading.Thread(target=play_note, args=(NOTE_FREQS[n[0]], n[1]), daemon=True).start()
-
-            if btn_action_sing.clicked(event):
-                state = 'detector'
-                detector_result = None
-                detected_name = None
-                message = "Clique em Gravar e segure a nota por 1s."
-
-            if btn_guess.clicked(event):
-                guess_modal_open = True
-                input_active = True
-                user_text = ""  # Limpa o texto anterior
-                continue  # Pula o processamento de eventos neste frame para evitar conflitos
-
-            # Processa eventos do modal de adivinhar música
-            if guess_modal_open:
-                # Fecha o modal se clicar fora dele (no overlay)
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    modal_width = 600
-                    modal_height = 350
-                    modal_x = (WIDTH - modal_width) // 2
-                    modal_y = (HEIGHT - modal_height) // 2
-                    modal_rect = pygame.Rect(modal_x, modal_y, modal_width, modal_height)
-                    if not modal_rect.collidepoint(event.pos):
-                        # Clicou fora do modal, fecha
-                        guess_modal_open = False
-                        input_active = False
-                        user_text = ""
-                
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        # Fecha o modal ao pressionar ESC
-                        guess_modal_open = False
-                        input_active = False
-                        user_text = ""
-                    elif event.key == pygame.K_RETURN:
-                        # Processa o palpite ao pressionar ENTER
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    init_display()
+    init_audio()
+    init_detector()
+    # Abre o microfone uma vez; cada tomada só liga a análise. Na aula em grupo
+    # os microfones são dos jogadores, e o dispositivo padrão não é aberto duas vezes
+    if group_session:
+        group_session.open()
+    else:
+        detector.open()
+
+    running = True
+    play_here_button = None 
+
+    while running:
+        profiler.start_frame()
+        events = pygame.event.get()
+        profiler.lap("events")
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+
+            # A janela voltou a aparecer: o conteúdo antigo pode ter se perdido
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                compositor.invalidate()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_latency_overlay = not show_latency_overlay
+                continue
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.toggle(PROFILE_CSV_FILE)
+                continue
+
+            if state == 'menu':
+                if btn_start.clicked(event):
+                    lives = 3
+                    score = 0
+                    if group_session:
+                        group_session.reset_scores()
+                    start_round()
+                    if current_song_seq:
+                        primeira_nota = current_song_seq[0]
+                        play_note(NOTE_FREQS[primeira_nota[0]], primeira_nota[1])
+                    state = 'play'
+                if btn_rules.clicked(event):
+                    state = 'rules'
+                if btn_conf.clicked(event):
+                    state = 'settings'
+
+            elif state in ('rules', 'settings'):
+                if btn_back.clicked(event):
+                    state = 'menu'
+
+            elif state == 'play':
+                if btn_menu.clicked(event):
+                    detector.stop()
+                    input_active = False
+                    user_text = ""
+                    message = ""
+                    state = 'menu'
+
+                if btn_repeat.clicked(event):
+                    play_replay()
+
+                if play_here_button and play_here_button.clicked(event):
+                    if current_index < len(current_song_seq):
+                        n = current_song_seq[current_index]
+                        play_note(NOTE_FREQS[n[0]], n[1])
+
+                if btn_action_sing.clicked(event):
+                    state = 'detector'
+                    detector_result = None
+                    detected_name = None
+                    message = "Clique em Gravar e segure a nota por 1s."
+
+                if btn_guess.clicked(event):
+                    guess_modal_open = True
+                    input_active = True
+                    user_text = ""  # Limpa o texto anterior
+                    continue  # Pula o processamento de eventos neste frame para evitar conflitos
+
+                # Processa eventos do modal de adivinhar música
+                if guess_modal_open:
+                    # Fecha o modal se clicar fora dele (no overlay)
+                    if event.type == pygame.MOUSEBUTTONDOWN:
+                        modal_width = 600
+                        modal_height = 350
+                        modal_x = (WIDTH - modal_width) // 2
+                        modal_y = (HEIGHT - modal_height) // 2
+                        modal_rect = pygame.Rect(modal_x, modal_y, modal_width, modal_height)
+                        if not modal_rect.collidepoint(event.pos):
+                            # Clicou fora do modal, fecha
+                            guess_modal_open = False
+                            input_active = False
+                            user_text = ""
+
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            # Fecha o modal ao pressionar ESC
+                            guess_modal_open = False
+                            input_active = False
+                            user_text = ""
+                        elif event.key == pygame.K_RETURN:
+                            # Processa o palpite ao pressionar ENTER
+                            guess = user_text.strip()
+
+                            # Não processa se o palpite estiver vazio
+                            if not guess:
+                                message = "⚠ Digite o nome da música antes de confirmar!"
+                                continue
+
+                            real = current_song_data.nome or ""
+
+                            if is_similar_enough(guess, real):
+                                score += 5
+                                similarity = calculate_similarity(guess, real)
+
+                                # Mensagem diferente se acertou exatamente ou com pequenos erros
+                                if similarity == 1.0:
+                                    message = f"PERFEITO: {current_song_data.nome}!"
+                                    music_animation_message = f"PERFEITO!\n{current_song_data.nome}"
+                                else:
+                                    message = f"ACERTOU: {current_song_data.nome}!"
+                                    music_animation_message = f"ACERTOU!\n{current_song_data.nome}"
+
+                                # Ativa a animação de sucesso
+                                show_music_success_animation = True
+                                music_animation_start_time = pygame.time.get_ticks()
+
+                                start_round()
+                                if current_song_seq:
+                                    n = current_song_seq[0]
+                                    play_note(NOTE_FREQS[n[0]], n[1])
+                            else:
+                                lives -= 1
+                                similarity = calculate_similarity(guess, real)
+                                message = f"Errou! Vidas: {lives}"
+                                music_animation_message = f"ERRADO!\nVidas restantes: {lives}"
+
+                                # Ativa a animação de erro
+                                show_music_error_animation = True
+                                music_animation_start_time = pygame.time.get_ticks()
+
+                                if lives <= 0:
+                                    state = 'gameover'
+
+                            user_text = ""
+                            input_active = False
+                            guess_modal_open = False
+                        elif event.key == pygame.K_BACKSPACE:
+                            user_text = user_text[:-1]
+                        else:
+                            if len(user_text) < 40: 
+                                user_text += event.unicode
+
+                    # Verifica cliques nos botões do modal
+                    if btn_modal_confirm and btn_modal_confirm.clicked(event):
+                        # Processa o palpite
                         guess = user_text.strip()
-                        
+
                         # Não processa se o palpite estiver vazio
                         if not guess:
-                            message = "⚠ Digite o nome da música antes de confirmar!"
+                            message = "Digite o nome da música antes de confirmar!"
                             continue
-                        
+
                         real = current_song_data.nome or ""
 
                         if is_similar_enough(guess, real):
                             score += 5
                             similarity = calculate_similarity(guess, real)
 
-                            # Mensagem diferente se acertou exatamente ou com pequenos erros
                             if similarity == 1.0:
                                 message = f"PERFEITO: {current_song_data.nome}!"
                                 music_animation_message = f"PERFEITO!\n{current_song_data.nome}"
                             else:
                                 message = f"ACERTOU: {current_song_data.nome}!"
                                 music_animation_message = f"ACERTOU!\n{current_song_data.nome}"
-                            
+
                             # Ativa a animação de sucesso
                             show_music_success_animation = True
                             music_animation_start_time = pygame.time.get_ticks()
@@ -1756,199 +2220,127 @@ while running:
                             start_round()
                             if current_song_seq:
                                 n = current_song_seq[0]
-                                threading.Thread(target=play_note, args=(NOTE_FREQS[n[0]], n[1]), daemon=True).start()
+                                play_note(NOTE_FREQS[n[0]], n[1])
                         else:
                             lives -= 1
                             similarity = calculate_similarity(guess, real)
                             message = f"Errou! Vidas: {lives}"
                             music_animation_message = f"ERRADO!\nVidas restantes: {lives}"
-                            
+
                             # Ativa a animação de erro
                             show_music_error_animation = True
                             music_animation_start_time = pygame.time.get_ticks()
-                            
+
                             if lives <= 0:
                                 state = 'gameover'
-                        
+
                         user_text = ""
                         input_active = False
                         guess_modal_open = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        user_text = user_text[:-1]
-                    else:
-                        if len(user_text) < 40: 
-                            user_text += event.unicode
-                
-                # Verifica cliques nos botões do modal
-                if btn_modal_confirm and btn_modal_confirm.clicked(event):
-                    # Processa o palpite
-                    guess = user_text.strip()
-                    
-                    # Não processa se o palpite estiver vazio
-                    if not guess:
-                        message = "Digite o nome da música antes de confirmar!"
-                        continue
-                    
-                    real = current_song_data.nome or ""
-
-                    if is_similar_enough(guess, real):
-                        score += 5
-                        similarity = calculate_similarity(guess, real)
-
-                        if similarity == 1.0:
-                            message = f"PERFEITO: {current_song_data.nome}!"
-                            music_animation_message = f"PERFEITO!\n{current_song_data.nome}"
-                        else:
-                            message = f"ACERTOU: {current_song_data.nome}!"
-                            music_animation_message = f"ACERTOU!\n{current_song_data.nome}"
-                        
-                        # Ativa a animação de sucesso
-                        show_music_success_animation = True
-                        music_animation_start_time = pygame.time.get_ticks()
-
-                        start_round()
-                        if current_song_seq:
-                            n = current_song_seq[0]
-                            threading.Thread(target=play_note, args=(NOTE_FREQS[n[0]], n[1]), daemon=True).start()
-                    else:
-                        lives -= 1
-                        similarity = calculate_similarity(guess, real)
-                        message = f"Errou! Vidas: {lives}"
-                        music_animation_message = f"ERRADO!\nVidas restantes: {lives}"
-                        
-                        # Ativa a animação de erro
-                        show_music_error_animation = True
-                        music_animation_start_time = pygame.time.get_ticks()
-                        
-                        if lives <= 0:
-                            state = 'gameover'
-                    
-                    user_text = ""
-                    input_active = False
-                    guess_modal_open = False
-                
-                if btn_modal_cancel and btn_modal_cancel.clicked(event):
-                    # Fecha o modal sem processar
-                    guess_modal_open = False
-                    input_active = False
-                    user_text = ""
 
+                    if btn_modal_cancel and btn_modal_cancel.clicked(event):
+                        # Fecha o modal sem processar
+                        guess_modal_open = False
+                        input_active = False
+                        user_text = ""
 
-        elif state == 'detector':
-            if btn_back.clicked(event):
-                detector.stop()
-                state = 'play'
-
-            if btn_play_target.clicked(event):
-                if current_index < len(current_song_seq):
-                    n = current_song_seq[current_index]
-                    threading.Thread(target=play_note, args=(NOTE_FREQS[n[0]], n[1]), daemon=True).start()
 
-            cooldown_active = time.time() < button_cooldown_until
+            elif state == 'detector':
+                if btn_back.clicked(event):
+                    detector.stop()
+                    if group_session:
+                        group_session.cancel()
+                    state = 'play'
 
-            if not cooldown_active and btn_start_listen.clicked(event):
-                if current_index < len(current_song_seq):
-                    target_name = current_song_seq[current_index][0]
-                    start_detector_thread(target_name)
+                if btn_play_target.clicked(event):
+                    if current_index < len(current_song_seq):
+                        n = current_song_seq[current_index]
+                        play_note(NOTE_FREQS[n[0]], n[1])
 
-                button_cooldown_until = time.time() + 10
+                cooldown_active = time.time() < button_cooldown_until
 
-            if btn_skip_confirm.clicked(event):
-                if detector_result is True:
-                    # Ativa a animação de sucesso
-                    show_success_animation = True
-                    success_animation_start_time = pygame.time.get_ticks()
-                    
-                    current_index += 1
-                    message = "Nota desbloqueada!"
-                    state = 'play'
-                else:
-                    message = "Segure a nota por 1s até aparecer ACERTOU."
+                if not cooldown_active and btn_start_listen.clicked(event):
+                    if current_index < len(current_song_seq):
+                        target_name = current_song_seq[current_index][0]
+                        start_detector_thread(target_name)
 
-        elif state == 'gameover':
-            # Calcula as mesmas coordenadas usadas no desenho
-            card_y = HEIGHT//2 - 250
-            btn_y1 = card_y + 390
-            btn_y2 = card_y + 465
-            
-            # Verifica cliques nos botões do game over
-            btn_play_again = Button("JOGAR NOVAMENTE", (WIDTH//2 - 150, btn_y1, 300, 60), 
-                                   color=SUCCESS, hover=SUCCESS_HOVER, font=FONT_HEADING)
-            btn_menu_gameover = Button("MENU PRINCIPAL", (WIDTH//2 - 150, btn_y2, 300, 60), 
-                                      color=ACCENT, hover=ACCENT_HOVER, font=FONT_HEADING)
-            
-            if btn_play_again.clicked(event):
-                lives = 3
-                score = 0
-                start_round(force_new=True)  # Força escolher uma música diferente
-                if current_song_seq:
-                    primeira_nota = current_song_seq[0]
-                    threading.Thread(target=play_note, args=(NOTE_FREQS[primeira_nota[0]], primeira_nota[1]), daemon=True).start()
-                state = 'play'
-            if btn_menu_gameover.clicked(event):
-                state = 'menu'
-
-    if state == 'menu': draw_menu()
-    elif state == 'rules': draw_rules()
-    elif state == 'settings': draw_settings()
-    elif state == 'play': draw_play()
-    elif state == 'detector': draw_detector()
-    elif state == 'gameover':
-        # Background com gradiente roxo-azul
-        purple_start = (60, 20, 80)  # Roxo escuro
-        blue_end = (20, 40, 100)     # Azul escuro
-        draw_gradient(screen, (0, 0, WIDTH, HEIGHT), purple_start, blue_end, vertical=True)
-
-        # Card central de game over com gradiente
-        card = draw_card(screen, (WIDTH//2 - 300, HEIGHT//2 - 250, 600, 500), BG_CARD, gradient=True)
-        
-        # Borda brilhante no card
-        pygame.draw.rect(screen, DANGER, card, width=3, border_radius=20)
-
-        # Título com sombra
-        title_surf = FONT_TITLE.render("FIM DE JOGO", True, DANGER)
-        title_shadow = FONT_TITLE.render("FIM DE JOGO", True, (0, 0, 0))
-        screen.blit(title_shadow, (WIDTH//2 - title_surf.get_width()//2 + 2, card.y + 52))
-        screen.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, card.y + 50))
-
-        # Pontuação com destaque - estilo game
-        score_label = FONT_SMALL.render("PONTUAÇÃO FINAL", True, TEXT_SECONDARY)
-        screen.blit(score_label, (WIDTH//2 - score_label.get_width()//2, card.y + 130))
-
-        # Card para pontuação
-        score_card = draw_card(screen, (WIDTH//2 - 150, card.y + 160, 300, 80), BG_SURFACE, border_radius=15, gradient=True)
-        pygame.draw.rect(screen, (255, 215, 0), score_card, width=2, border_radius=15)
-        
-        score_surf = FONT_TITLE.render(f"{score}", True, (255, 215, 0))  # Dourado
-        score_shadow = FONT_TITLE.render(f"{score}", True, (0, 0, 0))
-        screen.blit(score_shadow, (WIDTH//2 - score_surf.get_width()//2 + 2, card.y + 187))
-        screen.blit(score_surf, (WIDTH//2 - score_surf.get_width()//2, card.y + 185))
-        
-        # Pontos ou Ponto (singular/plural)
-        pontos_text = "pontos" if score != 1 else "ponto"
-        pontos_surf = FONT_SMALL.render(pontos_text, True, TEXT_SECONDARY)
-        screen.blit(pontos_surf, (WIDTH//2 - pontos_surf.get_width()//2, card.y + 245))
-
-        # Música revelada
-        music_name = current_song_data.nome if current_song_data else "Desconhecida"
-        music_label = FONT_SMALL.render("A MÚSICA ERA", True, TEXT_SECONDARY)
-        screen.blit(music_label, (WIDTH//2 - music_label.get_width()//2, card.y + 280))
-        
-        # Card para nome da música
-        music_card = draw_card(screen, (WIDTH//2 - 200, card.y + 310, 400, 50), BG_SURFACE, border_radius=15)
-        music_surf = FONT_HEADING.render(music_name, True, WARNING)
-        screen.blit(music_surf, (WIDTH//2 - music_surf.get_width()//2, card.y + 320))
-
-        # Botões de ação - estilo game
-        btn_play_again = Button("JOGAR NOVAMENTE", (WIDTH//2 - 150, card.y + 390, 300, 60), 
-                               color=SUCCESS, hover=SUCCESS_HOVER, font=FONT_HEADING)
-        btn_menu_gameover = Button("MENU PRINCIPAL", (WIDTH//2 - 150, card.y + 465, 300, 60), 
-                                  color=ACCENT, hover=ACCENT_HOVER, font=FONT_HEADING)
-        
-        btn_play_again.draw(screen)
-        btn_menu_gameover.draw(screen)
+                    button_cooldown_until = time.time() + 10
 
-    pygame.display.flip()
-    CLOCK.tick(30)
+                if btn_skip_confirm.clicked(event):
+                    if detector_result is True:
+                        # Ativa a animação de sucesso
+                        show_success_animation = True
+                        success_animation_start_time = pygame.time.get_ticks()
 
-pygame.quit()
\ No newline at end of file
+                        current_index += 1
+                        sync_replay()
+                        message = "Nota desbloqueada!"
+                        state = 'play'
+                    else:
+                        message = "Segure a nota por 1s até aparecer ACERTOU."
+
+            elif state == 'gameover':
+                # Verifica cliques nos botões do game over
+                if btn_play_again.clicked(event):
+                    lives = 3
+                    score = 0
+                    if group_session:
+                        group_session.reset_scores()
+                    start_round(force_new=True)  # Força escolher uma música diferente
+                    if current_song_seq:
+                        primeira_nota = current_song_seq[0]
+                        play_note(NOTE_FREQS[primeira_nota[0]], primeira_nota[1])
+                    state = 'play'
+                if btn_menu_gameover.clicked(event):
+                    state = 'menu'
+
+        profiler.lap("logic")
+
+        if state == 'menu': draw_menu()
+        elif state == 'rules': draw_rules()
+        elif state == 'settings': draw_settings()
+        elif state == 'play': draw_play()
+        elif state == 'detector': draw_detector()
+        elif state == 'gameover': draw_gameover()
+
+        if show_latency_overlay:
+            compositor.widget("latency_overlay", LATENCY_OVERLAY_RECT, ALWAYS, draw_latency_overlay)
+        if profiler.enabled:
+            compositor.widget("profiler_overlay", PROFILER_OVERLAY_RECT, ALWAYS, draw_profiler_overlay)
+
+        compositor.compose()
+        profiler.lap("draw")
+        compositor.update()
+        profiler.lap("update")
+        surface_counter.end_frame()
+        font_registry.end_frame()
+        if first_frame_ms is None:
+            first_frame_ms = 1000.0 * (time.perf_counter() - STARTUP_BEGIN)
+            print(f"Primeiro quadro em {first_frame_ms:.0f} ms "
+                  f"(fontes: {font_registry.stats()['resolve_ms']:.0f} ms)")
+
+        # O quadro mais recente do detector acabou de chegar à tela
+        frame = latest_frame
+        if state == 'detector' and frame is not None and frame.render_time is None:
+            frame.render_time = time.perf_counter()
+            latency_stats.record_rendered(frame)
+
+        # Aula em grupo: acaba quando todos os jogadores ficam sem vidas
+        if group_session and state == 'detector' and not group_session.running and group_session.all_eliminated():
+            state = 'gameover'
+
+        profiler.lap("post")
+        profiler.end_frame()
+
+        listening = detector.running or (group_session is not None and group_session.running)
+        pacer.end_frame(compositor.animating or listening)
+
+    detector.close()
+    playback.close()
+    audio_mixer.close()
+    if group_session:
+        group_session.close()
+    if latency_stats.count():
+        latency_stats.dump(LATENCY_REPORT_FILE)
+    profiler.stop()
+    pygame.quit()
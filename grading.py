@@ -0,0 +1,180 @@
+import argparse
+import json
+import math
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from Musicas import BIBLIOTECA
+from detector import PitchDetector, note_frequency, DEFAULT_PROFILE, DEFAULT_ESTIMATOR, A4_TUNING
+from utils import is_similar_enough
+
+# ==============================================================================
+# CORREÇÃO OFFLINE
+# ==============================================================================
+# Corrige as gravações (WAV) dos alunos sem abrir a interface.
+#
+# Uso:
+#     python grading.py "Brilha Brilha Estrelinha" gravacoes/ --report relatorio.json
+
+HOLD_FRACTION = 0.5   # Fração da duração da nota que precisa ficar estável no alvo
+CENTS_TOLERANCE = 50  # Meio semitom: mesma regra do jogo (nome da nota arredondado)
+
+
+def find_song(nome):
+    for musica in BIBLIOTECA:
+        if musica.nome == nome:
+            return musica
+    for musica in BIBLIOTECA:
+        if is_similar_enough(nome, musica.nome):
+            return musica
+    raise ValueError(f"Música não encontrada na BIBLIOTECA: {nome}")
+
+
+def iter_wav_blocks(wf, block_size):
+    """Lê o WAV aberto em blocos float32 mono, sem carregar o arquivo inteiro."""
+    channels = wf.getnchannels()
+    width = wf.getsampwidth()
+    while True:
+        raw = wf.readframes(block_size)
+        if not raw:
+            break
+        if width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif width == 2:
+            samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        elif width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+            samples = ints.astype(np.float32) / 8388608.0
+        else:
+            samples = np.frombuffer(raw, dtype=np.int32).astype(np.float32) / 2147483648.0
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+        yield samples
+
+
+def _folded_cents(freq, target):
+    """Desvio em cents até a nota alvo em qualquer oitava (o jogo só compara o nome)."""
+    cents = 1200 * math.log2(freq / target)
+    return (cents + 600) % 1200 - 600
+
+
+def grade_frames(frames, musica, a4=A4_TUNING, hold_fraction=HOLD_FRACTION):
+    """
+    Alinha as notas esperadas à gravação (a partir do primeiro quadro com pitch,
+    escalando as durações pelo andamento do aluno) e avalia cada nota.
+    """
+    voiced = [f for f in frames if f.freq > 0]
+    if not voiced:
+        return [{"index": i, "note": nome, "hit": False, "cents_error": None, "time_to_stable_ms": None}
+                for i, (nome, _) in enumerate(musica.notas)]
+
+    t_start = voiced[0].timestamp
+    expected = sum(d for _, d in musica.notas)
+    tempo = max(voiced[-1].timestamp - t_start, 1e-6) / expected
+
+    results = []
+    pos = 0
+    t0 = t_start
+    for i, (nome, duracao) in enumerate(musica.notas):
+        t1 = t0 + duracao * tempo
+        target = note_frequency(nome, a4)
+        hold = hold_fraction * duracao * tempo
+
+        cents_seen = []
+        run_start = None
+        stable_at = None
+        while pos < len(frames) and frames[pos].timestamp < t1:
+            frame = frames[pos]
+            pos += 1
+            if frame.timestamp < t0 or frame.freq <= 0:
+                run_start = None
+                continue
+            cents = _folded_cents(frame.freq, target)
+            cents_seen.append(cents)
+            if abs(cents) < CENTS_TOLERANCE:
+                if run_start is None:
+                    run_start = frame.timestamp
+                if stable_at is None and frame.timestamp - run_start >= hold:
+                    stable_at = frame.timestamp
+            else:
+                run_start = None
+
+        results.append({
+            "index": i,
+            "note": nome,
+            "hit": stable_at is not None,
+            "cents_error": float(np.median(cents_seen)) if cents_seen else None,
+            "time_to_stable_ms": 1000.0 * (stable_at - t0) if stable_at is not None else None,
+        })
+        t0 = t1
+    return results
+
+
+def grade_file(path, song_name, profile=DEFAULT_PROFILE, estimator=DEFAULT_ESTIMATOR, a4=A4_TUNING):
+    """Corrige uma gravação. Roda dentro de um processo do pool."""
+    try:
+        musica = find_song(song_name)
+        with wave.open(path, "rb") as wf:
+            detector = PitchDetector(profile=profile, a4=a4, rate=wf.getframerate(), estimator=estimator)
+            frames = list(detector.iter_frames(iter_wav_blocks(wf, detector.BUFFER_SIZE)))
+            duration = wf.getnframes() / wf.getframerate()
+        notes = grade_frames(frames, musica, a4)
+        hits = sum(1 for n in notes if n["hit"])
+        return {"file": os.path.basename(path), "duration_s": duration, "hits": hits,
+                "total": len(notes), "score": hits / len(notes), "notes": notes}
+    except Exception as e:
+        return {"file": os.path.basename(path), "error": str(e)}
+
+
+def grade_directory(song_name, directory, workers=None, profile=DEFAULT_PROFILE, estimator=DEFAULT_ESTIMATOR,
+                    a4=A4_TUNING):
+    musica = find_song(song_name)
+    paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(".wav"))
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        job = partial(grade_file, song_name=musica.nome, profile=profile, estimator=estimator, a4=a4)
+        recordings = list(pool.map(job, paths))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "song": musica.nome,
+        "profile": profile,
+        "estimator": estimator,
+        "a4": a4,
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "recordings_per_minute": 60.0 * len(paths) / elapsed if elapsed > 0 else None,
+        "recordings": recordings,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corrige gravações WAV de uma música da BIBLIOTECA")
+    parser.add_argument("song", help="Nome da música (como em Musicas.py)")
+    parser.add_argument("directory", help="Pasta com as gravações .wav")
+    parser.add_argument("--report", default="relatorio.json")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: um por núcleo)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE)
+    parser.add_argument("--estimator", default=DEFAULT_ESTIMATOR)
+    parser.add_argument("--a4", type=float, default=A4_TUNING)
+    args = parser.parse_args()
+
+    report = grade_directory(args.song, args.directory, args.workers, args.profile, args.estimator, args.a4)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for rec in report["recordings"]:
+        if "error" in rec:
+            print(f"{rec['file']}: erro ({rec['error']})")
+        else:
+            print(f"{rec['file']}: {rec['hits']}/{rec['total']} notas")
+    print(f"{len(report['recordings'])} gravações em {report['elapsed_s']:.1f}s com {report['workers']} processos "
+          f"({report['recordings_per_minute']:.1f} gravações/min)")
@@ -0,0 +1,450 @@
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+# ==============================================================================
+# GRADIENTES PRÉ-RENDERIZADOS
+# ==============================================================================
+# O fundo de tela cheia, os cards, os badges e os botões pedem os mesmos
+# gradientes quadro após quadro. Cada gradiente é montado uma única vez com
+# NumPy (surfarray) e guardado por (tamanho, cores, orientação); o desenho vira
+# um único blit.
+
+DEFAULT_GRADIENT_CACHE_BYTES = 24 * 1024 * 1024
+
+
+def draw_gradient_lines(surf, rect, color_start, color_end, vertical=True):
+    """Versão original (uma linha por pixel). Fica como referência para o benchmark."""
+    rect = pygame.Rect(rect)
+    gradient_surf = pygame.Surface((rect.w, rect.h))
+
+    if vertical:
+        for y in range(rect.h):
+            ratio = y / rect.h
+            r = int(color_start[0] * (1 - ratio) + color_end[0] * ratio)
+            g = int(color_start[1] * (1 - ratio) + color_end[1] * ratio)
+            b = int(color_start[2] * (1 - ratio) + color_end[2] * ratio)
+            pygame.draw.line(gradient_surf, (r, g, b), (0, y), (rect.w, y))
+    else:
+        for x in range(rect.w):
+            ratio = x / rect.w
+            r = int(color_start[0] * (1 - ratio) + color_end[0] * ratio)
+            g = int(color_start[1] * (1 - ratio) + color_end[1] * ratio)
+            b = int(color_start[2] * (1 - ratio) + color_end[2] * ratio)
+            pygame.draw.line(gradient_surf, (r, g, b), (x, 0), (x, rect.h))
+
+    surf.blit(gradient_surf, rect.topleft)
+
+
+def render_gradient(size, color_start, color_end, vertical=True):
+    """
+    Monta a Surface do gradiente de uma vez. Usa a mesma conta e o mesmo
+    truncamento de draw_gradient_lines, então os pixels saem idênticos.
+    """
+    w, h = size
+    steps = h if vertical else w
+    ratio = np.arange(steps, dtype=np.float64) / steps
+    start = np.array(color_start[:3], dtype=np.float64)
+    end = np.array(color_end[:3], dtype=np.float64)
+    ramp = (start * (1 - ratio[:, None]) + end * ratio[:, None]).astype(np.uint8)
+
+    # surfarray indexa (x, y, canal)
+    pixels = np.empty((w, h, 3), dtype=np.uint8)
+    if vertical:
+        pixels[:] = ramp[None, :, :]
+    else:
+        pixels[:] = ramp[:, None, :]
+
+    surf = surface_counter.surface((w, h))
+    pygame.surfarray.blit_array(surf, pixels)
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert()  # Mesmo formato da janela: o blit não precisa converter
+        surface_counter.current += 1
+    return surf
+
+
+class GradientCache:
+    """
+    LRU de Surfaces de gradiente, chaveadas por (largura, altura, cor inicial,
+    cor final, vertical). Quando o total passa de `max_bytes`, descarta os
+    gradientes usados há mais tempo.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_GRADIENT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # chave -> Surface
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= _surface_bytes(old)
+            self.evictions += 1
+
+    def get(self, size, color_start, color_end, vertical=True):
+        key = (size[0], size[1], tuple(color_start[:3]), tuple(color_end[:3]), bool(vertical))
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = render_gradient(size, color_start, color_end, vertical)
+        self._entries[key] = surf
+        self.bytes += _surface_bytes(surf)
+        self._evict()
+        return surf
+
+    def draw(self, surf, rect, color_start, color_end, vertical=True):
+        """Mesma assinatura e mesmo resultado de draw_gradient_lines."""
+        rect = pygame.Rect(rect)
+        if rect.w <= 0 or rect.h <= 0:
+            return
+        surf.blit(self.get(rect.size, color_start, color_end, vertical), rect.topleft)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def _surface_bytes(surf):
+    return surf.get_bytesize() * surf.get_width() * surf.get_height()
+
+
+# ==============================================================================
+# CACHE DE TEXTO
+# ==============================================================================
+# Rótulos fixos ("PONTUAÇÃO", títulos, regras) e valores que mudam pouco
+# (pontos, vidas) eram renderizados pelo SDL_ttf a cada quadro. O resultado
+# de font.render fica guardado por (fonte, texto, cor, antialias, sombra).
+
+DEFAULT_TEXT_CACHE_BYTES = 8 * 1024 * 1024
+SHADOW_COLOR = (0, 0, 0)
+
+
+def render_shadowed(font, text, antialias, color, offset):
+    """
+    Texto com a sombra preta deslocada em `offset` px, numa Surface só. A
+    composição é feita com alfa "straight", então um blit dela dá o mesmo
+    resultado que blitar a sombra e depois o texto.
+    """
+    text_surf = surface_counter.render(font, text, antialias, color)
+    shadow_surf = surface_counter.render(font, text, antialias, SHADOW_COLOR)
+    w, h = text_surf.get_size()
+    out = surface_counter.surface((w + offset, h + offset), pygame.SRCALPHA)
+
+    rgb = np.zeros((w + offset, h + offset, 3), dtype=np.float64)
+    alpha = np.zeros((w + offset, h + offset), dtype=np.float64)
+    sa = pygame.surfarray.array_alpha(shadow_surf) / 255.0
+    ta = pygame.surfarray.array_alpha(text_surf) / 255.0
+    alpha[offset:, offset:] = sa
+    rgb[offset:, offset:] = pygame.surfarray.array3d(shadow_surf) * sa[:, :, None]
+    # Texto "over" sombra
+    rgb[:w, :h] = pygame.surfarray.array3d(text_surf) * ta[:, :, None] + rgb[:w, :h] * (1 - ta[:, :, None])
+    alpha[:w, :h] = ta + alpha[:w, :h] * (1 - ta)
+    np.divide(rgb, alpha[:, :, None], out=rgb, where=alpha[:, :, None] > 0)
+
+    pygame.surfarray.pixels3d(out)[:] = np.rint(rgb).astype(np.uint8)
+    pygame.surfarray.pixels_alpha(out)[:] = np.rint(alpha * 255).astype(np.uint8)
+    return out
+
+
+class TextCache:
+    """
+    LRU de textos já renderizados. A Surface devolvida é compartilhada e não
+    deve ser alterada; para desenhar com transparência, use AlphaScratch.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_TEXT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # chave -> Surface
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_ns = 0  # Tempo total dentro do SDL_ttf (só nas faltas)
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= _surface_bytes(old)
+            self.evictions += 1
+
+    def render(self, font, text, antialias, color, shadow=0):
+        """Mesmos argumentos de font.render; `shadow` > 0 desenha a sombra deslocada junto."""
+        key = (font, text, tuple(color), bool(antialias), shadow)
+        surf = self._entries.get(key)
+        if surf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        start = time.perf_counter_ns()
+        if shadow:
+            surf = render_shadowed(font, text, antialias, color, shadow)
+        else:
+            surf = surface_counter.render(font, text, antialias, color)
+        self.render_ns += time.perf_counter_ns() - start
+        self._entries[key] = surf
+        self.bytes += _surface_bytes(surf)
+        self._evict()
+        return surf
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "render_ms": self.render_ns / 1e6}
+
+
+class AlphaScratch:
+    """
+    Desenha uma Surface com alfa global sem chamar set_alpha() nela: os pixels
+    são copiados para uma Surface de rascunho reaproveitada, que recebe o alfa.
+    As Surfaces dos caches (textos, gradientes, botões) são compartilhadas, e
+    alterar uma delas vazaria a transparência para os outros usos.
+    """
+
+    def __init__(self):
+        self._scratch = None
+
+    def blit(self, dest, src, pos, alpha):
+        if alpha >= 255:
+            dest.blit(src, pos)
+            return
+        if alpha <= 0:
+            return
+        w, h = src.get_size()
+        scratch = self._scratch
+        if scratch is None or scratch.get_width() < w or scratch.get_height() < h:
+            # Cresce só até o maior texto animado; depois não aloca mais
+            size = (w, h) if scratch is None else (max(w, scratch.get_width()), max(h, scratch.get_height()))
+            scratch = self._scratch = surface_counter.surface(size, pygame.SRCALPHA)
+        area = pygame.Rect(0, 0, w, h)
+        scratch.fill((0, 0, 0, 0), area)
+        scratch.blit(src, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)  # Cópia exata, com o alfa por pixel
+        scratch.set_alpha(alpha)
+        dest.blit(scratch, pos, area)
+
+
+# ==============================================================================
+# REGISTRO DE FONTES
+# ==============================================================================
+# Achar uma fonte do sistema (SysFont) faz uma varredura das fontes instaladas
+# (no Linux, um fc-list). O registro resolve cada família para um arquivo uma
+# vez, grava a resolução em disco para as próximas execuções e cria cada
+# tamanho de Font só quando alguém pede, uma única vez. A resolução gravada vale
+# enquanto as pastas de fontes do sistema não mudam: instalar a Montserrat depois
+# de cair na Arial invalida o arquivo.
+
+FALLBACK_FAMILIES = ("Segoe UI", "Calibri", "Arial")
+FONT_SIZE_STEP = 4
+
+
+def system_font_dirs():
+    """Pastas onde o sistema instala fontes (as que o SysFont varre)."""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        return [os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/Library/Fonts", "/System/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"),
+            os.path.join(home, ".local", "share", "fonts")]
+
+
+def font_dirs_stamp(dirs):
+    """[pastas, mtime mais recente] das árvores em `dirs`: muda quando uma fonte é instalada ou removida."""
+    count, newest = 0, 0.0
+    for top in dirs:
+        for root, _, _ in os.walk(top):
+            try:
+                newest = max(newest, os.stat(root).st_mtime)
+            except OSError:
+                continue
+            count += 1
+    return [count, newest]
+
+
+def quantize_size(size, step=FONT_SIZE_STEP):
+    """Arredonda tamanhos animados para múltiplos de `step`, para não criar uma Font por quadro."""
+    return max(step, int(round(size / step)) * step)
+
+
+class FontRegistry:
+    """
+    get(family, size, bold) devolve sempre a mesma Font para o mesmo pedido.
+    A ordem de busca é a do antigo get_font: arquivos em `directory`, depois a
+    própria família e as alternativas no sistema, e por fim a fonte padrão do
+    pygame. Só a resolução no sistema vai para `cache_file`, junto com o
+    font_dirs_stamp() das pastas de fontes; se ele mudar, tudo é resolvido de novo.
+    """
+
+    def __init__(self, directory="fonts", cache_file=None, font_dirs=None):
+        self.directory = directory
+        self.cache_file = cache_file
+        self.font_dirs = system_font_dirs() if font_dirs is None else font_dirs
+        self._stamp = None
+        self._resolved = {}  # (família, bold) -> (caminho ou None, negrito sintético)
+        self._fonts = {}     # (família, tamanho, bold) -> Font
+        self._persisted = self._load()
+        self.created = 0
+        self.created_current = 0
+        self.created_last = 0
+        self.resolve_ms = 0.0
+        self.system_scans = 0
+
+    def _load(self):
+        if not self.cache_file:
+            return {}
+        self._stamp = font_dirs_stamp(self.font_dirs)
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Fontes instaladas ou removidas desde a gravação: um fallback pode não valer mais
+        if not isinstance(data, dict) or data.get("stamp") != self._stamp:
+            return {}
+        # Descarta resoluções para arquivos que não existem mais
+        return {k: v for k, v in data.get("fonts", {}).items() if v["path"] is None or os.path.exists(v["path"])}
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp = self.cache_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"stamp": self._stamp, "fonts": self._persisted}, f, indent=1)
+            os.replace(tmp, self.cache_file)
+        except OSError as e:
+            print(f"Não foi possível gravar {self.cache_file}: {e}")
+
+    def _local_file(self, family, bold):
+        style = "Bold" if bold else "Regular"
+        for path in (f"{self.directory}/{family}-{style}.ttf", f"{self.directory}/{family}{style}.ttf",
+                     f"{self.directory}/{family}.ttf"):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _scan_system(self, family, bold):
+        self.system_scans += 1
+        if family == "Montserrat":
+            # Montserrat pode ter variações no nome dependendo do sistema
+            names = ["Montserrat", "Montserrat Bold" if bold else "Montserrat Regular",
+                     "Montserrat-Bold" if bold else "Montserrat-Regular"]
+        else:
+            names = [family]
+        for name in names + list(FALLBACK_FAMILIES):
+            # O constructor recebe o que o SysFont resolveu, sem abrir a fonte
+            path, fake_bold = pygame.font.SysFont(name, 1, bold, constructor=lambda p, s, b, i: (p, b))
+            if path is not None:
+                return path, fake_bold
+        return None, bold
+
+    def resolve(self, family, bold=False):
+        key = (family, bool(bold))
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+
+        start = time.perf_counter()
+        path = self._local_file(family, bold)
+        if path is not None:
+            resolved = (path, False)
+        else:
+            persisted_key = f"{family}|{'bold' if bold else 'regular'}"
+            entry = self._persisted.get(persisted_key)
+            if entry is not None:
+                resolved = (entry["path"], entry["fake_bold"])
+            else:
+                resolved = self._scan_system(family, bold)
+                self._persisted[persisted_key] = {"path": resolved[0], "fake_bold": resolved[1]}
+                self._save()
+        self.resolve_ms += 1000.0 * (time.perf_counter() - start)
+        self._resolved[key] = resolved
+        return resolved
+
+    def get(self, family, size, bold=False):
+        key = (family, size, bool(bold))
+        font = self._fonts.get(key)
+        if font is None:
+            path, fake_bold = self.resolve(family, bold)
+            try:
+                font = pygame.font.Font(path, size)
+            except (OSError, pygame.error):
+                font = pygame.font.Font(None, size)
+            if fake_bold:
+                font.set_bold(True)
+            self._fonts[key] = font
+            self.created += 1
+            self.created_current += 1
+        return font
+
+    def end_frame(self):
+        self.created_last = self.created_current
+        self.created_current = 0
+
+    def stats(self):
+        return {"families": len(self._resolved), "fonts": len(self._fonts), "created": self.created,
+                "created_last_frame": self.created_last, "resolve_ms": self.resolve_ms,
+                "system_scans": self.system_scans}
+
+
+# ==============================================================================
+# SURFACES POR QUADRO
+# ==============================================================================
+class SurfaceCounter:
+    """
+    Conta as Surfaces criadas a cada quadro. O jogo cria as suas por
+    surface() e render() (no lugar de pygame.Surface e font.render), e o
+    loop chama end_frame() depois do flip.
+    """
+
+    def __init__(self):
+        self.current = 0
+        self.last = 0
+        self.peak = 0
+        self.total = 0
+        self.frames = 0
+
+    def surface(self, size, flags=0):
+        self.current += 1
+        return pygame.Surface(size, flags)
+
+    def render(self, font, text, antialias, color, background=None):
+        self.current += 1
+        return font.render(text, antialias, color, background)
+
+    def end_frame(self):
+        self.last = self.current
+        self.peak = max(self.peak, self.current)
+        self.total += self.current
+        self.frames += 1
+        self.current = 0
+
+    def stats(self):
+        return {"last": self.last, "peak": self.peak,
+                "avg": self.total / self.frames if self.frames else 0.0, "frames": self.frames}
+
+
+surface_counter = SurfaceCounter()
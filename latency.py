@@ -0,0 +1,76 @@
+import json
+import threading
+from collections import deque
+
+import numpy as np
+
+# ==============================================================================
+# MEDIÇÃO DE LATÊNCIA (MICROFONE -> AGULHA NA TELA)
+# ==============================================================================
+# Cada PitchFrame carrega capture/estimate/consume/render_time (perf_counter).
+# As diferenças entre eles viram amostras por estágio.
+
+STAGES = ["capture_to_estimate", "estimate_to_consume", "consume_to_render", "total"]
+STAGE_LABELS = {
+    "capture_to_estimate": "Captura -> estimativa",
+    "estimate_to_consume": "Estimativa -> consumo",
+    "consume_to_render": "Consumo -> tela",
+    "total": "Total",
+}
+HISTOGRAM_EDGES_MS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float("inf")]
+
+
+class LatencyStats:
+    """Guarda as últimas `capacity` amostras (ms) de cada estágio."""
+
+    def __init__(self, capacity=2000):
+        self._samples = {stage: deque(maxlen=capacity) for stage in STAGES}
+        self._lock = threading.Lock()
+        self.metadata = {}
+
+    def record(self, stage, ms):
+        with self._lock:
+            self._samples[stage].append(ms)
+
+    def record_consumed(self, frame):
+        """Chamado por quem consome o quadro (thread do detector_process)."""
+        if frame.capture_time is None or frame.estimate_time is None or frame.consume_time is None:
+            return
+        self.record("capture_to_estimate", 1000.0 * (frame.estimate_time - frame.capture_time))
+        self.record("estimate_to_consume", 1000.0 * (frame.consume_time - frame.estimate_time))
+
+    def record_rendered(self, frame):
+        """Chamado depois do flip que mostrou o quadro na tela."""
+        if frame.capture_time is None or frame.consume_time is None or frame.render_time is None:
+            return
+        self.record("consume_to_render", 1000.0 * (frame.render_time - frame.consume_time))
+        self.record("total", 1000.0 * (frame.render_time - frame.capture_time))
+
+    def count(self):
+        return len(self._samples["total"])
+
+    def percentiles(self, stage):
+        with self._lock:
+            values = np.fromiter(self._samples[stage], dtype=np.float64)
+        if len(values) == 0:
+            return None
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "count": len(values)}
+
+    def histogram(self, stage):
+        with self._lock:
+            values = np.fromiter(self._samples[stage], dtype=np.float64)
+        counts, _ = np.histogram(values, bins=HISTOGRAM_EDGES_MS)
+        return counts.tolist()
+
+    def dump(self, path):
+        report = {
+            "metadata": self.metadata,
+            "histogram_edges_ms": [e if e != float("inf") else None for e in HISTOGRAM_EDGES_MS],
+            "stages": {
+                stage: {"percentiles": self.percentiles(stage), "histogram": self.histogram(stage)}
+                for stage in STAGES
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
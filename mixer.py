@@ -0,0 +1,339 @@
+import itertools
+import time
+from collections import deque
+
+import numpy as np
+
+# ==============================================================================
+# MIXER EM TEMPO REAL
+# ==============================================================================
+# Um único stream de saída do PortAudio em modo callback mistura um conjunto
+# fixo de vozes. Quem toca só empurra comandos numa deque (append/popleft são
+# atômicos no CPython), então o callback nunca espera lock nem cria threads.
+
+DEFAULT_VOICES = 16
+DEFAULT_BLOCK_SIZE = 512
+RELEASE_MS = 50.0  # Mesmo tempo do antigo channel.fadeout(50)
+
+
+class StreamingMixer:
+    """
+    Pool fixo de vozes tocando buffers int16 estéreo (o formato de synth.py).
+    note_on() devolve um id; a voz entra em release sozinha perto do fim do
+    buffer ou quando note_off() chega. Sem voz livre, a mais antiga é roubada:
+    ela sai com um fade de um bloco e a nota nova entra no bloco seguinte.
+    """
+
+    def __init__(self, rate=44100, voices=DEFAULT_VOICES, block_size=DEFAULT_BLOCK_SIZE, release_ms=RELEASE_MS):
+        self.rate = rate
+        self.voices = voices
+        self.block_size = block_size
+        self.available = False  # True depois que open() conseguiu o stream de saída
+        self._commands = deque()
+        self._next_id = itertools.count(1)  # next() é atômico no CPython; += 1 não é
+        self._pa = None
+        self._stream = None
+        self._pa_continue = None
+        self._underflow_flag = 0
+
+        # Estado das vozes em arrays pré-alocados, indexados pelo slot da voz
+        self._sources = [None] * voices
+        self._ids = np.zeros(voices, dtype=np.int64)          # 0 = voz livre
+        self._pos = np.zeros(voices, dtype=np.int64)
+        self._gain = np.zeros(voices, dtype=np.float32)
+        self._release_at = np.zeros(voices, dtype=np.int64)   # Posição em que o release começa
+        self._release_pos = np.full(voices, -1, dtype=np.int64)  # -1 = ainda não está em release
+        self._started = np.zeros(voices, dtype=np.int64)      # Ordem de início, para o roubo de voz
+        self._stealing = np.zeros(voices, dtype=bool)         # Sai com fade neste bloco (voz roubada)
+        self._pending = deque()  # Notas esperando a voz roubada liberar
+        self._slot_of = {}
+        self._order = 0
+
+        self.release_samples = max(1, int(rate * release_ms / 1000.0))
+        curve = np.zeros(self.release_samples + block_size, dtype=np.float32)
+        curve[:self.release_samples] = np.linspace(1.0, 0.0, self.release_samples, endpoint=False)
+        self._release_curve = curve
+        self._mix = np.zeros(block_size, dtype=np.float32)
+        self._tmp = np.zeros(block_size, dtype=np.float32)
+        self._out = np.zeros((block_size, 2), dtype=np.int16)
+        self._out_bytes = self._bytes_view(self._out)
+        self._steal_fade = np.linspace(1.0, 0.0, block_size, dtype=np.float32)
+
+        self.underruns = 0
+        self.stolen = 0
+        self.callbacks = 0
+        self.callback_ms_avg = 0.0
+        self.callback_ms_max = 0.0
+
+    # --------------------------------------------------------------------------
+    # API usada pelo jogo (qualquer thread)
+    # --------------------------------------------------------------------------
+    def note_on(self, samples, gain=1.0):
+        """Agenda `samples` (int16 (n, 2) ou float32 mono) numa voz; retorna o id da voz."""
+        voice_id = next(self._next_id)
+        self._commands.append(("on", voice_id, samples, gain))
+        return voice_id
+
+    def note_off(self, voice_id):
+        """Inicia o release da voz (fade de release_ms) em vez de cortar."""
+        self._commands.append(("off", voice_id))
+
+    def all_notes_off(self):
+        self._commands.append(("all_off",))
+
+    def active_voices(self):
+        return int(np.count_nonzero(self._ids))
+
+    def busy(self):
+        return bool(self._commands) or self.active_voices() > 0
+
+    def stats(self):
+        return {
+            "active_voices": self.active_voices(),
+            "voices": self.voices,
+            "underruns": self.underruns,
+            "stolen": self.stolen,
+            "callback_ms_avg": self.callback_ms_avg,
+            "callback_ms_max": self.callback_ms_max,
+            "budget_ms": 1000.0 * self.block_size / self.rate,
+        }
+
+    # --------------------------------------------------------------------------
+    # Callback (thread do PortAudio)
+    # --------------------------------------------------------------------------
+    def _free(self, slot):
+        self._slot_of.pop(int(self._ids[slot]), None)
+        self._ids[slot] = 0
+        self._sources[slot] = None
+        self._stealing[slot] = False
+
+    def _free_slot(self):
+        for slot in range(self.voices):
+            if self._ids[slot] == 0:
+                return slot
+        return -1
+
+    def _steal_oldest(self):
+        # Cortar a voz na hora estala: ela sai com fade no próximo render()
+        oldest = -1
+        for slot in range(self.voices):
+            if not self._stealing[slot] and (oldest < 0 or self._started[slot] < self._started[oldest]):
+                oldest = slot
+        if oldest >= 0:
+            self._stealing[oldest] = True
+            self.stolen += 1
+
+    def _start_voice(self, slot, voice_id, samples, gain):
+        scale = 1.0 / 32768.0 if samples.dtype == np.int16 else 1.0
+        self._sources[slot] = samples[:, 0] if samples.ndim == 2 else samples
+        self._ids[slot] = voice_id
+        self._pos[slot] = 0
+        self._gain[slot] = gain * scale
+        self._release_at[slot] = max(0, len(samples) - self.release_samples)
+        self._release_pos[slot] = -1
+        self._order += 1
+        self._started[slot] = self._order
+        self._slot_of[voice_id] = slot
+
+    def _start_release(self, slot):
+        if self._release_pos[slot] < 0:
+            self._release_at[slot] = self._pos[slot]
+
+    def _handle_commands(self):
+        # Notas que esperavam voz entram nos slots que as vozes roubadas liberaram
+        pending = self._pending
+        while pending:
+            slot = self._free_slot()
+            if slot < 0:
+                break
+            self._start_voice(slot, *pending.popleft())
+
+        commands = self._commands
+        while commands:
+            cmd = commands.popleft()
+            if cmd[0] == "on":
+                _, voice_id, samples, gain = cmd
+                slot = self._free_slot() if not pending else -1
+                if slot >= 0:
+                    self._start_voice(slot, voice_id, samples, gain)
+                else:
+                    pending.append((voice_id, samples, gain))
+            elif cmd[0] == "off":
+                slot = self._slot_of.get(cmd[1])
+                if slot is not None:
+                    self._start_release(slot)
+                else:
+                    for i, entry in enumerate(pending):
+                        if entry[0] == cmd[1]:
+                            del pending[i]  # Ainda não tinha começado
+                            break
+            elif cmd[0] == "all_off":
+                pending.clear()
+                for slot in range(self.voices):
+                    if self._ids[slot]:
+                        self._start_release(slot)
+
+        # Uma voz roubada por nota esperando
+        for _ in range(len(pending) - int(np.count_nonzero(self._stealing))):
+            self._steal_oldest()
+
+    @staticmethod
+    def _bytes_view(out):
+        # Devolvido ao PortAudio no lugar de tobytes(): só leitura, sem cópia
+        return memoryview(out.reshape(-1).view(np.uint8)).toreadonly()
+
+    def _grow(self, frames):
+        # Só acontece se o PortAudio entregar um bloco maior que o pedido
+        curve = np.zeros(self.release_samples + frames, dtype=np.float32)
+        curve[:self.release_samples] = self._release_curve[:self.release_samples]
+        self._release_curve = curve
+        self._mix = np.zeros(frames, dtype=np.float32)
+        self._tmp = np.zeros(frames, dtype=np.float32)
+        self._out = np.zeros((frames, 2), dtype=np.int16)
+        self._out_bytes = self._bytes_view(self._out)
+
+    def render(self, frames):
+        """Mistura o próximo bloco de `frames` amostras em self._out (também usado offline)."""
+        self._handle_commands()
+        if frames > len(self._mix):
+            self._grow(frames)
+        mix = self._mix[:frames]
+        mix[:] = 0.0
+        tmp = self._tmp
+        curve = self._release_curve
+        if len(self._steal_fade) != frames:
+            self._steal_fade = np.linspace(1.0, 0.0, frames, dtype=np.float32)
+
+        for slot in range(self.voices):  # Sem flatnonzero: o callback não aloca arrays
+            if self._ids[slot] == 0:
+                continue
+            src = self._sources[slot]
+            pos = int(self._pos[slot])
+            n = min(frames, len(src) - pos)
+            seg = tmp[:n]
+            np.multiply(src[pos:pos + n], self._gain[slot], out=seg)
+
+            # Release: a curva começa em release_at e continua nos blocos seguintes
+            rel = int(self._release_pos[slot])
+            if rel < 0 and pos + n > self._release_at[slot]:
+                rel = 0
+                k = int(self._release_at[slot]) - pos
+            else:
+                k = 0
+            if rel >= 0:
+                m = min(n - k, len(curve) - rel)
+                seg[k:k + m] *= curve[rel:rel + m]
+                seg[k + m:] = 0.0
+                rel += n - k
+                self._release_pos[slot] = rel
+
+            stealing = self._stealing[slot]
+            if stealing:
+                seg *= self._steal_fade[:n]
+
+            mix[:n] += seg
+            self._pos[slot] = pos + n
+            if pos + n >= len(src) or rel >= self.release_samples or stealing:
+                self._free(slot)
+
+        np.clip(mix, -1.0, 1.0, out=mix)
+        mix *= 32767.0
+        out = self._out[:frames]
+        out[:, 0] = mix
+        out[:, 1] = mix
+        return out
+
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        start = time.perf_counter()
+        if status & self._underflow_flag:
+            self.underruns += 1
+        self.render(frame_count)
+        data = self._out_bytes
+        if frame_count != len(self._out):
+            data = data[:frame_count * 4]  # Bloco menor que o pedido (raro): fatia da mesma memória
+        elapsed = 1000.0 * (time.perf_counter() - start)
+        self.callbacks += 1
+        self.callback_ms_avg += (elapsed - self.callback_ms_avg) / min(self.callbacks, 100)
+        self.callback_ms_max = max(self.callback_ms_max, elapsed)
+        return (data, self._pa_continue)
+
+    # --------------------------------------------------------------------------
+    # Stream de saída
+    # --------------------------------------------------------------------------
+    def open(self):
+        """Abre o stream de saída. Sem PortAudio, `available` fica False e o jogo usa pygame.mixer."""
+        if self._stream is not None:
+            return True
+        try:
+            import pyaudio
+
+            self._pa = pyaudio.PyAudio()
+            self._pa_continue = pyaudio.paContinue
+            self._underflow_flag = pyaudio.paOutputUnderflow
+            self._stream = self._pa.open(format=pyaudio.paInt16, channels=2, rate=self.rate, output=True,
+                                         frames_per_buffer=self.block_size, stream_callback=self._audio_callback)
+            self._stream.start_stream()
+            self.available = True
+        except Exception as e:
+            print(f"Mixer indisponível, usando pygame.mixer: {e}")
+            self.close()
+        return self.available
+
+    def close(self):
+        self.available = False
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+
+# ==============================================================================
+# CONFERÊNCIA DO RELEASE (OFFLINE)
+# ==============================================================================
+def check_release(block_size=DEFAULT_BLOCK_SIZE, rate=44100, blocks_before=3):
+    """
+    Toca uma nota longa sem stream (render() direto), manda note_off depois de
+    `blocks_before` blocos e mede quantas amostras soam depois disso. O release
+    começa no primeiro bloco após o note_off e deve durar exatamente
+    release_samples; depois, silêncio.
+    """
+    mixer = StreamingMixer(rate=rate, block_size=block_size)
+    note = np.full((rate * 2, 2), 8000, dtype=np.int16)
+    voice = mixer.note_on(note)
+    for _ in range(blocks_before):
+        mixer.render(block_size)
+    mixer.note_off(voice)
+
+    tail = []
+    for _ in range(mixer.release_samples // block_size + 3):
+        tail.append(mixer.render(block_size)[:, 0].copy())
+    tail = np.concatenate(tail)
+    sounding = np.flatnonzero(tail)
+    last = int(sounding[-1]) + 1 if len(sounding) else 0
+    return {
+        "release_samples": mixer.release_samples,
+        "sounding_after_off": last,
+        "silent_after_release": not tail[mixer.release_samples:].any(),
+        "voice_freed": mixer.active_voices() == 0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Confere o release do mixer renderizando sem stream")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    r = check_release(args.block_size)
+    print(f"Release: {r['release_samples']} amostras ({RELEASE_MS:.0f} ms) | "
+          f"som depois do note_off: {r['sounding_after_off']} amostras")
+    ok = r["sounding_after_off"] == r["release_samples"] and r["silent_after_release"] and r["voice_freed"]
+    print("OK" if ok else "FALHOU: o release não terminou em release_samples")
+    raise SystemExit(0 if ok else 1)
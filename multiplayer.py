@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from detector import PitchDetector, DEFAULT_PROFILE, DEFAULT_ESTIMATOR
+from shared_detector import ProcessPitchDetector
+
+# ==============================================================================
+# SESSÕES EM GRUPO
+# ==============================================================================
+# Vários cantores ao mesmo tempo, um detector por jogador. Cada jogador fica
+# preso a um dispositivo de entrada (índice do PortAudio) ou a um canal de uma
+# interface multicanal. Os detectores rodam em processos separados
+# (ProcessPitchDetector), então cada jogador a mais ocupa outro núcleo em vez
+# de dividir o mesmo com os demais.
+#
+# Benchmark (sem microfones, com seno sintético em tempo real):
+#     python multiplayer.py --max-players 8 --seconds 5
+
+NOTE_POINTS = 1  # Pontos por nota sustentada numa tomada em grupo
+START_LIVES = 3
+
+
+class Player:
+    """Um cantor: entrada de áudio, detector próprio, pontuação e vidas."""
+
+    def __init__(self, name, device_index=None, channel=0, channels=1):
+        self.name = name
+        self.device_index = device_index
+        self.channel = channel
+        self.channels = channels
+        self.detector = None
+        self.score = 0
+        self.lives = START_LIVES
+        self.reset_take()
+
+    def reset_take(self):
+        self.note = None
+        self.freq = 0.0
+        self.result = None  # True = sustentou a nota, False = tempo esgotado
+        self.message = ""
+
+    @property
+    def eliminated(self):
+        return self.lives <= 0
+
+
+class PlayerSession:
+    """Abre um detector por jogador e conduz tomadas simultâneas."""
+
+    def __init__(self, players, profile=DEFAULT_PROFILE, a4=440.0, rate=44100,
+                 estimator=DEFAULT_ESTIMATOR, detector_class=ProcessPitchDetector):
+        self.players = players
+        for p in players:
+            p.detector = detector_class(profile=profile, a4=a4, rate=rate, estimator=estimator,
+                                        device_index=p.device_index, channel=p.channel, channels=p.channels)
+        self.running = False
+
+    def open(self):
+        for p in self.players:
+            p.detector.open()
+
+    def close(self):
+        for p in self.players:
+            p.detector.close()
+
+    def reset_scores(self):
+        for p in self.players:
+            p.score = 0
+            p.lives = START_LIVES
+            p.reset_take()
+
+    def active_players(self):
+        return [p for p in self.players if not p.eliminated]
+
+    def all_eliminated(self):
+        return not self.active_players()
+
+    def any_hit(self):
+        return any(p.result for p in self.players)
+
+    def _listen_player(self, player, target_note_name, duration, stability):
+        frames = player.detector.subscribe()
+        player.detector.start()
+        player.message = "Cante e SEGURE a nota!"
+        deadline = time.time() + duration
+        stable_start = None  # Em segundos de áudio (PitchFrame.timestamp)
+
+        while time.time() < deadline and self.running:
+            try:
+                frame = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            player.note = frame.note
+            player.freq = frame.freq
+            if frame.note and frame.note.rstrip("-0123456789") == target_note_name:
+                if stable_start is None:
+                    stable_start = frame.timestamp
+                elapsed = frame.timestamp - stable_start
+                if elapsed >= stability:
+                    player.result = True
+                    player.message = "Nota estável!"
+                    break
+                player.message = f"Mantenha por {stability - elapsed:.1f}s"
+            else:
+                stable_start = None
+                player.message = f"Detectado: {frame.note}" if frame.note else "Silêncio..."
+
+        player.detector.unsubscribe(frames)
+        player.detector.stop()
+
+        if player.result:
+            player.score += NOTE_POINTS
+        else:
+            player.result = False
+            player.lives -= 1
+            player.message = "Tempo esgotado."
+
+    def listen(self, target_note_name, duration, stability):
+        """
+        Tomada simultânea: todos os jogadores ainda vivos cantam a mesma nota.
+        Quem sustenta ganha NOTE_POINTS; quem não consegue perde uma vida.
+        Bloqueia até todos terminarem (rode numa thread) e retorna quem cantou.
+        """
+        self.running = True
+        singers = self.active_players()
+        threads = []
+        for p in singers:
+            p.reset_take()
+            t = threading.Thread(target=self._listen_player, args=(p, target_note_name, duration, stability),
+                                 daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        self.running = False
+        return singers
+
+    def cancel(self):
+        self.running = False
+
+
+# ==============================================================================
+# BENCHMARK
+# ==============================================================================
+class _SyntheticPitchDetector(PitchDetector):
+    """Troca o PortAudio por um seno entregue em blocos no ritmo real do áudio."""
+
+    def __init__(self, freq=220.0, **kwargs):
+        super().__init__(**kwargs)
+        self._synth_freq = freq
+        self._feeder = None
+        self._feeding = False
+
+    def _feed(self):
+        block = self.BUFFER_SIZE
+        step = 2 * np.pi * self._synth_freq / self.RATE
+        ramp = step * np.arange(block)
+        phase = 0.0
+        start = time.perf_counter()
+        sent = 0
+        while self._feeding:
+            wave = (0.3 * np.sin(ramp + phase)).astype(np.float32)
+            phase = (phase + step * block) % (2 * np.pi)
+            self._audio_callback(wave.tobytes(), block, None, None)
+            sent += block
+            delay = start + sent / self.RATE - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _open_stream(self):
+        self._feeding = True
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._feeder.start()
+        self._stream = self._feeder
+
+    def _close_stream(self):
+        self._feeding = False
+        if self._feeder is not None:
+            self._feeder.join(timeout=1.0)
+            self._feeder = None
+        self._stream = None
+
+    def _stream_stalled(self):
+        return not self._feeder.is_alive()
+
+
+class _SyntheticProcessDetector(ProcessPitchDetector):
+    detector_class = _SyntheticPitchDetector
+
+    def __init__(self, freq=220.0, **kwargs):
+        super().__init__(**kwargs)
+        self._child_kwargs["freq"] = freq
+
+
+def _collect(frames, samples, stop):
+    while not stop.is_set():
+        try:
+            frame = frames.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if frame.capture_time is not None:
+            samples.append(1000.0 * (time.perf_counter() - frame.capture_time))
+
+
+def benchmark_players(counts=(1, 2, 4, 8), seconds=5.0, warmup=2.0,
+                      profile="low_latency", estimator="yin", rate=44100):
+    """
+    Para cada número de jogadores, abre N detectores em processos separados
+    alimentados por senos sintéticos e mede, por jogador, a latência da captura
+    até o quadro chegar ao processo do jogo (p50/p95) e os quadros por segundo.
+    """
+    results = []
+    for n in counts:
+        detectors = [_SyntheticProcessDetector(freq=110.0 * 2 ** (i / 12), profile=profile,
+                                               estimator=estimator, rate=rate) for i in range(n)]
+        for d in detectors:
+            d.open()
+        queues = [d.subscribe(maxsize=1024) for d in detectors]
+        for d in detectors:
+            d.start()
+        time.sleep(warmup)
+
+        stop = threading.Event()
+        samples = [[] for _ in detectors]
+        for q in queues:
+            while not q.empty():
+                q.get_nowait()
+        collectors = [threading.Thread(target=_collect, args=(q, s, stop), daemon=True)
+                      for q, s in zip(queues, samples)]
+        for t in collectors:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in collectors:
+            t.join()
+        for d in detectors:
+            d.close()
+
+        players = []
+        for s in samples:
+            values = np.asarray(s, dtype=np.float64)
+            players.append({
+                "frames_per_second": len(values) / seconds,
+                "p50_ms": float(np.percentile(values, 50)) if len(values) else None,
+                "p95_ms": float(np.percentile(values, 95)) if len(values) else None,
+            })
+        p50s = [p["p50_ms"] for p in players if p["p50_ms"] is not None]
+        p95s = [p["p95_ms"] for p in players if p["p95_ms"] is not None]
+        results.append({
+            "players": n,
+            "median_p50_ms": float(np.median(p50s)) if p50s else None,
+            "worst_p95_ms": max(p95s) if p95s else None,
+            "per_player": players,
+        })
+    return {"cpu_count": os.cpu_count(), "profile": profile, "estimator": estimator, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência por jogador conforme o número de cantores cresce")
+    parser.add_argument("--max-players", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--profile", default="low_latency")
+    parser.add_argument("--estimator", default="yin")
+    parser.add_argument("--report", default=None, help="Grava o resultado completo em JSON")
+    args = parser.parse_args()
+
+    counts = sorted({1, *[n for n in (2, 4, 8, 16) if n < args.max_players], args.max_players})
+    report = benchmark_players(counts, seconds=args.seconds, profile=args.profile, estimator=args.estimator)
+    for r in report["results"]:
+        fps = min(p["frames_per_second"] for p in r["per_player"])
+        print(f"{r['players']:>2} jogadores: p50 mediano {r['median_p50_ms']:.1f} ms | "
+              f"pior p95 {r['worst_p95_ms']:.1f} ms | mínimo {fps:.0f} quadros/s por jogador")
+    print(f"({report['cpu_count']} núcleos, perfil {report['profile']}, estimador {report['estimator']})")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
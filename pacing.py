@@ -0,0 +1,71 @@
+import time
+
+import pygame
+
+# ==============================================================================
+# RITMO DE QUADROS
+# ==============================================================================
+# Com algo animando (título pulsante, animações, agulha do detector) o loop roda
+# a ACTIVE_FPS. Parado, ele só desenha quando chega um evento (mouse, teclado)
+# ou a cada 1/idle_fps segundo, para textos que mudam sozinhos (status do
+# microfone, cache de notas), e não gasta CPU que o detector de pitch precisa.
+
+ACTIVE_FPS = 60
+IDLE_FPS = 4
+LINGER_SECONDS = 0.5  # Continua no ritmo ativo um pouco depois da última animação
+IDLE_POLL_MS = 15     # Parado, um clique espera no máximo isso para ser atendido
+
+
+class FramePacer:
+    def __init__(self, active_fps=ACTIVE_FPS, idle_fps=IDLE_FPS, linger=LINGER_SECONDS):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.linger = linger
+        self.budget_ms = 1000.0 / active_fps  # Orçamento de um quadro (desenho + lógica)
+        self._clock = pygame.time.Clock()
+        self._active_until = 0.0
+        self._frame_start = time.perf_counter()
+        self.active = True
+        self.frames = 0
+        self.missed = 0
+        self.idle_waits = 0
+        self.work_ms_last = 0.0
+        self.work_ms_total = 0.0
+
+    def end_frame(self, animating):
+        """
+        Chamado depois de enviar o quadro. Conta o quadro como atrasado se o
+        trabalho passou do orçamento e espera até a hora do próximo.
+        """
+        now = time.perf_counter()
+        work_ms = 1000.0 * (now - self._frame_start)
+        self.frames += 1
+        self.work_ms_last = work_ms
+        self.work_ms_total += work_ms
+        if work_ms > self.budget_ms:
+            self.missed += 1
+
+        if animating:
+            self._active_until = now + self.linger
+        self.active = now < self._active_until
+
+        if self.active:
+            self._clock.tick(self.active_fps)
+        else:
+            self._wait_idle(now + 1.0 / self.idle_fps)
+        self._frame_start = time.perf_counter()
+
+    def _wait_idle(self, deadline):
+        # Dorme em fatias curtas olhando a fila: pygame.event.wait() com timeout
+        # acorda a cada 1 ms em alguns drivers de vídeo (ex.: dummy)
+        self.idle_waits += 1
+        while time.perf_counter() < deadline:
+            if pygame.event.peek():
+                return
+            pygame.time.wait(IDLE_POLL_MS)
+
+    def stats(self):
+        return {"active": self.active, "fps": self.active_fps if self.active else self.idle_fps,
+                "frames": self.frames, "missed": self.missed, "idle_waits": self.idle_waits,
+                "budget_ms": self.budget_ms, "work_ms_last": self.work_ms_last,
+                "work_ms_avg": self.work_ms_total / self.frames if self.frames else 0.0}
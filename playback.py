@@ -0,0 +1,180 @@
+import itertools
+import queue
+import threading
+import time
+
+# ==============================================================================
+# AGENDADOR DE REPRODUÇÃO
+# ==============================================================================
+# Uma única thread toca tudo. Cada pedido é uma lista de passos (start, segundos):
+# start() começa o som e devolve um handle; depois de `segundos` (ou no
+# cancelamento) o handle vai para stop(). Um pedido novo interrompe na hora o que
+# estiver tocando com prioridade igual ou menor, então cliques rápidos não
+# empilham threads dormindo. Número menor = mais importante.
+# stop() só inicia o release do som: com `sounding`, finished espera a saída de
+# áudio ficar em silêncio de verdade, para o detector não ouvir a cauda da nota.
+
+PRIORITY_STOP = 0
+PRIORITY_USER = 1
+PRIORITY_BACKGROUND = 2
+PRIORITIES = [PRIORITY_STOP, PRIORITY_USER, PRIORITY_BACKGROUND]
+SETTLE_POLL = 0.005    # Intervalo entre consultas a sounding()
+SETTLE_TIMEOUT = 0.5   # Espera máxima pela cauda, caso a saída nunca fique livre
+
+
+class PlaybackScheduler:
+    def __init__(self, stop, sounding=None):
+        self._stop = stop
+        self._sounding = sounding  # Opcional: True enquanto a saída ainda toca (release)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        # Uma geração por prioridade: um pedido na fila com geração antiga foi substituído
+        self._generations = {priority: 0 for priority in PRIORITIES}
+        self._playing = None  # Prioridade do que está tocando
+        self._closing = False
+        self.finished = threading.Event()  # Ligado quando não há nada tocando nem na fila
+        self.finished.set()
+        self.requests = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def request(self, steps, priority=PRIORITY_USER):
+        """
+        Agenda `steps`. O que estiver tocando é interrompido e os pedidos na fila
+        são descartados, mas só os de prioridade igual ou menor que `priority`.
+        """
+        with self._lock:
+            self.requests += 1
+            self._invalidate(priority)
+            self.finished.clear()
+            self._queue.put((priority, next(self._seq), self._generations[priority], list(steps)))
+            if self._playing is None or self._playing >= priority:
+                self._cancel.set()
+
+    def stop(self):
+        """Interrompe a reprodução atual e descarta a fila inteira."""
+        with self._lock:
+            self._invalidate(PRIORITY_STOP)
+            self._queue.put((PRIORITY_STOP, next(self._seq), self._generations[PRIORITY_STOP], None))
+            self._cancel.set()
+
+    def _invalidate(self, priority):
+        # Chamado com o lock: pedidos de prioridade igual ou menor ficam velhos
+        for level in PRIORITIES:
+            if level >= priority:
+                self._generations[level] += 1
+
+    def wait_finished(self, timeout=None):
+        """Bloqueia até não haver mais nada tocando (o detector espera aqui antes de ouvir)."""
+        return self.finished.wait(timeout)
+
+    def busy(self):
+        return not self.finished.is_set()
+
+    def _play(self, steps):
+        for start, seconds in steps:
+            handle = start()
+            interrupted = self._cancel.wait(seconds)
+            if handle is not None:
+                self._stop(handle)
+            if interrupted:
+                self.cancelled += 1
+                return
+        self.completed += 1
+
+    def _run(self):
+        while not self._closing:
+            priority, _, generation, steps = self._queue.get()
+            with self._lock:
+                stale = generation != self._generations[priority]
+                if not stale:
+                    self._cancel.clear()
+                    self._playing = priority if steps is not None else None
+            if steps is None or stale:
+                if stale and steps is not None:
+                    self.cancelled += 1
+                self._mark_idle()
+                continue
+            try:
+                self._play(steps)
+            except Exception as e:
+                print(f"Erro audio: {e}")
+            with self._lock:
+                self._playing = None
+            self._mark_idle()
+
+    def _settle(self):
+        # Um pedido novo na fila encerra a espera: finished não vai ligar mesmo
+        if self._sounding is None:
+            return
+        deadline = time.perf_counter() + SETTLE_TIMEOUT
+        while self._queue.empty() and self._sounding() and time.perf_counter() < deadline:
+            time.sleep(SETTLE_POLL)
+
+    def _mark_idle(self):
+        self._settle()
+        with self._lock:
+            if self._queue.empty() and not self._cancel.is_set():
+                self.finished.set()
+
+    def close(self):
+        self._closing = True
+        self.stop()
+        self._worker.join(timeout=1.0)
+
+    def stats(self):
+        return {"requests": self.requests, "completed": self.completed, "cancelled": self.cancelled,
+                "pending": self._queue.qsize(), "busy": self.busy()}
+
+
+# ==============================================================================
+# TESTE DE ESTRESSE
+# ==============================================================================
+def stress_test(clicks=1000, interval=0.0005, note_seconds=0.5):
+    """
+    Simula `clicks` cliques rápidos (sem áudio de verdade) e acompanha o número
+    de threads do processo, que deve ficar constante com o agendador.
+    """
+    started = []
+    stopped = []
+    scheduler = PlaybackScheduler(stop=stopped.append)
+    baseline = threading.active_count()
+    peak = baseline
+
+    start = time.perf_counter()
+    for i in range(clicks):
+        scheduler.request([(lambda i=i: started.append(i) or i, note_seconds)])
+        peak = max(peak, threading.active_count())
+        time.sleep(interval)
+    scheduler.stop()
+    scheduler.wait_finished(timeout=5.0)
+    elapsed = time.perf_counter() - start
+    scheduler.close()
+
+    return {
+        "clicks": clicks,
+        "threads_baseline": baseline,
+        "threads_peak": peak,
+        "notes_started": len(started),
+        "notes_stopped": len(stopped),
+        "elapsed_s": elapsed,
+        "stats": scheduler.stats(),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cliques rápidos no agendador de reprodução")
+    parser.add_argument("--clicks", type=int, default=1000)
+    args = parser.parse_args()
+
+    r = stress_test(args.clicks)
+    print(f"{r['clicks']} cliques em {r['elapsed_s']:.2f}s")
+    print(f"Threads: {r['threads_baseline']} no início, pico de {r['threads_peak']}")
+    print(f"Notas iniciadas: {r['notes_started']} | interrompidas/paradas: {r['notes_stopped']} | "
+          f"canceladas: {r['stats']['cancelled']}")
@@ -0,0 +1,136 @@
+import csv
+import functools
+import time
+from collections import deque
+
+import numpy as np
+
+# ==============================================================================
+# PERFIL DE QUADROS (F4)
+# ==============================================================================
+# Tempo de cada fase do loop principal e de cada função de desenho marcada com
+# @profiler.timed, em perf_counter_ns. Os tempos das funções são inclusivos
+# (draw_card inclui o draw_gradient que ele chama). Desligado, cada função
+# marcada custa uma chamada extra e um teste de bool, e as fases nem isso.
+
+PHASES = ["events", "logic", "draw", "update", "post"]
+PHASE_LABELS = {
+    "events": "Eventos (pump)",
+    "logic": "Lógica",
+    "draw": "Desenho",
+    "update": "Envio (display.update)",
+    "post": "Pós-quadro (contadores)",
+}
+
+
+class FrameProfiler:
+    """Guarda os últimos `window` quadros de cada fase/função (ms por quadro)."""
+
+    def __init__(self, window=300):
+        self.enabled = False
+        self.window = window
+        self.functions = []  # Na ordem em que foram marcadas (colunas do CSV)
+        self._frame = {}     # nome -> ns acumulados no quadro atual
+        self._calls = {}     # nome -> chamadas no quadro atual
+        self._history = {name: deque(maxlen=window) for name in PHASES}
+        self._lap = 0
+        self._frame_start = 0
+        self._csv_file = None
+        self._csv = None
+        self.frames = 0
+
+    # --------------------------------------------------------------------------
+    # Instrumentação
+    # --------------------------------------------------------------------------
+    def timed(self, name=None):
+        """Decorador: soma o tempo da função no quadro atual quando o perfil está ligado."""
+        def decorate(fn):
+            label = name or fn.__name__
+            self.functions.append(label)
+            self._history[label] = deque(maxlen=self.window)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._frame[label] = self._frame.get(label, 0) + time.perf_counter_ns() - start
+                    self._calls[label] = self._calls.get(label, 0) + 1
+            return wrapper
+        return decorate
+
+    def start_frame(self):
+        if self.enabled:
+            self._frame_start = self._lap = time.perf_counter_ns()
+
+    def lap(self, phase):
+        """Soma a `phase` o tempo desde a última marca."""
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self._frame[phase] = self._frame.get(phase, 0) + now - self._lap
+            self._lap = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame_ms = (time.perf_counter_ns() - self._frame_start) / 1e6
+        for name, samples in self._history.items():
+            samples.append(self._frame.get(name, 0) / 1e6)
+        if self._csv is not None:
+            self._csv.writerow([self.frames, f"{frame_ms:.3f}"] +
+                               [f"{self._frame.get(n, 0) / 1e6:.3f}" for n in PHASES + self.functions] +
+                               [self._calls.get(n, 0) for n in self.functions])
+        self._frame.clear()
+        self._calls.clear()
+        self.frames += 1
+
+    # --------------------------------------------------------------------------
+    # Liga/desliga e exportação
+    # --------------------------------------------------------------------------
+    def start(self, csv_path=None):
+        """Liga o perfil; com csv_path, grava uma linha por quadro (ms) até stop()."""
+        for samples in self._history.values():
+            samples.clear()
+        self._frame.clear()
+        self._calls.clear()
+        self.frames = 0
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(["frame", "frame_ms"] + [f"{n}_ms" for n in PHASES + self.functions] +
+                               [f"{n}_calls" for n in self.functions])
+        # Ligado no meio de um quadro (tecla F4): conta a partir daqui
+        self._frame_start = self._lap = time.perf_counter_ns()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv = None
+
+    def toggle(self, csv_path=None):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start(csv_path)
+
+    def percentiles(self, name):
+        values = np.fromiter(self._history[name], dtype=np.float64)
+        if len(values) == 0:
+            return None
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"p50": float(p50), "p99": float(p99), "count": len(values)}
+
+    def slowest(self, count):
+        """As `count` funções marcadas com maior p99 na janela."""
+        ranked = []
+        for name in self.functions:
+            p = self.percentiles(name)
+            if p and p["p99"] > 0:
+                ranked.append((p["p99"], name, p))
+        ranked.sort(reverse=True)
+        return [(name, p) for _, name, p in ranked[:count]]
@@ -0,0 +1,114 @@
+import argparse
+import os
+import re
+import time
+import unicodedata
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from Musicas import BIBLIOTECA
+from detector import note_frequency, A4_TUNING
+from synth import synth_piano_note, DEFAULT_VOLUME
+from utils import is_similar_enough
+
+# ==============================================================================
+# RENDERIZAÇÃO DA BIBLIOTECA
+# ==============================================================================
+# Renderiza as músicas da BIBLIOTECA em WAV, com o mesmo sintetizador do jogo.
+# Serve de áudio de referência para os professores e de corpus para testar o
+# detector (ver grading.py).
+#
+# Uso:
+#     python render_library.py referencias/
+#     python render_library.py referencias/ --song "Brilha Brilha" --workers 4
+
+
+def song_filename(nome):
+    """'Parabéns pra Você' -> 'parabens_pra_voce.wav'"""
+    ascii_name = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", ascii_name.lower()).strip("_") + ".wav"
+
+
+def select_songs(names=None):
+    if not names:
+        return list(BIBLIOTECA)
+    return [m for m in BIBLIOTECA
+            if any(n.lower() in m.nome.lower() or is_similar_enough(n, m.nome) for n in names)]
+
+
+def render_song(musica, directory, rate=44100, a4=A4_TUNING, tuning_offset=0, volume=DEFAULT_VOLUME):
+    """
+    Grava uma música nota a nota, como o "Repetir Notas" do jogo (cada nota
+    começa no fim da anterior). Só uma nota fica na memória por vez, num
+    buffer reaproveitado do tamanho da nota mais longa.
+    """
+    path = os.path.join(directory, song_filename(musica.nome))
+    tuning_multiplier = 2 ** (tuning_offset / 12.0)
+    start = time.perf_counter()
+
+    longest = max(int(rate * duracao) for _, duracao in musica.notas)
+    chunk = np.empty((longest, 2), dtype=np.int16)
+    frames = 0
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        for nome, duracao in musica.notas:
+            n = int(rate * duracao)
+            out = chunk[:n]
+            if synth_piano_note(note_frequency(nome, a4), duracao, volume, rate, tuning_multiplier, out=out) is None:
+                out[:] = 0
+            wf.writeframes(out.tobytes())
+            frames += n
+
+    return {"song": musica.nome, "file": path, "duration_s": frames / rate,
+            "render_s": time.perf_counter() - start}
+
+
+def _render_job(musica, directory, rate, a4, tuning_offset):
+    try:
+        return render_song(musica, directory, rate, a4, tuning_offset)
+    except Exception as e:
+        return {"song": musica.nome, "error": str(e)}
+
+
+def render_library(directory, names=None, workers=None, rate=44100, a4=A4_TUNING, tuning_offset=0):
+    os.makedirs(directory, exist_ok=True)
+    songs = select_songs(names)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        job = partial(_render_job, directory=directory, rate=rate, a4=a4, tuning_offset=tuning_offset)
+        rendered = list(pool.map(job, songs))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "songs_per_second": len(songs) / elapsed if elapsed > 0 else None,
+        "songs": rendered,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renderiza as músicas da BIBLIOTECA em WAV")
+    parser.add_argument("directory", help="Pasta de saída")
+    parser.add_argument("--song", action="append", help="Só as músicas com esse nome (pode repetir)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: um por núcleo)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--a4", type=float, default=A4_TUNING)
+    parser.add_argument("--tuning-offset", type=float, default=0, help="Semitons, como TUNING_OFFSET do jogo")
+    args = parser.parse_args()
+
+    report = render_library(args.directory, args.song, args.workers, args.rate, args.a4, args.tuning_offset)
+    for song in report["songs"]:
+        if "error" in song:
+            print(f"{song['song']}: erro ({song['error']})")
+        else:
+            print(f"{song['song']}: {song['duration_s']:.1f}s de áudio em {song['render_s'] * 1000:.0f} ms")
+    print(f"{len(report['songs'])} músicas em {report['elapsed_s']:.2f}s com {report['workers']} processos "
+          f"({report['songs_per_second'] or 0:.1f} músicas/s)")
@@ -0,0 +1,327 @@
+import atexit
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detector import (PitchDetector, PitchFrame, RingBuffer, NOTAS, ring_capacity,
+                      DEFAULT_PROFILE, DEFAULT_ESTIMATOR, A4_TUNING)
+from tracker import smoothing_latency_ms
+
+# ==============================================================================
+# DETECTOR EM PROCESSO SEPARADO
+# ==============================================================================
+# Captura e estimativa rodam num processo filho, longe do GIL do pygame. Os dois
+# lados só trocam arrays NumPy sobre multiprocessing.shared_memory:
+#   control (int64)  pai -> filho: running, closing | filho -> pai: contadores
+#   stats (float64)  filho -> pai: estado do microfone e contadores das portas
+#   frames (float64) filho -> pai: ring de quadros de pitch
+#   audio (float32)  filho -> pai: ring de áudio capturado
+# A cada quadro publicado (ou mudança de estado do microfone) o filho liga um
+# multiprocessing.Event; a thread leitora do pai dorme nele sem segurar o GIL.
+# No sentido contrário, o pai liga outro Event (wake) ao mudar running/closing, e
+# o filho, que dorme bloqueado na fila de quadros, recebe um sentinela.
+
+FRAME_SLOTS = 256
+READER_TIMEOUT = 0.1  # A thread leitora confere close() pelo menos nesse intervalo
+WAKE_TIMEOUT = 0.1    # O filho confere o estado do microfone e o pai pelo menos nesse intervalo
+F_TIMESTAMP, F_FREQ, F_CONFIDENCE, F_NOTE, F_CAPTURE, F_ESTIMATE = range(6)
+FRAME_FIELDS = 6
+
+C_RUNNING, C_CLOSING, C_FRAME_SEQ, C_AUDIO_WRITTEN = range(4)
+CONTROL_FIELDS = 4
+
+S_STATUS, S_SKIP_PEAK, S_SKIP_RMS, S_SKIP_CONFIDENCE, S_PASSED, S_NOISE_FLOOR, S_ANALYSIS_ERRORS = range(7)
+STATS_FIELDS = 7
+
+STATUS_CODES = ["fechado", "abrindo", "ativo", "indisponível", "reabrindo"]
+
+
+def _note_to_midi(note):
+    if note is None:
+        return -1
+    nome = note.rstrip("-0123456789")
+    return NOTAS.index(nome) + 12 * (int(note[len(nome):]) + 1)
+
+
+def _midi_to_note(midi):
+    if midi < 0:
+        return None
+    return f"{NOTAS[midi % 12]}{midi // 12 - 1}"
+
+
+def _attach(name):
+    """Abre um bloco criado pelo pai sem registrá-lo no resource_tracker do filho."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: o filho spawn usa o mesmo resource_tracker do pai, então
+        # o registro repetido é inofensivo e o unlink do pai o desfaz
+        return shared_memory.SharedMemory(name=name)
+
+
+def _views(blocks, capacity):
+    control = np.ndarray((CONTROL_FIELDS,), dtype=np.int64, buffer=blocks["control"].buf)
+    stats = np.ndarray((STATS_FIELDS,), dtype=np.float64, buffer=blocks["stats"].buf)
+    frames = np.ndarray((FRAME_SLOTS, FRAME_FIELDS), dtype=np.float64, buffer=blocks["frames"].buf)
+    audio = np.ndarray((capacity,), dtype=np.float32, buffer=blocks["audio"].buf)
+    return control, stats, frames, audio
+
+
+def _wake_loop(wake, frames_q, done):
+    """Thread do filho: troca cada wake do pai (ou WAKE_TIMEOUT sem nada) por um sentinela na fila."""
+    while not done.is_set():
+        wake.wait(WAKE_TIMEOUT)
+        wake.clear()
+        try:
+            frames_q.put_nowait(None)
+        except queue.Full:
+            pass  # Fila cheia: o laço principal já tem o que ler
+
+
+def _child_main(names, capacity, detector_class, kwargs, ready, wake):
+    """Processo filho: um PitchDetector comum cujo ring e saída vivem na memória compartilhada."""
+    blocks = {key: _attach(name) for key, name in names.items()}
+    control, stats, frames, audio = _views(blocks, capacity)
+    ring = RingBuffer(capacity, buffer=audio, counter=control[C_AUDIO_WRITTEN:C_AUDIO_WRITTEN + 1])
+    detector = detector_class(ring=ring, **kwargs)
+    frames_q = detector.subscribe(maxsize=FRAME_SLOTS)
+    detector.open()
+    done = threading.Event()
+    threading.Thread(target=_wake_loop, args=(wake, frames_q, done), daemon=True).start()
+
+    parent = mp.parent_process()
+    running = False
+    status = None
+    try:
+        # Sai também se o pai morrer sem chamar close()
+        while not control[C_CLOSING] and (parent is None or parent.is_alive()):
+            wanted = bool(control[C_RUNNING])
+            if wanted != running:
+                if wanted:
+                    detector.start()
+                else:
+                    detector.stop()
+                running = wanted
+
+            frame = frames_q.get()  # None = sentinela de _wake_loop
+            if frame is not None:
+                seq = int(control[C_FRAME_SEQ])
+                row = frames[seq % FRAME_SLOTS]
+                row[F_TIMESTAMP] = frame.timestamp
+                row[F_FREQ] = frame.freq
+                row[F_CONFIDENCE] = frame.confidence
+                row[F_NOTE] = _note_to_midi(frame.note)
+                row[F_CAPTURE] = frame.capture_time if frame.capture_time is not None else np.nan
+                row[F_ESTIMATE] = frame.estimate_time if frame.estimate_time is not None else np.nan
+                control[C_FRAME_SEQ] = seq + 1  # Publica só depois de escrever a linha
+                ready.set()
+
+            gate = detector.gate
+            stats[S_STATUS] = STATUS_CODES.index(detector.status)
+            if detector.status != status:
+                status = detector.status
+                ready.set()
+            stats[S_SKIP_PEAK] = gate.skipped_peak
+            stats[S_SKIP_RMS] = gate.skipped_rms
+            stats[S_SKIP_CONFIDENCE] = gate.skipped_confidence
+            stats[S_PASSED] = gate.passed
+            stats[S_NOISE_FLOOR] = gate.noise_floor
+            stats[S_ANALYSIS_ERRORS] = detector.analysis_errors
+    finally:
+        done.set()
+        detector.close()
+        del control, stats, frames, audio, ring, detector
+        for shm in blocks.values():
+            shm.close()
+
+
+class _SharedGateStats:
+    """Expõe os contadores das portas do processo filho com a mesma API de SignalGate.stats()."""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def stats(self):
+        stats = self._owner._stats
+        if stats is None:
+            return {"skipped_peak": 0, "skipped_rms": 0, "skipped_confidence": 0, "passed": 0, "noise_floor": 0.0}
+        return {
+            "skipped_peak": int(stats[S_SKIP_PEAK]),
+            "skipped_rms": int(stats[S_SKIP_RMS]),
+            "skipped_confidence": int(stats[S_SKIP_CONFIDENCE]),
+            "passed": int(stats[S_PASSED]),
+            "noise_floor": float(stats[S_NOISE_FLOOR]),
+        }
+
+
+class ProcessPitchDetector(PitchDetector):
+    """
+    Mesma API do PitchDetector (open/close/start/stop/get_note/get_freq/subscribe),
+    mas a captura e a estimativa rodam num processo filho. Uma thread leve do pai
+    só copia os quadros do ring compartilhado e os publica aos assinantes.
+    """
+
+    detector_class = PitchDetector  # Classe instanciada dentro do processo filho
+
+    def __init__(self, profile=DEFAULT_PROFILE, a4=A4_TUNING, rate=44100, estimator=DEFAULT_ESTIMATOR,
+                 device_index=None, channel=0, channels=1):
+        super().__init__(profile=profile, a4=a4, rate=rate, estimator=estimator,
+                         device_index=device_index, channel=channel, channels=channels)
+        self._child_kwargs = {"profile": profile, "a4": a4, "rate": rate, "estimator": estimator,
+                              "device_index": device_index, "channel": channel, "channels": channels}
+        self._blocks = {}
+        self._control = None
+        self._stats = None
+        self._frames = None
+        self._process = None
+        self._reader = None
+        self._ready = None
+        self._wake = None
+
+    def _allocate_analysis(self, estimator, ring):
+        # Estimador, janela, portas e rastreador vivem no processo filho; o ring
+        # do pai só existe entre open() e close(), sobre a memória compartilhada
+        self._ring = None
+        self._window = None
+        self._estimator = None
+        self.gate = _SharedGateStats(self)
+        self.tracker = None
+
+    def smoothing_latency_ms(self):
+        # O filho usa um PitchTracker com os parâmetros padrão
+        return smoothing_latency_ms(self.HOP_SIZE / self.RATE)
+
+    def _create_shared(self):
+        capacity = ring_capacity(self.WINDOW_SIZE, self.RATE)
+        sizes = {
+            "control": CONTROL_FIELDS * 8,
+            "stats": STATS_FIELDS * 8,
+            "frames": FRAME_SLOTS * FRAME_FIELDS * 8,
+            "audio": capacity * 4,
+        }
+        self._blocks = {key: shared_memory.SharedMemory(create=True, size=size) for key, size in sizes.items()}
+        self._control, self._stats, self._frames, audio = _views(self._blocks, capacity)
+        self._control[:] = 0
+        self._stats[:] = 0
+        self._ring = RingBuffer(capacity, buffer=audio,
+                                counter=self._control[C_AUDIO_WRITTEN:C_AUDIO_WRITTEN + 1])
+        return capacity
+
+    def _release_shared(self):
+        # As views NumPy precisam sumir antes do close() do bloco
+        self._control = self._stats = self._frames = self._ring = None
+        for shm in self._blocks.values():
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = {}
+
+    def get_audio(self, out):
+        """Copia para `out` o áudio mais recente capturado pelo processo filho (zeros se fechado)."""
+        if self._ring is None:
+            out[:] = 0
+            return out
+        return self._ring.read(self._ring.written, out)
+
+    def _reader_loop(self):
+        seq = int(self._control[C_FRAME_SEQ])
+        half_window = self.WINDOW_SIZE / 2 / self.RATE
+        ready = self._ready
+        while not self._closing:
+            ready.wait(READER_TIMEOUT)
+            ready.clear()  # Antes de ler: o que o filho publicar depois liga de novo
+            if self._closing:
+                break
+            self.status = STATUS_CODES[int(self._stats[S_STATUS])]
+            self.analysis_errors = int(self._stats[S_ANALYSIS_ERRORS])
+            latest = int(self._control[C_FRAME_SEQ])
+            if latest == seq:
+                continue
+            if latest - seq > FRAME_SLOTS:
+                seq = latest - FRAME_SLOTS
+
+            while seq < latest:
+                ts, freq, confidence, note, capture, estimate = self._frames[seq % FRAME_SLOTS].tolist()
+                seq += 1
+                if not self.running:
+                    continue
+                capture = None if np.isnan(capture) else capture
+                estimate = None if np.isnan(estimate) else estimate
+                frame = PitchFrame(ts, freq, _midi_to_note(int(note)), confidence, capture, estimate)
+                self.current_freq = freq
+                self.current_confidence = confidence
+                self.current_note = frame.note
+
+                now = time.perf_counter()
+                if capture is not None:
+                    self.last_latency_ms = 1000.0 * (now - capture + half_window)
+                if self.time_to_first_estimate_ms is None:
+                    self.time_to_first_estimate_ms = 1000.0 * (now - self._take_start)
+                self._publish(frame)
+
+    def open(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        if self._process is not None or self._blocks:
+            self.close()  # Filho anterior morreu: libera os blocos antes de recriar
+        capacity = self._create_shared()
+        self._closing = False
+        self.status = "abrindo"
+        # spawn em todas as plataformas: fork herdaria o estado do SDL/pygame
+        ctx = mp.get_context("spawn")
+        names = {key: shm.name for key, shm in self._blocks.items()}
+        self._ready = ctx.Event()
+        self._wake = ctx.Event()
+        self._process = ctx.Process(target=_child_main, daemon=True,
+                                    args=(names, capacity, self.detector_class, self._child_kwargs,
+                                          self._ready, self._wake))
+        self._process.start()
+        self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader.start()
+        atexit.register(self.close)
+
+    def close(self):
+        self.running = False
+        self._closing = True
+        if self._control is not None:
+            self._control[C_RUNNING] = 0
+            self._control[C_CLOSING] = 1
+            self._wake.set()
+        if self._reader is not None:
+            self._ready.set()
+            self._reader.join(timeout=1.0)
+            self._reader = None
+        if self._process is not None:
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(timeout=1.0)
+            self._process = None
+        if self._blocks:
+            self._release_shared()
+        self.status = "fechado"
+        atexit.unregister(self.close)
+
+    def start(self):
+        if not self.running:
+            self._take_start = time.perf_counter()
+            self.time_to_first_estimate_ms = None
+            self.open()
+            self.running = True
+            self._control[C_RUNNING] = 1
+            self._wake.set()
+
+    def stop(self):
+        self.running = False
+        if self._control is not None:
+            self._control[C_RUNNING] = 0
+            self._wake.set()
+        self.current_note = None
+        self.current_freq = 0.0
+        self.current_confidence = 0.0
@@ -0,0 +1,585 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+# ==============================================================================
+# SINTETIZADOR DE PIANO (LIMITER + VOLUME BAIXO)
+# ==============================================================================
+DEFAULT_VOLUME = 0.3
+
+
+def reference_piano_note(base_freq, duration=1.0, volume=DEFAULT_VOLUME, rate=44100, tuning_multiplier=1.0):
+    """
+    Síntese original, com np.sin em float64 por harmônico. Fica como referência
+    de timbre e de desempenho para o benchmark do WavetableSynth.
+    """
+    if base_freq <= 0: return None
+
+    # Aplica correção de afinação
+    freq = base_freq * tuning_multiplier
+
+    length = int(rate * duration)
+    t = np.linspace(0, duration, length, False)
+
+    # 1. Fundamental
+    wave = np.sin(2 * np.pi * freq * t)
+
+    # 2. Harmônicos (Reduzidos para evitar sobrecarga)
+    wave += 0.4 * np.sin(2 * np.pi * (freq * 2) * t)
+    wave += 0.1 * np.sin(2 * np.pi * (freq * 3) * t)
+
+    # 3. Envelope (Decay Suave)
+    decay = np.exp(-t * 3)
+    wave *= decay
+
+    # 4. NORMALIZAÇÃO E LIMITER (O SEGREDO PARA NÃO ESTOURAR)
+    # Primeiro, normaliza para o maior pico ser 1.0
+    max_val = np.max(np.abs(wave))
+    if max_val > 0:
+        wave = wave / max_val
+
+    # Aplica o volume desejado
+    wave = wave * volume
+
+    # CLAMP: Garante que NENHUM número passe de 0.99 ou -0.99
+    # Isso impede a distorção digital (clipping)
+    wave = np.clip(wave, -0.99, 0.99)
+
+    # 5. Converte para 16-bit
+    wave = (wave * 32767).astype(np.int16)
+
+    stereo = np.column_stack((wave, wave))
+    return stereo
+
+
+
+# ==============================================================================
+# MOTOR DE WAVETABLE
+# ==============================================================================
+HARMONICS = [1.0, 0.4, 0.1]  # Fundamental + 0.4 × 2º + 0.1 × 3º harmônico
+TABLE_SIZE = 2048
+DECAY_RATE = 3.0
+
+
+class WavetableSynth:
+    """
+    Mesmo timbre do piano de reference_piano_note, mas um ciclo de cada variante
+    (1, 2 ou 3 harmônicos abaixo de Nyquist) é calculado uma vez só. Cada nota
+    vira leitura da tabela por acumulador de fase em float32, com envelope e
+    limiter aplicados no lugar e uma única conversão para int16 na saída.
+    """
+
+    def __init__(self, rate=44100, table_size=TABLE_SIZE):
+        self.rate = rate
+        self.table_size = table_size
+        cycle = 2 * np.pi * np.arange(table_size) / table_size
+        self._tables = []
+        for count in range(1, len(HARMONICS) + 1):
+            table = np.zeros(table_size + 1, dtype=np.float32)  # +1: amostra de guarda para interpolar
+            for h, amp in enumerate(HARMONICS[:count], start=1):
+                table[:-1] += amp * np.sin(h * cycle)
+            table[-1] = table[0]
+            self._tables.append(table)
+        self._lock = threading.Lock()
+        self._capacity = 0
+        self._ensure(int(rate * 2))
+
+    def _ensure(self, n):
+        """Buffers de trabalho e envelope crescem só quando aparece uma nota mais longa."""
+        if n <= self._capacity:
+            return
+        self._capacity = n
+        self._ramp = np.arange(n, dtype=np.float32)
+        self._envelope = np.exp(-DECAY_RATE * np.arange(n, dtype=np.float64) / self.rate).astype(np.float32)
+        self._phase = np.empty(n, dtype=np.float32)
+        self._index = np.empty(n, dtype=np.intp)  # intp: np.take não converte os índices
+        self._wave = np.empty(n, dtype=np.float32)
+        self._next = np.empty(n, dtype=np.float32)
+
+    def _table_for(self, freq):
+        nyquist = self.rate / 2
+        count = sum(1 for h in range(1, len(HARMONICS) + 1) if h * freq < nyquist)
+        return self._tables[max(count, 1) - 1]
+
+    def render(self, freq, duration, volume=DEFAULT_VOLUME, tuning_multiplier=1.0, out=None):
+        """
+        Escreve a nota em `out` (int16, (n, 2)) e o retorna; sem `out`, aloca um.
+        Retorna None para frequência inválida, como a síntese original.
+        """
+        if freq <= 0:
+            return None
+        freq = freq * tuning_multiplier
+        n = int(self.rate * duration)
+        if out is None:
+            out = np.empty((n, 2), dtype=np.int16)
+
+        with self._lock:
+            self._ensure(n)
+            table = self._table_for(freq)
+            phase, index = self._phase[:n], self._index[:n]
+            wave, nxt = self._wave[:n], self._next[:n]
+
+            # Acumulador de fase: posição na tabela = n * incremento (mod tamanho)
+            np.multiply(self._ramp[:n], np.float32(self.table_size * freq / self.rate), out=phase)
+            np.mod(phase, self.table_size, out=phase)
+            np.floor(phase, out=wave)
+            np.copyto(index, wave, casting="unsafe")
+            np.subtract(phase, wave, out=phase)  # phase agora é a fração entre duas amostras
+
+            # Interpolação linear entre table[i] e table[i + 1]
+            np.take(table, index, out=wave, mode="clip")
+            index += 1
+            np.take(table, index, out=nxt, mode="clip")
+            nxt -= wave
+            nxt *= phase
+            wave += nxt
+
+            wave *= self._envelope[:n]
+
+            # Normaliza o pico, aplica o volume e o limiter já na escala de 16 bits
+            np.abs(wave, out=nxt)
+            peak = float(nxt.max()) if n else 0.0
+            scale = volume * 32767 / peak if peak > 0 else volume * 32767
+            wave *= np.float32(scale)
+            np.clip(wave, -0.99 * 32767, 0.99 * 32767, out=wave)
+            out[:, 0] = wave
+            out[:, 1] = wave
+        return out
+
+
+_engines = {}
+
+
+def get_engine(rate=44100):
+    """Um WavetableSynth por taxa de amostragem, compartilhado pelo processo."""
+    engine = _engines.get(rate)
+    if engine is None:
+        engine = _engines[rate] = WavetableSynth(rate)
+    return engine
+
+
+def synth_piano_note(base_freq, duration=1.0, volume=DEFAULT_VOLUME, rate=44100, tuning_multiplier=1.0, out=None):
+    """
+    Gera som de piano elétrico com proteção contra distorção (Clipping).
+    Retorna um array int16 estéreo (n, 2) ou None para frequência inválida.
+    """
+    return get_engine(rate).render(base_freq, duration, volume, tuning_multiplier, out)
+
+
+# ==============================================================================
+# CACHE EM DISCO (MEMORY-MAPPED)
+# ==============================================================================
+DISK_CACHE_VERSION = 1  # Aumente ao mudar o formato dos arquivos
+DISK_CACHE_STALE_DAYS = 30  # Limpeza extra: pastas de outras assinaturas sem uso há mais tempo
+
+
+class DiskNoteCache:
+    """
+    Notas renderizadas gravadas como .npy numa pasta por assinatura dos
+    parâmetros de síntese (versão, taxa, A4, afinação, harmônicos, envelope).
+    Qualquer mudança gera outra assinatura e as notas são refeitas. `max_bytes`
+    vale para a raiz inteira: as notas usadas há mais tempo saem primeiro, de
+    qualquer assinatura, então dois jogos com ajustes diferentes dividem a
+    pasta sem apagar o cache um do outro. Pastas sem uso há `stale_days` são
+    apagadas ao abrir. Ler uma nota é só abrir um memmap, sem copiar o áudio.
+    """
+
+    def __init__(self, directory, rate=44100, tuning_multiplier=1.0, a4=440.0, max_bytes=256 * 1024 * 1024,
+                 stale_days=DISK_CACHE_STALE_DAYS):
+        self.max_bytes = max_bytes
+        self.stale_days = stale_days
+        params = {
+            "version": DISK_CACHE_VERSION,
+            "rate": rate,
+            "a4": a4,
+            "tuning_multiplier": tuning_multiplier,
+            "harmonics": HARMONICS,
+            "table_size": TABLE_SIZE,
+            "decay_rate": DECAY_RATE,
+        }
+        self.signature = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        self.root = directory
+        self.path = os.path.join(directory, f"v{DISK_CACHE_VERSION}-{self.signature}")
+        os.makedirs(self.path, exist_ok=True)
+        os.utime(self.path)  # mtime da pasta marca o último uso da assinatura
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        # Índice LRU em memória (caminho -> bytes) de todas as assinaturas: só a
+        # construção lista as pastas
+        self._index = OrderedDict()
+        self.bytes = 0
+        self._load_index()
+        self._evict()  # O limite pode ter diminuído desde a última execução
+
+    def _signature_dirs(self):
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            if re.fullmatch(r"v\d+-[0-9a-f]+", name) and os.path.isdir(full):
+                yield full
+
+    def _load_index(self):
+        cutoff = time.time() - self.stale_days * 86400
+        files = []
+        for folder in self._signature_dirs():
+            try:
+                if folder != self.path and os.stat(folder).st_mtime < cutoff:
+                    shutil.rmtree(folder, ignore_errors=True)  # Limpeza extra; o limite é max_bytes
+                    continue
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith(".npy"):
+                    path = os.path.join(folder, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+        for _, size, path in sorted(files):
+            self._index[path] = size
+            self.bytes += size
+
+    def _file(self, freq, duration, volume):
+        return os.path.join(self.path, f"{freq:.4f}_{duration:.4f}_{volume:.4f}.npy")
+
+    def load(self, freq, duration, volume):
+        """Memmap somente leitura da nota, ou None se ainda não estiver no disco."""
+        path = self._file(freq, duration, volume)
+        try:
+            buf = np.load(path, mmap_mode="r")
+            os.utime(path)  # mtime guarda a ordem LRU para a próxima execução
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if path in self._index:
+            self._index.move_to_end(path)
+        else:
+            # Gravada por outro processo depois que o índice foi montado
+            self._index[path] = os.path.getsize(path)
+            self.bytes += self._index[path]
+        self.hits += 1
+        return buf
+
+    def store(self, freq, duration, volume, buf):
+        path = self._file(freq, duration, volume)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, buf)
+                size = f.tell()
+            os.replace(tmp, path)  # Outro processo nunca vê um arquivo pela metade
+            self.writes += 1
+        except OSError:
+            return
+        self.bytes += size - self._index.pop(path, 0)
+        self._index[path] = size
+        self._evict()
+
+    def size_bytes(self):
+        return self.bytes
+
+    def _evict(self):
+        # Arquivos que não puderam ser apagados (no Windows, um arquivo mapeado
+        # não pode ser apagado) voltam para o fim da fila
+        kept = []
+        while self.bytes > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Outro processo já apagou
+            except OSError:
+                kept.append((path, size))
+                continue
+            else:
+                self.evictions += 1
+            self.bytes -= size
+            folder = os.path.dirname(path)
+            if folder != self.path:
+                try:
+                    os.rmdir(folder)  # Só sai se a assinatura antiga ficou vazia
+                except OSError:
+                    pass
+        for path, size in kept:
+            self._index[path] = size
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        for path in [p for p in self._index if os.path.dirname(p) == self.path]:
+            self.bytes -= self._index.pop(path)
+
+    def stats(self):
+        return {"signature": self.signature, "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
+
+
+# ==============================================================================
+# CACHE DE NOTAS PRONTAS (LRU)
+# ==============================================================================
+class NoteCache:
+    """
+    Guarda as notas já sintetizadas (buffer int16 e, sob demanda, o
+    pygame.mixer.Sound), chaveadas por (frequência, duração, volume, afinação).
+    Quando o total passa de `max_bytes`, descarta as notas usadas há mais tempo.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, rate=44100, tuning_multiplier=1.0, disk=None):
+        self.max_bytes = max_bytes
+        self.rate = rate
+        self.tuning_multiplier = tuning_multiplier
+        self.disk = disk  # DiskNoteCache opcional: sobrevive entre execuções
+        self._entries = OrderedDict()  # chave -> [buffer, Sound ou None, bytes]
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, freq, duration, volume):
+        # Arredonda para que a mesma nota calculada por caminhos diferentes caia na mesma chave
+        return (round(float(freq), 4), round(float(duration), 4), round(float(volume), 4),
+                round(self.tuning_multiplier, 6))
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def _entry(self, freq, duration, volume):
+        key = self._key(freq, duration, volume)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if freq <= 0:
+            return None
+        buf = self.disk.load(*key[:3]) if self.disk is not None else None
+        if buf is None:
+            buf = synth_piano_note(freq, duration, volume, self.rate, self.tuning_multiplier)
+            if self.disk is not None:
+                self.disk.store(*key[:3], buf)
+        entry = [buf, None, buf.nbytes]
+        self._entries[key] = entry
+        self.bytes += buf.nbytes
+        self._evict()
+        return entry
+
+    def samples(self, freq, duration, volume=DEFAULT_VOLUME):
+        """Buffer int16 estéreo da nota, para o StreamingMixer (None se freq <= 0)."""
+        with self._lock:
+            entry = self._entry(freq, duration, volume)
+            return entry[0] if entry is not None else None
+
+    def get(self, freq, duration, volume=DEFAULT_VOLUME):
+        """Retorna o Sound da nota, sintetizando só na primeira vez (None se freq <= 0)."""
+        with self._lock:
+            entry = self._entry(freq, duration, volume)
+            if entry is None:
+                return None
+            if entry[1] is None:
+                # make_sound copia o buffer: conta os bytes do Sound também
+                entry[1] = pygame.sndarray.make_sound(entry[0])
+                entry[2] += entry[0].nbytes
+                self.bytes += entry[0].nbytes
+                self._evict()
+            return entry[1]
+
+    def prewarm(self, notes, volume=DEFAULT_VOLUME, sounds=True):
+        """Sintetiza de antemão cada (freq, duração) distinto, ex.: as notas da música da rodada."""
+        for freq, duration in dict.fromkeys(notes):
+            if sounds:
+                self.get(freq, duration, volume)
+            else:
+                self.samples(freq, duration, volume)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# ==============================================================================
+# PREFIXO REVELADO DA MÚSICA (REPETIR NOTAS)
+# ==============================================================================
+class PrefixRenderer:
+    """
+    Mantém as notas já reveladas renderizadas num único buffer estéreo, com cada
+    nota começando exatamente no fim da anterior. Quando o prefixo cresce, só a
+    nota nova é sintetizada e anexada; o replay vira um único Sound.play().
+    """
+
+    def __init__(self, rate=44100, tuning_multiplier=1.0, volume=DEFAULT_VOLUME):
+        self.rate = rate
+        self.tuning_multiplier = tuning_multiplier
+        self.volume = volume
+        self._buffer = np.zeros((rate * 4, 2), dtype=np.int16)
+        self._notes = []
+        self.length = 0  # Amostras válidas no buffer
+        self._sound = None
+        self.last_render_ms = None  # Tempo da última extensão
+
+    def reset(self):
+        # Buffer novo: o mixer pode estar tocando uma view do antigo (samples()),
+        # e reescrevê-lo emendaria a música nova no meio do replay
+        self._buffer = np.empty_like(self._buffer)
+        self._notes = []
+        self.length = 0
+        self._sound = None
+
+    def _append(self, freq, duration):
+        n = int(self.rate * duration)
+        if self.length + n > len(self._buffer):
+            # Dobra a capacidade: extensões seguidas custam O(1) amortizado
+            grown = np.zeros((max(2 * len(self._buffer), self.length + n), 2), dtype=np.int16)
+            grown[:self.length] = self._buffer[:self.length]
+            self._buffer = grown
+        target = self._buffer[self.length:self.length + n]
+        if synth_piano_note(freq, duration, self.volume, self.rate, self.tuning_multiplier, out=target) is None:
+            target[:] = 0  # Pausa: silêncio com a mesma duração
+        self.length += n
+
+    def sync(self, notes):
+        """
+        Ajusta o buffer para `notes` (lista de (freq, duração)). Se o buffer atual
+        for prefixo de `notes`, renderiza só as notas novas; senão recomeça.
+        """
+        notes = list(notes)
+        if notes[:len(self._notes)] != self._notes:
+            self.reset()
+        new = notes[len(self._notes):]
+        if not new:
+            return
+        start = time.perf_counter()
+        for freq, duration in new:
+            self._append(freq, duration)
+        self._notes.extend(new)
+        self._sound = None
+        self.last_render_ms = 1000.0 * (time.perf_counter() - start)
+
+    def samples(self):
+        """View do áudio renderizado (sem cópia); continua válida depois de reset()."""
+        return self._buffer[:self.length]
+
+    def play(self):
+        """Toca o prefixo inteiro; retorna o Channel (ou None se não houver notas)."""
+        if self.length == 0:
+            return None
+        if self._sound is None:
+            self._sound = pygame.sndarray.make_sound(self.samples())
+        return self._sound.play()
+
+    def stats(self):
+        return {"notes": len(self._notes), "seconds": self.length / self.rate, "last_render_ms": self.last_render_ms}
+
+
+# ==============================================================================
+# BENCHMARK
+# ==============================================================================
+def benchmark_synth(duration=1.0, repeats=20, rate=44100):
+    """
+    Compara reference_piano_note com o WavetableSynth nas notas da tabela do
+    jogo: ms de render por segundo de áudio, pico de memória alocada (tracemalloc)
+    e maior diferença entre as amostras int16 das duas versões.
+    """
+    import tracemalloc
+
+    freqs = [440.0 * 2 ** ((i - 9) / 12) for i in range(12)]
+    engine = get_engine(rate)
+    out = np.empty((int(rate * duration), 2), dtype=np.int16)
+    variants = {
+        "reference": lambda f: reference_piano_note(f, duration, rate=rate),
+        "wavetable": lambda f: engine.render(f, duration, out=out),
+    }
+
+    results = {}
+    for name, render in variants.items():
+        render(freqs[0])  # Aquece (buffers de trabalho, caches do NumPy)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for f in freqs:
+                render(f)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for f in freqs:
+            render(f)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "ms_per_audio_second": 1000.0 * elapsed / (repeats * len(freqs) * duration),
+            "peak_alloc_bytes": peak,
+        }
+
+    max_diff = max(int(np.abs(reference_piano_note(f, duration, rate=rate).astype(np.int32)
+                              - engine.render(f, duration).astype(np.int32)).max()) for f in freqs)
+    results["max_sample_diff"] = max_diff
+    return results
+
+
+def benchmark_startup(directory, rate=44100, a4=440.0):
+    """
+    Tempo para deixar prontas todas as notas da BIBLIOTECA: a frio (cache em
+    disco vazio, tudo sintetizado e gravado) e a quente (tudo lido por memmap).
+    """
+    from Musicas import BIBLIOTECA
+
+    freqs = {nome: a4 * 2 ** ((i - 9) / 12) for i, nome in enumerate(
+        ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"])}
+    notes = list(dict.fromkeys((freqs[nome], d) for musica in BIBLIOTECA for nome, d in musica.notas))
+
+    results = {"notes": len(notes)}
+    DiskNoteCache(directory, rate, a4=a4).clear()
+    for phase in ("cold", "warm"):
+        start = time.perf_counter()
+        cache = NoteCache(max_bytes=1 << 40, rate=rate, disk=DiskNoteCache(directory, rate, a4=a4))
+        cache.prewarm(notes, sounds=False)
+        results[f"{phase}_ms"] = 1000.0 * (time.perf_counter() - start)
+    results["disk"] = cache.disk.stats()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compara a síntese original com o motor de wavetable")
+    parser.add_argument("--duration", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--startup", metavar="PASTA", default=None,
+                        help="Mede a partida a frio e a quente do cache em disco nessa pasta")
+    args = parser.parse_args()
+
+    if args.startup:
+        r = benchmark_startup(args.startup, args.rate)
+        print(f"{r['notes']} notas distintas na BIBLIOTECA")
+        print(f"  a frio (síntese + gravação): {r['cold_ms']:8.1f} ms")
+        print(f"  a quente (memmap):           {r['warm_ms']:8.1f} ms")
+        print(f"  cache em disco: {r['disk']['bytes'] / 1048576:.1f} MB")
+        raise SystemExit
+
+    r = benchmark_synth(args.duration, args.repeats, args.rate)
+    for name in ("reference", "wavetable"):
+        print(f"{name:>9}: {r[name]['ms_per_audio_second']:6.2f} ms por segundo de áudio | "
+              f"pico de alocação {r[name]['peak_alloc_bytes'] / 1024:8.1f} KiB")
+    print(f"Maior diferença entre as amostras: {r['max_sample_diff']} (int16)")
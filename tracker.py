@@ -0,0 +1,118 @@
+import math
+from collections import deque
+
+# ==============================================================================
+# RASTREADOR DE PITCH
+# ==============================================================================
+# Fica entre o estimador e PitchDetector.current_note. Trabalha em semitons
+# (escala MIDI) e usa memória constante: uma deque curta e três escalares.
+
+
+def smoothing_latency_ms(hop_seconds, median_size=5, process_noise=0.01, measurement_noise=0.1):
+    """Atraso médio introduzido: meia janela da mediana + atraso do Kalman em regime."""
+    p = measurement_noise
+    for _ in range(200):
+        p += process_noise
+        k = p / (p + measurement_noise)
+        p *= 1 - k
+    kalman_frames = (1 - k) / k
+    median_frames = (median_size - 1) / 2
+    return 1000.0 * hop_seconds * (median_frames + kalman_frames)
+
+
+class PitchTracker:
+    """
+    Suaviza a sequência de estimativas quadro a quadro:
+
+    - mediana móvel curta remove glitches isolados;
+    - filtro de Kalman 1-D (passeio aleatório) suaviza o vibrato e o ruído;
+    - saltos de oitava só são aceitos depois de `octave_confirm` quadros seguidos;
+    - a nota só muda quando o pitch passa `hysteresis` semitons da fronteira;
+    - lacunas curtas de silêncio (até `max_gap` quadros) mantêm a nota anterior.
+    """
+
+    def __init__(self, hop_seconds, a4=440.0, note_names=None, median_size=5,
+                 process_noise=0.01, measurement_noise=0.1, note_jump=1.0,
+                 octave_confirm=4, hysteresis=0.15, max_gap=3):
+        self.hop_seconds = hop_seconds
+        self.a4 = a4
+        self.note_names = note_names or ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+        self.median_size = median_size
+        self.q = process_noise        # Variância do movimento do pitch por quadro (semitons²)
+        self.r = measurement_noise    # Variância do erro do estimador (semitons²)
+        self.note_jump = note_jump    # Mudança maior que isso é nota nova: reinicia o filtro
+        self.octave_confirm = octave_confirm
+        self.hysteresis = hysteresis
+        self.max_gap = max_gap
+        self._recent = deque(maxlen=median_size)
+        self.reset()
+
+    def reset(self):
+        self._recent.clear()
+        self._midi = None
+        self._p = self.r
+        self._note_midi = None
+        self._octave_count = 0
+        self._gap = 0
+        self.freq = 0.0
+        self.note = None
+
+    def added_latency_ms(self):
+        return smoothing_latency_ms(self.hop_seconds, self.median_size, self.q, self.r)
+
+    def _name(self, midi):
+        return f"{self.note_names[midi % 12]}{midi // 12 - 1}"
+
+    def _median(self):
+        # No máximo `median_size` valores: custo constante por quadro
+        ordered = sorted(self._recent)
+        n = len(ordered)
+        if n % 2:
+            return ordered[n // 2]
+        return 0.5 * (ordered[n // 2 - 1] + ordered[n // 2])
+
+    def update(self, freq):
+        """Recebe a estimativa bruta (0 = sem pitch) e retorna (freq suavizada, nota)."""
+        if freq <= 0:
+            self._gap += 1
+            if self._gap > self.max_gap:
+                self.reset()
+            return self.freq, self.note
+        self._gap = 0
+
+        m = 12 * math.log2(freq / self.a4) + 69
+
+        # Oitava errada: dobra de volta para a oitava rastreada até se confirmar
+        if self._midi is not None:
+            jump = m - self._midi
+            octaves = round(jump / 12)
+            if octaves != 0 and abs(jump - 12 * octaves) < 1.0:
+                self._octave_count += 1
+                if self._octave_count < self.octave_confirm:
+                    m -= 12 * octaves
+                else:
+                    self._recent.clear()
+                    self._midi = None
+                    self._octave_count = 0
+            else:
+                self._octave_count = 0
+
+        self._recent.append(m)
+        med = self._median()
+
+        if self._midi is None or abs(med - self._midi) > self.note_jump:
+            self._midi = med
+            self._p = self.r
+        else:
+            self._p += self.q
+            k = self._p / (self._p + self.r)
+            self._midi += k * (med - self._midi)
+            self._p *= 1 - k
+
+        # Histerese: só troca de nota bem depois da fronteira entre semitons
+        if self._note_midi is None or abs(self._midi - self._note_midi) > 0.5 + self.hysteresis:
+            self._note_midi = int(round(self._midi))
+
+        self.freq = self.a4 * 2 ** ((self._midi - 69) / 12)
+        self.note = self._name(self._note_midi)
+        return self.freq, self.note